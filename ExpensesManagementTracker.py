@@ -1,63 +1,44 @@
 # IMPORTED EXTENSIONS
 import tkinter as tk # for gui syempre ahihi
 from tkinter import ttk, messagebox #for pop up message box (warning purposes)
-import sqlite3 # for database 
+import atexit # to close the database connections when the app exits
+import threading # to load the graphing libraries while the login window is up
 from datetime import datetime, date # for date and time related stuffs
-import matplotlib.pyplot as plt # for graphing to make it more presentable
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg 
-import hashlib # for password security
+from db_connection import get_connection, close_all_pools # pooled database connections
+from migrations import migrate # versioned database schema
+from auth import hash_password, verify_password # for password security
+from expense_service import (ExpenseService, ExpenseRepository, CATEGORIES, SDG_TIPS, # headless data layer
+                             is_valid_month_format, clean_currency_input,
+                             DuplicateMonthError, EmptyExpenseError, RecordNotFoundError, BatchInputError,
+                             expense_sort_key, transaction_sort_key, DEFAULT_USER_ID, SEARCH_LIMIT)
+from table_view import PagedTreeview # only the visible pages of long tables are loaded
+from batch_entry import BatchEntryGrid, ERROR_COLOR # many transactions typed or pasted at once
+from background import BackgroundWorker # queries and chart drawing run off the gui thread
+from refresh_scheduler import RefreshScheduler # each dirty view is redrawn once per idle cycle
+from instrumentation import PROFILER # opt-in timings (EXPENSES_PROFILE=1)
+from money import format_rows # amounts are Money (centavos), formatted a column at a time
+from periods import needs_latest # date ranges over the integer month keys
 
 
 
-# COLORS IN HEX VALUES (hulaan nalang kung ano ngolor yan whaha)
-PRIMARY_COLOR = "#0F1E3A"
-SECONDARY_COLOR = "#1B3A64"
-ACCENT_COLOR = "#4DEAEF"
-TEXT_COLOR = "#EFEFEF"
-BUTTON_COLOR = "#2D5A8E"
-DELETE_COLOR = "#9E2A2B"
-MANAGE_COLOR = "#167A6E"
-BLACK_COLOR = "#000000"
+# COLORS IN HEX VALUES AND GRAPH COLORS (kept in theme.py so the charts can share them)
+from theme import (PRIMARY_COLOR, SECONDARY_COLOR, ACCENT_COLOR, TEXT_COLOR, BUTTON_COLOR,
+                   DELETE_COLOR, MANAGE_COLOR, BLACK_COLOR, GRAPH_COLORS)
 
 
 
-# GRAPH COLORS
-GRAPH_COLORS = {
-    'Total': ACCENT_COLOR,   
-    'Water': '#1E88E5',       
-    'Electricity': '#FFC107',     
-    'Others': '#8BC34A'          
-}
+# SDG_TIPS, CATEGORIES and the input validation helpers live in expense_service.py
 
 
 
-# SDG INTEGRATION & ANALYSIS (for pop up warnings when the total is increasing than last month)
-SDG_TIPS = {
-    "water": "SDG 6 Tip: Check for leaks or shorten showers to save thousands of liters of water and money!",
-    "electricity": "SDG 7 & 13 Tip: Unplug appliances to stop 'phantom power.' Switching to LED bulbs also drastically reduces kWh use.",
-    "others": "SDG 12 Tip: Before buying non-essentials, consider if it's durable, locally sourced, or second-hand to promote responsible consumption.",
-    "default": "Great job tracking your finances! Saving money is the first step towards promoting responsible consumption."
-}
+# SEARCH SETTINGS
+SEARCH_DELAY_MS = 250 # searching as you type waits for the typing to pause this long
 
 
 
-
-
-# INPUT VALIDATION
-def is_valid_month_format(month_str):
-    # to format the date and time 
-    try:
-        datetime.strptime(month_str, "%Y-%m")
-        return True
-    except ValueError:
-        return False
-
-
-def clean_currency_input(value):
-    # for peso sign para astig
-    if isinstance(value, str):
-        return value.replace('₱', '').replace(',', '').strip()
-    return str(value)
+# DATE RANGE SETTINGS (the months the table and the charts show; anything periods.parse_range reads can be typed)
+ALL_MONTHS_TEXT = "All months"
+RANGE_PRESETS = [ALL_MONTHS_TEXT, "Last 3 months", "Last 6 months", "Last 12 months", "Last 24 months"]
 
 
 
@@ -65,69 +46,15 @@ def clean_currency_input(value):
 
 # DATABASE SETUP (using sqlite)
 def setup_database():
-    # name of the database
-    conn = sqlite3.connect('expenses_tracker.db')
-    cursor = conn.cursor()
-
-    # creating "expenses" table in database (MONTHLY TOTALS)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS expenses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            month TEXT NOT NULL UNIQUE,
-            water REAL,
-            electricity REAL,
-            others REAL,        
-            total REAL
-        )
-    """)
-
-    # creating "transactions" table in database (CATEGORIZED SPENDING)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            month TEXT NOT NULL,
-            category TEXT NOT NULL,
-            description TEXT,
-            amount REAL
-        )
-    """)
-
-    # creating "users" table in database (AUTHENTICATION DATA)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT NOT NULL UNIQUE,
-            password_hash TEXT NOT NULL
-        )
-    """)
-
-
-    # THE PASSWORD OF THE GUI
-    admin_password_hash = hash_password("password123") #password
-    try:
-        cursor.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)",
-                         ('admin', admin_password_hash)) #name
-        conn.commit()
-    except sqlite3.IntegrityError:
-        pass
-
-    conn.close()
-
-
-
+    # creates or upgrades the tables, skips everything if the schema is already current
+    with get_connection() as conn:
+        migrate(conn)
 
 
-# AUTHENTICATION SYSTEM
-def hash_password(password):
-    # hashing the password 
-    return hashlib.sha256(password.encode()).hexdigest()
 
 
-def verify_password(stored_hash, provided_password):
-    # verify the password if correct or nah
-    return stored_hash == hash_password(provided_password)
-
 
+# AUTHENTICATION SYSTEM (hash_password and verify_password live in auth.py)
 # LoginWindow class for Security (CREATING WINDOW FOR PASSWORD)
 class LoginWindow(tk.Tk):
     # create windows box using tk geometry 
@@ -182,16 +109,10 @@ class LoginWindow(tk.Tk):
         username = self.username_entry.get()
         password = self.password_entry.get()
 
-        conn = sqlite3.connect('expenses_tracker.db')
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT password_hash FROM users WHERE username=?", (username,))
-        user_data = cursor.fetchone()
-        conn.close()
-
-        if user_data and verify_password(user_data[0], password):
+        user_id = ExpenseService().login(username, password)
+        if user_id is not None:
             self.destroy() 
-            self.start_main_app_callback()
+            self.start_main_app_callback(user_id)
         else:
             messagebox.showerror("Login Failed", "Invalid username or password.") # pops up warning message
 
@@ -202,25 +123,61 @@ class LoginWindow(tk.Tk):
 # MAIN APPLICATION CLASS
 class ExpensesTrackerApp(tk.Tk):
     # creating window box 
-    def __init__(self, main_app_launcher):
+    def __init__(self, main_app_launcher, user_id=DEFAULT_USER_ID):
         super().__init__()
         self.title("💰 Expenses Management Tracker")
         self.geometry("1100x700")
         self.configure(bg=PRIMARY_COLOR)
         self.main_app_launcher = main_app_launcher
+        self.user_id = user_id
+        # every database read/write goes through here, and only ever sees the logged in user's data
+        self.service = ExpenseService(ExpenseRepository(user_id=user_id))
         
         self.current_sort_order = "month DESC"
+        self.period_range = None # None is every month, else the PeriodRange the table and charts show
+        self.range_text = ALL_MONTHS_TEXT # what it was resolved from
 
         self.create_styles()
         self.create_widgets()
-        
+
+        # database work and chart rendering happen on worker threads, results come back with after()
+        self.worker = BackgroundWorker(self, on_busy_change=self.show_loading, user_id=user_id)
+
+        # changes only mark the views they touched, each one is redrawn once when tkinter is idle
+        self.refresh = RefreshScheduler(self)
+        self.refresh.register("table", self.refresh_table)
+        self.refresh.register("others", self.update_others_display)
+        self.refresh.register("chart", self.show_trend)
+
+        if PROFILER.enabled:
+            self.create_debug_menu()
+
+        # the empty dashboard paints first, the table and the graph fill in afterwards
+        self.after_idle(self.load_dashboard)
+
+
+    def load_dashboard(self):
         current_month = datetime.now().strftime("%Y-%m")
         self.load_data() 
-        self.update_others_display(current_month)
+        self.refresh.mark("others", current_month)
         
         self.plot_total_trend() 
 
 
+    def mark_changed(self, month=None, chart_view=None):
+        # after a write: the table and the chart (and the month's others total) are out of date.
+        # chart_view=None keeps whatever trend is shown
+        view = chart_view or (self.chart.view if self.chart is not None else "total")
+        if month is not None:
+            self.refresh.mark("others", month)
+        self.refresh.mark("search") # only redrawn while the search window is open
+        if needs_latest(self.range_text):
+            self.move_period_range(view) # "last N months" moves along with the newest month
+        else:
+            self.refresh.mark("table")
+            self.refresh.mark("chart", view)
+
+
 
 
 
@@ -232,6 +189,55 @@ class ExpensesTrackerApp(tk.Tk):
             self.main_app_launcher()
 
 
+    def destroy(self):
+        # wait for the worker threads first, so no write is cut off halfway
+        if hasattr(self, 'refresh'):
+            self.refresh.cancel()
+        if hasattr(self, 'worker'):
+            self.worker.shutdown()
+        super().destroy()
+
+
+    def show_loading(self, busy):
+        # small hint next to the graph buttons while background jobs are running
+        if self.loading_label.winfo_exists():
+            self.loading_label.config(text="⏳ Loading..." if busy else "")
+
+
+
+
+
+    # DEBUG MENU (only when profiling is on)
+    def create_debug_menu(self):
+        menubar = tk.Menu(self)
+        debug_menu = tk.Menu(menubar, tearoff=0)
+        debug_menu.add_command(label="Performance Summary...", command=self.show_performance_summary)
+        debug_menu.add_command(label="Print Summary to Console", command=PROFILER.dump)
+        debug_menu.add_command(label="Reset Timings", command=PROFILER.reset)
+        menubar.add_cascade(label="Debug", menu=debug_menu)
+        self.config(menu=menubar)
+
+
+    def show_performance_summary(self):
+        cache = self.service.cache.stats()
+        text = (PROFILER.summary() +
+                f"\n\nquery cache: {cache['hits']} hits, {cache['misses']} misses, "
+                f"{cache['evictions']} evictions, {cache['invalidations']} invalidations, "
+                f"{cache['entries']} entries ({cache['hit_rate']:.0%} hit rate)"
+                f"\nbackground jobs superseded: {self.worker.superseded}"
+                f"\n\n{self.refresh.summary()}")
+
+        win = tk.Toplevel(self)
+        win.title("⏱️ Performance Summary")
+        win.configure(bg=SECONDARY_COLOR)
+
+        summary_text = tk.Text(win, width=130, height=30, bg=PRIMARY_COLOR, fg=TEXT_COLOR,
+                               font=('Courier', 9), wrap='none')
+        summary_text.insert('1.0', text)
+        summary_text.config(state='disabled')
+        summary_text.pack(fill='both', expand=True, padx=10, pady=10)
+
+
 
 
 
@@ -269,32 +275,28 @@ class ExpensesTrackerApp(tk.Tk):
 
 
     # DATA MANAGEMENT
-    # connect with database
-    def get_db_connection(self):
-        return sqlite3.connect('expenses_tracker.db') # name of the database
-    
-    # for loading data in table
+    # for loading data in table (first page only, the rest is fetched while scrolling)
+    @PROFILER.stage("ui: load_data")
     def load_data(self, sort_by="month DESC"):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        # the range is read when a page is fetched, so a refresh after the range moved uses the new one
+        def fetch_page(after, before, limit):
+            return self.worker.read_service.list_expenses_page(sort_by, after, before, limit, self.period_range)
+
+        self.expense_table.set_source(fetch_page=fetch_page,
+                                      key_of=lambda row: expense_sort_key(row, sort_by))
+        self.refresh.mark("table")
 
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        
-        query = f"SELECT month, water, electricity, others, total FROM expenses ORDER BY {sort_by}"
-        cursor.execute(query)
 
-        for row in cursor.fetchall():
-            month = row[0]
-            water = f"₱{row[1]:,.2f}"
-            electricity = f"₱{row[2]:,.2f}"
-            others = f"₱{row[3]:,.2f}"
-            total = f"₱{row[4]:,.2f}"
+    # after a change: only the rows that changed are touched, the sort and scroll position stay
+    @PROFILER.stage("ui: refresh_table")
+    def refresh_table(self):
+        self.expense_table.refresh_in(self.worker, "table")
 
-            formatted_row = (month, water, electricity, others, total)
-            self.tree.insert('', tk.END, values=formatted_row, iid=month)
 
-        conn.close()
+    # formats a page of expenses rows for the table (every amount column in one batch)
+    @PROFILER.stage("ui: format_expense_rows")
+    def format_expense_rows(self, rows):
+        return format_rows(rows, (1, 2, 3, 4))
 
 
 
@@ -318,15 +320,14 @@ class ExpensesTrackerApp(tk.Tk):
              self.entries['others'].config(state='readonly')
         
 
+    @PROFILER.stage("ui: update_others_display")
     def update_others_display(self, month):
-        # updating the data in db
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
+        # updating the data in db (read in the background, shown when it arrives)
+        self.worker.read("others", lambda service: service.get_month_others(month),
+                         on_done=self._show_others)
 
-        cursor.execute("SELECT SUM(amount) FROM transactions WHERE month=?", (month,))
-        total_others = cursor.fetchone()[0] or 0.0
-        conn.close()
 
+    def _show_others(self, total_others):
         if 'others' in self.entries and self.entries['others'].winfo_exists():
             self.entries['others'].config(state='normal')
             self.entries['others'].delete(0, tk.END)
@@ -358,17 +359,16 @@ class ExpensesTrackerApp(tk.Tk):
                 self.entries['water'].insert(0, clean_currency_input(values[1]))
                 self.entries['electricity'].insert(0, clean_currency_input(values[2]))
                 
-                self.update_others_display(selected_month)
+                # arrowing through the rows only reads the month the selection stops on
+                self.refresh.mark("others", selected_month)
         else:
             self.clear_entries()
 
 
+    @PROFILER.stage("ui: _refresh_all")
     def _refresh_all(self, month, current_win=None):
-        self.update_others_display(month)
-        self.load_data(self.current_sort_order)
+        self.mark_changed(month)
 
-        if self.graph_frame.winfo_children(): 
-            self.plot_graph_data()
         if current_win:
             for w in self.winfo_children():
                 if isinstance(w, tk.Toplevel) and "Manage Other Expenses" in w.title():
@@ -382,41 +382,24 @@ class ExpensesTrackerApp(tk.Tk):
     # TRANSACTIONS MANAGEMENT
     # get the transactions in db
     def get_transactions(self, month):
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, category, description, amount FROM transactions WHERE month=? ORDER BY id DESC", (month,))
-        data = cursor.fetchall()
-        conn.close()
-        return data
+        return self.service.list_transactions(month)
 
 
     # editing the transactions in db
     def update_transaction(self, trans_id, new_category, new_description, new_amount, month, win):
-        try:
-            new_amount = float(clean_currency_input(new_amount))
-            if new_amount <= 0:
-                raise ValueError("Amount must be positive.")
-        except ValueError as e:
-            messagebox.showerror("Input Error", f"Invalid amount: {e}")
-            return
-
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                UPDATE transactions 
-                SET category=?, description=?, amount=? 
-                WHERE id=?
-            """, (new_category, new_description, new_amount, trans_id))
-            conn.commit()
-            
+        def on_done(updated):
             self._refresh_all(month, win)
             messagebox.showinfo("Success", f"Transaction ID {trans_id} updated.")
 
-        except Exception as e: # in case theres some errors 
-            messagebox.showerror("Database Error", f"Error updating transaction: {e}")
-        finally:
-            conn.close()
+        def on_error(e):
+            if isinstance(e, ValueError):
+                messagebox.showerror("Input Error", f"Invalid amount: {e}")
+            else: # in case theres some errors 
+                messagebox.showerror("Database Error", f"Error updating transaction: {e}")
+
+        self.worker.write(("transaction", trans_id),
+                          lambda service: service.update_transaction(trans_id, new_category, new_description, new_amount),
+                          on_done=on_done, on_error=on_error)
 
 
     # deleting the transactions in db
@@ -426,26 +409,20 @@ class ExpensesTrackerApp(tk.Tk):
         if not messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete Transaction ID {trans_id}?"):
             return
 
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("DELETE FROM transactions WHERE id=?", (trans_id,))
-            conn.commit()
-            
+        def on_done(deleted):
             self._refresh_all(month, win)
             messagebox.showinfo("Success", f"Transaction ID {trans_id} deleted.")
-            
-        except Exception as e: # in case have a error 
+
+        def on_error(e): # in case have a error 
             messagebox.showerror("Database Error", f"Error deleting transaction: {e}")
-        finally:
-            conn.close()
+
+        self.worker.write(("transaction", trans_id),
+                          lambda service: service.delete_transaction(trans_id),
+                          on_done=on_done, on_error=on_error)
 
 
     # managing the transactions in other expenses 
     def manage_transactions_window(self):
-        CATEGORIES = ['Food & Groceries', 'Transport', 'Healthcare',
-                      'Sustainable Goods', 'Wasteful Spending', 'Entertainment']
-
         master_month = self.entries['month'].get().strip()
         
         # if it is not valid format it pops up a message that it is invalid
@@ -460,9 +437,9 @@ class ExpensesTrackerApp(tk.Tk):
         win.grab_set()
         win.resizable(False, False)
 
-        # Add new transaction button
+        # batch entry: type or paste many rows, saved together in one database transaction
         add_frame = tk.LabelFrame(win,
-                                text="➕ Add New Transaction", 
+                                text="➕ Add New Transactions (type or paste rows)", 
                                 bg=SECONDARY_COLOR, 
                                 fg=ACCENT_COLOR, 
                                 padx=10, 
@@ -473,122 +450,95 @@ class ExpensesTrackerApp(tk.Tk):
                        pady=15, 
                        fill='x')
 
-        # Category Label
-        tk.Label(add_frame, 
-                 text="Category:", 
-                 bg=SECONDARY_COLOR, 
-                 fg=TEXT_COLOR).grid(row=0, 
-                                     column=0, 
-                                     padx=5, 
-                                     pady=5, 
-                                     sticky='w')
-        
-        category_var = tk.StringVar(win, 
-                                    value=CATEGORIES[0])
-        
-        # option box for choosing other transactions categories
-        category_menu = ttk.OptionMenu(add_frame, 
-                                       category_var, 
-                                       CATEGORIES[0], 
-                                       *CATEGORIES, 
-                                       style='TMenubutton') 
-        
-        category_menu.config(width=20)
-
-        category_menu.grid(row=0, 
-                           column=1, 
-                           padx=5, 
-                           pady=5)
-
-        tk.Label(add_frame, 
-                 text="Description:", 
-                 bg=SECONDARY_COLOR, 
-                 fg=TEXT_COLOR).grid(row=1, 
-                                     column=0, 
-                                     padx=5, 
-                                     pady=5, 
-                                     sticky='w')
-        
-        desc_entry = tk.Entry(add_frame, 
-                              bg=PRIMARY_COLOR, 
-                              fg=TEXT_COLOR, 
-                              width=30, 
-                              insertbackground=ACCENT_COLOR)
-        
-        desc_entry.grid(row=1, 
-                        column=1, 
-                        padx=5, 
-                        pady=5)
-
-        # Amount Label
-        tk.Label(add_frame, 
-                 text="Amount (₱):", 
-                 bg=SECONDARY_COLOR, 
-                 fg=TEXT_COLOR).grid(row=2, 
-                                     column=0, 
-                                     padx=5, 
-                                     pady=5, 
-                                     sticky='w')
-        
-        amount_entry = tk.Entry(add_frame, 
-                                bg=PRIMARY_COLOR, 
+        batch_grid = BatchEntryGrid(add_frame)
+        batch_grid.pack(fill='x')
+
+        button_row = tk.Frame(add_frame, bg=SECONDARY_COLOR)
+        button_row.pack(fill='x', pady=(10, 0))
+
+        # the result of the last save (or what needs fixing) shows here instead of a popup
+        batch_status = tk.Label(add_frame, 
+                                text="Tip: paste rows copied from a spreadsheet (Category, Description, Amount).", 
+                                bg=SECONDARY_COLOR, 
                                 fg=TEXT_COLOR, 
-                                width=30, 
-                                insertbackground=ACCENT_COLOR)
-        
-        amount_entry.grid(row=2, 
-                          column=1, 
-                          padx=5, 
-                          pady=5)
+                                anchor='w')
+        batch_status.pack(fill='x', pady=(5, 0))
+
+
+        # saving every filled row in db at once
+        def save_new_transactions():
+            filled = batch_grid.filled_rows()
+            if not filled:
+                batch_status.config(text="Nothing to save yet, fill in at least one row.", fg=ERROR_COLOR)
+                return
 
+            rows = [(master_month,) + values for _, values in filled]
 
-        # saving new transactions in db
-        def save_new_transaction():
+            # every row is checked right away (no database needed), bad ones are marked next to them
             try:
-                category = category_var.get()
-                description = desc_entry.get().strip()
-                amount = float(clean_currency_input(amount_entry.get()))
+                cleaned = self.service.clean_transactions(rows)
+            except BatchInputError as e:
+                show_batch_errors(e, filled)
+                return
 
-                # if amount is negative or equals to zero it raise a error
-                if amount <= 0:
-                    raise ValueError("Amount must be positive.")
-                
-                conn = self.get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO transactions (month, category, description, amount) 
-                    VALUES (?, ?, ?, ?)
-                """, (master_month, category, description, amount))
-                conn.commit()
-                conn.close()
-
-                # if successful, it pops up a message that it successfully saved
-                messagebox.showinfo("Success", f"₱{amount:.2f} saved under '{category}'.")
-
-                self.update_others_display(master_month)
-                self.load_data(self.current_sort_order)
-                self.plot_total_trend()
-
-                load_transaction_list()
-                desc_entry.delete(0, tk.END)
-                amount_entry.delete(0, tk.END)
+            def on_done(trans_ids):
+                save_button.config(state='normal')
+
+                # one refresh for the whole batch
+                self.mark_changed(master_month, "total")
+                self.refresh.mark("transactions")
+
+                # the window may have been closed while the insert was running
+                if win.winfo_exists():
+                    batch_grid.clear()
+                    total = sum(row[3] for row in cleaned)
+                    batch_status.config(text=f"✔ {len(trans_ids)} transaction(s) saved, ₱{total:,.2f} in all.",
+                                        fg=ACCENT_COLOR)
 
             # in case theres some exception errors
-            except ValueError as e:
-                messagebox.showerror("Input Error", f"Invalid amount: {e}")
-            except Exception as e:
-                messagebox.showerror("Database Error", f"Error saving transaction: {e}")
+            def on_error(e):
+                save_button.config(state='normal')
+                if isinstance(e, BatchInputError) and win.winfo_exists():
+                    show_batch_errors(e, filled)
+                else:
+                    messagebox.showerror("Database Error", f"Error saving transactions: {e}")
+
+            batch_grid.show_errors({})
+            save_button.config(state='disabled')
+            self.worker.write(("new transactions", master_month),
+                              lambda service: service.add_transactions(rows),
+                              on_done=on_done, on_error=on_error)
+
+        def show_batch_errors(e, filled):
+            # e.errors is keyed by position among the saved rows, the grid wants its own row numbers
+            batch_grid.show_errors({filled[index][0]: message for index, message in e.errors.items()})
+            batch_status.config(text=f"{len(e.errors)} row(s) need fixing, nothing was saved.", fg=ERROR_COLOR)
+
+        # SAVE ALL ROWS Button
+        save_button = tk.Button(button_row,
+                                text="💾 SAVE ALL ROWS",
+                                command=save_new_transactions,
+                                bg=ACCENT_COLOR,
+                                fg=PRIMARY_COLOR,
+                                activebackground=ACCENT_COLOR,
+                                activeforeground=PRIMARY_COLOR,
+                                font=('Arial', 10, 'bold'),
+                                relief='flat')
+        save_button.pack(side='left', fill='x', expand=True, padx=(0, 5))
+
+        tk.Button(button_row,
+                  text="➕ MORE ROWS",
+                  command=batch_grid.add_rows,
+                  bg=BUTTON_COLOR,
+                  fg=TEXT_COLOR,
+                  relief='flat').pack(side='left', padx=5)
 
-        # SAVE NEW TRANSACTION Button
-        tk.Button(add_frame,
-                  text="💾 SAVE NEW TRANSACTION",
-                  command=save_new_transaction,
-                  bg=ACCENT_COLOR,
-                  fg=PRIMARY_COLOR,
-                  activebackground=ACCENT_COLOR,
-                  activeforeground=PRIMARY_COLOR,
-                  font=('Arial', 10, 'bold'),
-                  relief='flat').grid(row=3, column=0, columnspan=2, pady=10, sticky='ew')
+        tk.Button(button_row,
+                  text="🧹 CLEAR",
+                  command=batch_grid.clear,
+                  bg=BUTTON_COLOR,
+                  fg=TEXT_COLOR,
+                  relief='flat').pack(side='left', padx=(5, 0))
 
         # Existing Transactions Label
         # creating a table for other categorized expenses transaction table
@@ -629,19 +579,28 @@ class ExpensesTrackerApp(tk.Tk):
 
         trans_tree.pack(side='left', fill='both', expand=True)
 
+        # only the visible pages of the month's transactions are kept in the list
+        trans_table = PagedTreeview(trans_tree,
+                                    vsb,
+                                    fetch_page=lambda after, before, limit: self.worker.read_service.list_transactions_page(
+                                        master_month, after, before, limit),
+                                    key_of=transaction_sort_key,
+                                    iid_of=lambda trans: trans[0],
+                                    format_rows=lambda rows: format_rows(rows, (3,), sign=""))
+
 
-        # load the transaction list
+        # load the transaction list (a view of the refresh scheduler while the window is open)
         def load_transaction_list():
-            for item in trans_tree.get_children():
-                trans_tree.delete(item)
+            if win.winfo_exists():
+                trans_table.refresh_in(self.worker, "transactions")
+
+        def on_window_destroyed(event):
+            # <Destroy> also fires for every child widget
+            if event.widget is win:
+                self.refresh.unregister("transactions", load_transaction_list)
 
-            transactions = self.get_transactions(master_month)
-            for trans in transactions:
-                formatted_trans = (trans[0], trans[1], trans[2], f"{trans[3]:.2f}")
-                trans_tree.insert('', 
-                                  tk.END, 
-                                  values=formatted_trans, 
-                                  iid=trans[0])
+        self.refresh.register("transactions", load_transaction_list)
+        win.bind("<Destroy>", on_window_destroyed)
 
 
 
@@ -775,9 +734,7 @@ class ExpensesTrackerApp(tk.Tk):
 
         # to manage the functions
         def on_manage_close():
-            self.update_others_display(master_month)
-            self.load_data(self.current_sort_order)
-            self.plot_total_trend()
+            self.mark_changed(master_month, "total")
             win.grab_release()
             win.destroy()
         
@@ -785,6 +742,173 @@ class ExpensesTrackerApp(tk.Tk):
 
 
 
+    # searching every month's transactions by their description
+    def search_transactions_window(self):
+        win = tk.Toplevel(self)
+        win.title("🔍 Search Spending")
+        win.configure(bg=SECONDARY_COLOR)
+        win.resizable(False, False)
+
+        filter_frame = tk.LabelFrame(win,
+                                     text="🔍 Search Descriptions (words, \"exact phrase\", prefix*)",
+                                     bg=SECONDARY_COLOR,
+                                     fg=ACCENT_COLOR,
+                                     padx=10,
+                                     pady=10,
+                                     font=('Arial', 10, 'bold'))
+
+        filter_frame.pack(padx=15,
+                          pady=15,
+                          fill='x')
+
+        search_entry = tk.Entry(filter_frame,
+                                bg=PRIMARY_COLOR,
+                                fg=TEXT_COLOR,
+                                width=40,
+                                insertbackground=ACCENT_COLOR,
+                                font=('Arial', 11))
+        search_entry.grid(row=0, column=0, columnspan=4, padx=5, pady=5, sticky='ew')
+
+        all_categories = "All categories"
+        category_box = ttk.Combobox(filter_frame, values=[all_categories] + CATEGORIES, state='readonly', width=20)
+        category_box.set(all_categories)
+        category_box.grid(row=1, column=0, padx=5, pady=5, sticky='w')
+
+        tk.Label(filter_frame,
+                 text="From / To (YYYY-MM):",
+                 bg=SECONDARY_COLOR,
+                 fg=TEXT_COLOR).grid(row=1, column=1, padx=5, pady=5, sticky='e')
+
+        from_entry = tk.Entry(filter_frame, bg=PRIMARY_COLOR, fg=TEXT_COLOR, width=9, insertbackground=ACCENT_COLOR)
+        from_entry.grid(row=1, column=2, padx=5, pady=5)
+        to_entry = tk.Entry(filter_frame, bg=PRIMARY_COLOR, fg=TEXT_COLOR, width=9, insertbackground=ACCENT_COLOR)
+        to_entry.grid(row=1, column=3, padx=5, pady=5)
+
+        # how many results there are, or what is wrong with the search
+        search_status = tk.Label(filter_frame,
+                                 text="Double-click a result to open its month.",
+                                 bg=SECONDARY_COLOR,
+                                 fg=TEXT_COLOR,
+                                 anchor='w')
+        search_status.grid(row=2, column=0, columnspan=4, padx=5, sticky='ew')
+
+        list_frame = tk.Frame(win, bg=SECONDARY_COLOR)
+        list_frame.pack(padx=15,
+                        pady=(0, 15),
+                        fill='both',
+                        expand=True)
+
+        columns = ("Month", "Category", "Description", "Amount")
+
+        results_tree = ttk.Treeview(list_frame,
+                                    columns=columns,
+                                    show='headings',
+                                    height=12)
+
+        vsb = ttk.Scrollbar(list_frame,
+                            orient="vertical",
+                            command=results_tree.yview)
+
+        results_tree.configure(yscrollcommand=vsb.set)
+
+        vsb.pack(side='right', fill='y')
+
+        for col in columns:
+            results_tree.heading(col, text=col)
+        results_tree.column("Month", width=70, anchor='center')
+        results_tree.column("Category", width=130)
+        results_tree.column("Description", width=220)
+        results_tree.column("Amount", width=90, anchor='e')
+
+        results_tree.pack(side='left', fill='both', expand=True)
+
+        pending = [None] # the after() id of a search waiting for the typing to stop
+
+
+        # runs the search on a reader thread, a newer search replaces one that has not finished
+        def run_search():
+            pending[0] = None
+            if not win.winfo_exists():
+                return
+            text = search_entry.get()
+            if not text.strip():
+                results_tree.delete(*results_tree.get_children())
+                search_status.config(text="Double-click a result to open its month.", fg=TEXT_COLOR)
+                return
+
+            # while typing, the last word counts as the start of a word
+            if not text.endswith((' ', '"', '*')):
+                text += '*'
+            category = category_box.get()
+            category = None if category == all_categories else category
+            first_month = from_entry.get().strip() or None
+            last_month = to_entry.get().strip() or None
+
+            def on_done(hits):
+                if not win.winfo_exists():
+                    return
+                results_tree.delete(*results_tree.get_children())
+                for hit, values in zip(hits, format_rows([(hit.month, hit.category, hit.description or "", hit.amount)
+                                                          for hit in hits], (3,))):
+                    results_tree.insert('', tk.END, iid=hit.id, values=values)
+                if len(hits) >= SEARCH_LIMIT:
+                    search_status.config(text=f"Showing the {SEARCH_LIMIT} best matches, type more to narrow them down.",
+                                         fg=TEXT_COLOR)
+                else:
+                    search_status.config(text=f"{len(hits)} matching transaction(s).", fg=TEXT_COLOR)
+
+            def on_error(e):
+                if not win.winfo_exists():
+                    return
+                if isinstance(e, ValueError):
+                    search_status.config(text=str(e), fg=ERROR_COLOR)
+                else:
+                    messagebox.showerror("Database Error", f"Error searching transactions: {e}")
+
+            self.worker.read("search",
+                             lambda service: service.search_transactions(text, category, first_month, last_month),
+                             on_done=on_done, on_error=on_error)
+
+
+        # searching as you type, once the typing pauses
+        def schedule_search(event=None):
+            if pending[0] is not None:
+                win.after_cancel(pending[0])
+            pending[0] = win.after(SEARCH_DELAY_MS, run_search)
+
+
+        # opens the month of the double-clicked transaction in the form and its Manage Spending window
+        def open_month(event):
+            selected_item = results_tree.focus()
+            if not selected_item:
+                return
+            month = results_tree.item(selected_item, 'values')[0]
+            self.entries['month'].delete(0, tk.END)
+            self.entries['month'].insert(0, month)
+            self.refresh.mark("others", month)
+            self.manage_transactions_window()
+
+
+        search_entry.bind("<KeyRelease>", schedule_search)
+        search_entry.bind("<Return>", lambda event: run_search())
+        from_entry.bind("<KeyRelease>", schedule_search)
+        to_entry.bind("<KeyRelease>", schedule_search)
+        category_box.bind("<<ComboboxSelected>>", schedule_search)
+        results_tree.bind("<Double-1>", open_month)
+
+        # results are searched again after any change while the window is open
+        def on_window_destroyed(event):
+            if event.widget is win:
+                if pending[0] is not None:
+                    win.after_cancel(pending[0])
+                self.refresh.unregister("search", run_search)
+
+        self.refresh.register("search", run_search)
+        win.bind("<Destroy>", on_window_destroyed)
+        search_entry.focus_set()
+
+
+
 
 
     # USER INTERFACE COMPONENTS
@@ -868,6 +992,19 @@ class ExpensesTrackerApp(tk.Tk):
 
         self.entries['others'].config(state='readonly')
 
+        # Search Spending Button (every month's transactions)
+        tk.Button(entry_frame,
+                  text="🔍 Search Spending",
+                  command=self.search_transactions_window,
+                  bg=BUTTON_COLOR,
+                  fg=TEXT_COLOR,
+                  activebackground='#3A6E9E',
+                  activeforeground=TEXT_COLOR,
+                  font=('Arial', 10, 'bold'),
+                  relief="flat",
+                  padx=5,
+                  pady=3).pack(fill='x', pady=(5, 0))
+
         button_frame = tk.Frame(entry_frame, bg=SECONDARY_COLOR)
         button_frame.pack(fill='x', pady=(10, 0))
 
@@ -997,6 +1134,14 @@ class ExpensesTrackerApp(tk.Tk):
 
         tree_frame.grid_rowconfigure(0, weight=1)
         tree_frame.grid_columnconfigure(0, weight=1)
+
+        # the table only holds a few pages of rows and loads more while scrolling
+        self.expense_table = PagedTreeview(self.tree,
+                                           tree_vsb,
+                                           fetch_page=lambda after, before, limit: [],
+                                           key_of=expense_sort_key,
+                                           iid_of=lambda row: row[0],
+                                           format_rows=self.format_expense_rows)
         
         for col in columns:
             self.tree.heading(col, text=col)
@@ -1016,6 +1161,14 @@ class ExpensesTrackerApp(tk.Tk):
                  bg=PRIMARY_COLOR,
                  fg=TEXT_COLOR).pack(side=tk.LEFT)
 
+        # shows while the worker threads are busy
+        self.loading_label = tk.Label(graph_control_frame,
+                                      text="",
+                                      font=('Arial', 10, 'italic'),
+                                      bg=PRIMARY_COLOR,
+                                      fg=ACCENT_COLOR)
+        self.loading_label.pack(side=tk.LEFT, padx=10)
+
 
         # Total Trend Button 
         tk.Button(graph_control_frame,
@@ -1035,11 +1188,21 @@ class ExpensesTrackerApp(tk.Tk):
                   relief='flat').pack(side=tk.RIGHT, 
                                       padx=5)
 
+        # Category Trend Button (stacked spending per category)
+        tk.Button(graph_control_frame,
+                  text="Category Trend",
+                  command=self.plot_category_trend,
+                  bg=BUTTON_COLOR,
+                  fg=TEXT_COLOR,
+                  relief='flat').pack(side=tk.RIGHT,
+                                      padx=5)
+
 
         self.graph_frame = tk.Frame(display_frame, bg=PRIMARY_COLOR)
         self.graph_frame.pack(fill='both', 
                               expand=True, 
                               padx=5)
+        self.chart = None # created by the first plot
 
 
     # create sorting on the table for better readability
@@ -1078,6 +1241,26 @@ class ExpensesTrackerApp(tk.Tk):
         sort_menu.config(style='Sort.TMenubutton')
         sort_menu.pack(side=tk.LEFT, fill='x', expand=True, padx=(0, 5))
 
+        # months shown in the table and the charts: a preset or a typed range (2024, 2024-Q2, 2024-01..2024-06)
+        tk.Label(sort_frame,
+                 text="Months:",
+                 bg=PRIMARY_COLOR,
+                 fg=TEXT_COLOR).pack(side=tk.LEFT, padx=(5, 5))
+
+        self.range_box = ttk.Combobox(sort_frame, values=RANGE_PRESETS, width=16)
+        self.range_box.set(ALL_MONTHS_TEXT)
+        self.range_box.pack(side=tk.LEFT, padx=(0, 5))
+        self.range_box.bind("<<ComboboxSelected>>", lambda event: self.apply_period_range(self.range_box.get()))
+        self.range_box.bind("<Return>", lambda event: self.apply_period_range(self.range_box.get()))
+
+        # the months the range came out to, e.g. "2024-01 to 2024-06"
+        self.range_label = tk.Label(sort_frame,
+                                    text="",
+                                    font=('Arial', 9, 'italic'),
+                                    bg=PRIMARY_COLOR,
+                                    fg=ACCENT_COLOR)
+        self.range_label.pack(side=tk.LEFT, padx=(0, 5))
+
 
 
 
@@ -1096,173 +1279,96 @@ class ExpensesTrackerApp(tk.Tk):
              self.sort_var.set("🗓️ Sort by Latest Month")
 
 
+    # DATE RANGE
+    def apply_period_range(self, text):
+        # resolved on a reader thread ("last N months" needs the newest month), then the table and
+        # the chart reload with only the months in the range
+        def on_done(period_range):
+            self.set_period_range(text, period_range)
+            self.load_data(self.current_sort_order) # back to the first page
+            self.refresh.mark("chart", self.chart.view if self.chart is not None else "total")
+
+        def on_error(e):
+            if isinstance(e, ValueError):
+                messagebox.showwarning("Date Range", str(e))
+            else:
+                messagebox.showerror("Database Error", f"Error reading the date range: {e}")
+
+        self.worker.read("period range", lambda service: service.resolve_range(text),
+                         on_done=on_done, on_error=on_error)
+
+
+    def move_period_range(self, view):
+        # after a write with "last N months" shown: resolve it again (the newest month may have
+        # changed), then the table and the chart refresh once, through the scheduler
+        text = self.range_text
+
+        def on_done(period_range):
+            if self.range_text == text: # not replaced by another range in the meantime
+                self.set_period_range(text, period_range)
+            self.refresh.mark("table")
+            self.refresh.mark("chart", view)
+
+        def on_error(e):
+            messagebox.showerror("Database Error", f"Error reading the date range: {e}")
+
+        self.worker.read("moved period range", lambda service: service.resolve_range(text),
+                         on_done=on_done, on_error=on_error)
+
+
+    def set_period_range(self, text, period_range):
+        self.period_range = period_range
+        self.range_text = text
+        self.range_label.config(text=period_range.describe() if period_range is not None else "")
+
+
 
 
 
     # DATA VISUALIZATION
-    def _get_data_for_graph(self):
-        # get data in db for graph (trend analysis)
-        conn = self.get_db_connection() 
-        cursor = conn.cursor()
-        cursor.execute("SELECT month, water, electricity, others, total FROM expenses ORDER BY month ASC")
-        data = cursor.fetchall()
-        conn.close()
-        return data
+    def _get_data_for_graph(self, service, view="total", period_range=None):
+        # get data in db for graph (trend analysis), runs on a reader thread. only the months in
+        # period_range are read. the category view needs the category x month matrix instead of the monthly rows
+        if view == "categories":
+            return None, service.get_category_matrix(period_range)
+        return service.get_trend_data(period_range), None
 
 
     # plotting the graph of total trend
+    @PROFILER.stage("ui: plot_total_trend")
     def plot_total_trend(self):
-        data = self._get_data_for_graph() # gets the function for plotting/graphing
-        
-        for widget in self.graph_frame.winfo_children():
-            widget.destroy()
-
-        # if theres no data...
-        if not data:
-            tk.Label(self.graph_frame,
-                     text="There is no data for the graph. Save a few months to see trends!",
-                     bg=PRIMARY_COLOR,
-                     fg=TEXT_COLOR,
-                     font=('Arial', 10, 'italic')).pack(pady=20)
-            return
-
-        months = [row[0] for row in data]
-        total_costs = [row[4] for row in data]
-
-
-        # creating line graphs for total monthtly expenses
-        plt.style.use('dark_background')
-        fig, ax = plt.subplots(figsize=(6.5, 4.2), dpi=100)
-
-        ax.plot(months, 
-                total_costs, 
-                marker='o', 
-                color=GRAPH_COLORS['Total'], 
-                linewidth=3)
-
-        fig.patch.set_facecolor(PRIMARY_COLOR)
-        ax.set_facecolor(SECONDARY_COLOR)
-        ax.tick_params(axis='x', colors=TEXT_COLOR)
-        ax.tick_params(axis='y', colors=TEXT_COLOR)
-        ax.spines['right'].set_visible(False)
-        ax.spines['top'].set_visible(False)
-        ax.set_xlabel("Month", color=TEXT_COLOR)
-        ax.set_ylabel("Total Expenses (₱)", color=TEXT_COLOR)
-        ax.grid(axis='y', linestyle='--', alpha=0.5, color=BUTTON_COLOR)
-
-        ax.set_title("Total Monthly Expenses Trend",
-                     color=TEXT_COLOR,
-                     fontsize=12,
-                     fontweight='bold')
-
-        if len(months) > 6:
-             plt.xticks(months, 
-                        rotation=45, 
-                        ha='right', 
-                        fontsize=8)
-        else:
-             plt.xticks(months, 
-                        rotation=0, 
-                        fontsize=10)
-        
-        plt.tight_layout()
-
-        canvas = FigureCanvasTkAgg(fig, master=self.graph_frame)
-        canvas_widget = canvas.get_tk_widget()
-        canvas_widget.pack(fill=tk.BOTH, expand=True)
-        canvas.draw()
+        self.show_trend("total")
 
 
     # create a line graph in breakdown trend 
+    @PROFILER.stage("ui: plot_breakdown_trend")
     def plot_breakdown_trend(self):
-        data = self._get_data_for_graph() # gets the function to create/plot graph
-        
-        for widget in self.graph_frame.winfo_children():
-            widget.destroy()
-
-        # if theres no data...
-        if not data:
-            tk.Label(self.graph_frame,
-                     text="There is no data for the graph. Save a few months to see trends!",
-                     bg=PRIMARY_COLOR,
-                     fg=TEXT_COLOR,
-                     font=('Arial', 10, 'italic')).pack(pady=20)
-            return
+        self.show_trend("breakdown")
 
-        months = [row[0] for row in data]
-        water_costs = [row[1] for row in data]
-        electricity_costs = [row[2] for row in data]
-        others_costs = [row[3] for row in data]
-
-        # creating line graphs for breakdown trend
-        plt.style.use('dark_background')
-        fig, ax = plt.subplots(figsize=(6.5, 4.2), dpi=100)
-
-        ax.plot(months, 
-                water_costs, 
-                marker='.', 
-                color=GRAPH_COLORS['Water'], 
-                linewidth=2, 
-                label='Water')
-        
-        ax.plot(months, 
-                electricity_costs, 
-                marker='.', 
-                color=GRAPH_COLORS['Electricity'], 
-                linewidth=2, 
-                label='Electricity')
-        
-        ax.plot(months, 
-                others_costs, 
-                marker='.', 
-                color=GRAPH_COLORS['Others'], 
-                linewidth=2, 
-                label='Others')
-        
-        fig.patch.set_facecolor(PRIMARY_COLOR)
-        ax.set_facecolor(SECONDARY_COLOR)
-        ax.tick_params(axis='x', colors=TEXT_COLOR)
-        ax.tick_params(axis='y', colors=TEXT_COLOR)
-        ax.spines['right'].set_visible(False)
-        ax.spines['top'].set_visible(False)
-        ax.set_xlabel("Month", color=TEXT_COLOR)
-        ax.set_ylabel("Cost (₱)", color=TEXT_COLOR)
-        ax.grid(axis='y', linestyle='--', alpha=0.5, color=BUTTON_COLOR)
-
-
-        ax.legend(loc='upper left', 
-                  bbox_to_anchor=(1.0, 1.0), 
-                  facecolor=PRIMARY_COLOR, 
-                  edgecolor=TEXT_COLOR, 
-                  labelcolor=TEXT_COLOR, 
-                  ncol=1,
-                  fontsize=8)
-
-        ax.set_title("Monthly Breakdown Trend (Utilities & Others)",
-                     color=TEXT_COLOR,
-                     fontsize=12,
-                     fontweight='bold')
-
-        if len(months) > 6:
-             plt.xticks(months, 
-                        rotation=45, 
-                        ha='right', 
-                        fontsize=8)
-        else:
-             plt.xticks(months, 
-                        rotation=0, 
-                        fontsize=10)
-        
-        plt.tight_layout(rect=[0, 0, 1.03, 1])
 
-        canvas = FigureCanvasTkAgg(fig, master=self.graph_frame)
-        canvas_widget = canvas.get_tk_widget()
-        canvas_widget.pack(fill=tk.BOTH, expand=True)
-        canvas.draw()
+    # stacked area of the spending per category
+    @PROFILER.stage("ui: plot_category_trend")
+    def plot_category_trend(self):
+        self.show_trend("categories")
+
+
+    # the chart is created once and only its data is swapped afterwards
+    @PROFILER.stage("ui: show_trend")
+    def show_trend(self, view):
+        if self.chart is None:
+            from chart_view import BackgroundTrendChart # already loaded by preload_plotting most of the time
+            self.chart = BackgroundTrendChart(self.graph_frame, self.worker, figsize=(6.5, 4.2), dpi=100)
+        self.chart.view = view
+
+        # query on a reader thread, then the chart is drawn on the render thread
+        period_range = self.period_range
+        self.worker.read("chart data", lambda service: self._get_data_for_graph(service, view, period_range),
+                         on_done=lambda data: self.chart.update(data[0], view, data[1]))
 
 
     def plot_graph_data(self):
-        self.plot_total_trend()
+        # redraws whichever trend is currently shown
+        self.show_trend(self.chart.view if self.chart is not None else "total")
 
 
 
@@ -1273,140 +1379,88 @@ class ExpensesTrackerApp(tk.Tk):
         data = {key: self.entries[key].get() for key in self.entries}
 
         try:
-            month = data['month'].strip()
-            
-            # error handling if not valid month format
-            if not is_valid_month_format(month):
-                raise ValueError("Month format is incorrect (must be YYYY-MM).")
-
-            water_str = clean_currency_input(data['water'])
-            electricity_str = clean_currency_input(data['electricity'])
-            
-            water = float(water_str) if water_str else 0.0
-            electricity = float(electricity_str) if electricity_str else 0.0
-            
-            if water < 0 or electricity < 0:
-                raise ValueError("Bills must be non-negative numbers.")
+            # error handling if not valid month format or negative bills
+            month, water, electricity = self.service.parse_bills(data['month'], data['water'], data['electricity'])
 
         except ValueError as e: # error handling if user types str etc...
             messagebox.showerror("Input Error", f"Wrong Input: {e}.")
             return
 
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
+        # the checks read the database, so they run in the background too
+        self.worker.read("prepare expense",
+                         lambda service: service.prepare_new_expense(month, water, electricity),
+                         on_done=self._confirm_and_save_expense,
+                         on_error=lambda e: self._show_prepare_error(e, month))
 
+
+    def _show_prepare_error(self, e, month):
         # if the user inputs same month with data
-        cursor.execute("SELECT total FROM expenses WHERE month=?", (month,))
-        if cursor.fetchone():
-            conn.close()
+        if isinstance(e, DuplicateMonthError):
             messagebox.showerror("Error", f"There is already a record for the month '{month}'. Please use the '✏️ EDIT RECORD' button if you wish to update it.")
-            return
-
-        cursor.execute("SELECT SUM(amount) FROM transactions WHERE month=?", (month,))
-        calculated_others = cursor.fetchone()[0] or 0.0
-        others = calculated_others
-        total = water + electricity + others
 
         # if no inputed all data entries 
-        if total == 0.0:
+        elif isinstance(e, EmptyExpenseError):
             messagebox.showerror(
                 "Missing Data Warning",
                 "⚠️ No expenses recorded!\n\nPlease input the Water Bill, Electricity Bill, or add 'Other Expenses' before saving the record."
             )
-            conn.close()
-            return
 
-        # conditionals which data entries is zero
-        zero_fields = []
-        if water == 0.0: zero_fields.append("Water Bill")
-        if electricity == 0.0: zero_fields.append("Electricity Bill")
-        if others == 0.0: zero_fields.append("'Other Expenses' (Categorized Spending)")
+        else:
+            messagebox.showerror("Database Error", f"An unexpected error occurred during save: {e}")
+
 
+    def _confirm_and_save_expense(self, draft):
         # if the user not inputed either one in the data entries
-        if zero_fields:
+        if draft.zero_fields:
             warning_message_zero = (
                 "⚠️ ZERO INPUT DETECTED!\n\n"
                 "One or more expense fields were recorded as zero:\n"
-                f"{', '.join(zero_fields)}\n\n"
+                f"{', '.join(draft.zero_fields)}\n\n"
                 "Do you want to continue and save the record with these zero values?"
             )
             if not messagebox.askyesno("Confirm Zero Input", warning_message_zero):
-                conn.close()
                 return 
 
-        cursor.execute("SELECT total, water, electricity, others FROM expenses ORDER BY month DESC LIMIT 1")
-        last_month_data = cursor.fetchone()
+        self.worker.write(("expense", draft.month),
+                          lambda service: service.save_expense(draft),
+                          on_done=lambda comparison: self._after_save_expense(draft.month, comparison),
+                          # in case theres some exception errors
+                          on_error=lambda e: messagebox.showerror("Database Error", f"An unexpected error occurred during save: {e}"))
 
-        # pop up warning message if the total is increasing compared to last month
-        comparison_warning_message = ""
-        sdg_tip = SDG_TIPS["default"]
 
-        if last_month_data:
-            last_month_total = last_month_data[0]
-            
-            if total > last_month_total:
-                difference = total - last_month_total
-                comparison_warning_message = f"⚠️ WARNING! Save money! Your total expenses are high (₱{total:.2f}) compared to the previous month (₱{last_month_total:.2f}).\n\nIt increased by ₱{difference:.2f}. Save now!"
+    def _after_save_expense(self, month, comparison):
+        # the views redraw behind the message boxes
+        self.mark_changed(chart_view="total")
 
-                increases = {
-                    "water": water - (last_month_data[1] or 0),
-                    "electricity": electricity - (last_month_data[2] or 0),
-                    "others": others - (last_month_data[3] or 0)
-                }
+        total = comparison.total
+        last_month_total = comparison.last_total
 
-                max_increase_category = max(increases, key=lambda k: increases[k])
+        # pop up warning message if the total is increasing compared to last month (with SDG tips on how to save)
+        if comparison.status == "increase":
+            comparison_warning_message = f"⚠️ WARNING! Save money! Your total expenses are high (₱{total:.2f}) compared to the previous month (₱{last_month_total:.2f}).\n\nIt increased by ₱{comparison.difference:.2f}. Save now!"
+            comparison_warning_message += f"\n\n{comparison.sdg_tip.upper()}"
+            messagebox.showwarning("Expense Warning & SDG Tip", comparison_warning_message)
 
-                if increases[max_increase_category] > 0:
-                    sdg_tip = SDG_TIPS[max_increase_category]
+        # if total decreased than last month, it congratulates you..
+        elif comparison.status == "decrease":
+            messagebox.showinfo(
+                "🎉 Congratulations! You saved!",
+                f"Your total expenses have decreased (₱{total:.2f}) compared to the previous month (₱{last_month_total:.2f}).\n\nKeep saving!"
+            )
 
-                comparison_warning_message += f"\n\n{sdg_tip.upper()}"
-            
-            # if total decreased than last month, it congratulates you..
-            elif total < last_month_total:
-                messagebox.showinfo(
-                    "🎉 Congratulations! You saved!",
-                    f"Your total expenses have decreased (₱{total:.2f}) compared to the previous month (₱{last_month_total:.2f}).\n\nKeep saving!"
-                )
+        elif comparison.status == "first":
+            messagebox.showinfo("Success!!", f"Expenses saved for {month}!")
         
-        try:
-            cursor.execute("""
-                INSERT INTO expenses (month, water, electricity, others, total) 
-                VALUES (?, ?, ?, ?, ?)
-            """, (month, water, electricity, others, total))
-
-            conn.commit()
-
-            # if the total is increased than last month, it shows SDG tips on how to save expenses else, it saves the total expenses..
-            if comparison_warning_message:
-                messagebox.showwarning("Expense Warning & SDG Tip", comparison_warning_message)
-            elif not last_month_data:
-                messagebox.showinfo("Success!!", f"Expenses saved for {month}!")
-            
-            for key in ['water', 'electricity']:
-                self.entries[key].delete(0, tk.END)
-
-            self.load_data(self.current_sort_order)
-            self.plot_total_trend()
-
-        except Exception as e: # in case theres some exception errors
-             messagebox.showerror("Database Error", f"An unexpected error occurred during save: {e}")
-
-        conn.close()
+        for key in ['water', 'electricity']:
+            self.entries[key].delete(0, tk.END)
 
     
     def edit_expense(self):
         data = {key: self.entries[key].get() for key in self.entries}
 
         try:
-            month = data['month'].strip()
-            water = float(clean_currency_input(data['water'] or 0))
-            electricity = float(clean_currency_input(data['electricity'] or 0))
-
-            # checks if it is not invalid format or equals to zero or a negative number
-            if not is_valid_month_format(month):
-                raise ValueError("Month format is incorrect (must be YYYY-MM).")
-            if water < 0 or electricity < 0:
-                 raise ValueError("Bills must be non-negative numbers.")
+            # checks if it is not invalid format or a negative number
+            month, water, electricity = self.service.parse_bills(data['month'], data['water'], data['electricity'])
 
         except ValueError as e: # in case the users input is wrong
             messagebox.showerror("Input Error", f"Wrong Input: {e}. Bills must be valid numbers.")
@@ -1425,40 +1479,23 @@ class ExpensesTrackerApp(tk.Tk):
             messagebox.showwarning("Month Mismatch", "The Month field must match the month of the selected record to update it.")
             return
 
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-
-        # if successful, the data will be sent to db and appear in the table transaction
-        cursor.execute("SELECT SUM(amount) FROM transactions WHERE month=?", (month,))
-        others = cursor.fetchone()[0] or 0.0
-        total = water + electricity + others
-
-        try:
-            cursor.execute("""
-                UPDATE expenses 
-                SET water=?,
-                electricity=?, 
-                others=?, 
-                total=? 
-                WHERE month=?
-            """, (water, electricity, others, total, month))
-
-            if cursor.rowcount == 0:
-                messagebox.showerror("Error", f"No record found for the month '{month}' to update.")
-                conn.close()
-                return
-
-            conn.commit()
+        def on_done(row):
+            # the views redraw behind the message box
+            self.mark_changed(chart_view="total")
             messagebox.showinfo("Success!!", f"Expenses updated for {month}!")
 
             self.clear_entries()
-            self.load_data(self.current_sort_order)
-            self.plot_total_trend() 
 
-        except Exception as e: # in case theres some exception error because of user
-            messagebox.showerror("Database Error", f"Error updating record: {e}")
+        def on_error(e):
+            if isinstance(e, RecordNotFoundError):
+                messagebox.showerror("Error", f"No record found for the month '{month}' to update.")
+            else: # in case theres some exception error because of user
+                messagebox.showerror("Database Error", f"Error updating record: {e}")
 
-        conn.close()
+        # if successful, the data will be sent to db and appear in the table transaction
+        self.worker.write(("expense", month),
+                          lambda service: service.update_expense(month, water, electricity),
+                          on_done=on_done, on_error=on_error)
 
 
     def delete_expense(self):
@@ -1473,42 +1510,44 @@ class ExpensesTrackerApp(tk.Tk):
 
         # pops up a warning message if the user surely wants to delete that transaction
         if messagebox.askyesno("Confirm Delete", f"⚠️ Are you sure you want to delete the record for {month_to_delete}?\n\nThis will permanently delete the monthly totals AND all categorized transactions associated with this month."):
-            conn = self.get_db_connection()
-            cursor = conn.cursor()
 
-            # when the user confirmed, the database deletes the data in the transaction table
-            try:
-                cursor.execute("DELETE FROM transactions WHERE month=?", (month_to_delete,))
-                cursor.execute("DELETE FROM expenses WHERE month=?", (month_to_delete,))
-                conn.commit()
-                
+            def on_done(deleted):
+                # the views redraw behind the message box
+                self.mark_changed(chart_view="total")
                 messagebox.showinfo("Success!!", f"Expenses have been cleared for {month_to_delete}.")
 
                 self.clear_entries()
-                self.load_data(self.current_sort_order)
-                self.plot_total_trend()
 
-            except Exception as e: # in case theres some error occured 
-                messagebox.showerror("Database Error", f"Error deleting record: {e}")
-            finally:
-                conn.close()
+            # when the user confirmed, the database deletes the data in the transaction table
+            self.worker.write(("expense", month_to_delete),
+                              lambda service: service.delete_expense(month_to_delete),
+                              on_done=on_done,
+                              # in case theres some error occured 
+                              on_error=lambda e: messagebox.showerror("Database Error", f"Error deleting record: {e}"))
 
 
 
 
 
 # APPLICATION LAUNCHER
+def preload_plotting():
+    # matplotlib takes a second or more to import, so it loads while the user types the password
+    import chart_view
+
+
 def start_app():
 
     # starts the app
-    def start_main_tracker(): 
-        app = ExpensesTrackerApp(start_app)
+    def start_main_tracker(user_id): 
+        app = ExpensesTrackerApp(start_app, user_id)
         app.mainloop()
 
     login_app = LoginWindow(start_main_tracker)
+    threading.Thread(target=preload_plotting, name="preload-plotting", daemon=True).start()
     login_app.mainloop()
 
 
 if __name__ == "__main__":
+    atexit.register(close_all_pools)  # closes the pooled connections on exit
     setup_database()  # Ensures database ready
     start_app()  # Launches application
\ No newline at end of file
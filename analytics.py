@@ -0,0 +1,278 @@
+# IMPORTED EXTENSIONS
+import argparse
+import numpy as np # comes with matplotlib
+from db_connection import DB_FILE, get_connection, close_all_pools # pooled database connections
+from migrations import migrate # versioned database schema
+from expense_service import ExpenseService, ExpenseRepository, CATEGORIES
+from money import CENTS_PER_PESO
+from query_cache import ALL_MONTHS
+
+# whole-history statistics on NumPy columns instead of row-by-row python.
+# the ledger is read once into MonthlyColumns (one array per column, one slot per
+# calendar month from the first to the last month, NaN where a month has no record)
+# and that load is cached in the service's query cache, so any write drops it.
+# the sums come out of SQLite in exact centavos; the arrays hold pesos as floats,
+# which is fine for statistics (nothing here is ever written back).
+
+
+
+# ANALYTICS SETTINGS
+ROLLING_WINDOWS = (3, 12) # months
+PERCENTILES = (10, 25, 50, 75, 90)
+VALUE_COLUMNS = ("water", "electricity", "others", "total")
+
+
+
+
+
+# COLUMNS
+class MonthlyColumns:
+    # months[i] is a numpy datetime64[M]; every other array is aligned with it
+    def __init__(self, months, columns, category_totals, present):
+        self.months = months
+        self.columns = columns # name -> float array of pesos (NaN for missing months)
+        self.category_totals = category_totals # (months, len(CATEGORIES)) array of sums in pesos
+        self.present = present # True where the month has an expenses record
+
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+
+    def __len__(self):
+        return len(self.months)
+
+
+    def month_labels(self):
+        return np.datetime_as_string(self.months, unit='M')
+
+
+def _month_numbers(months):
+    # "YYYY-MM" strings -> months since 1970-01 (int array)
+    return np.array(months, dtype='datetime64[M]').astype(np.int64)
+
+
+def build_columns(expense_rows, category_rows):
+    # expense_rows: (month, water, electricity, others, total); category_rows: (month, category, amount sum);
+    # amounts in centavos
+    expense_months = _month_numbers([row[0] for row in expense_rows]) if expense_rows else np.array([], dtype=np.int64)
+    category_months = _month_numbers([row[0] for row in category_rows]) if category_rows else np.array([], dtype=np.int64)
+
+    every_month = np.concatenate([expense_months, category_months])
+    if not len(every_month):
+        empty = np.array([], dtype=float)
+        return MonthlyColumns(np.array([], dtype='datetime64[M]'), {name: empty for name in VALUE_COLUMNS},
+                              np.zeros((0, len(CATEGORIES))), np.array([], dtype=bool))
+
+    first = every_month.min()
+    length = int(every_month.max() - first) + 1
+    months = (np.arange(length) + first).astype('datetime64[M]')
+
+    present = np.zeros(length, dtype=bool)
+    present[expense_months - first] = True
+
+    values = np.array([row[1:5] for row in expense_rows], dtype=np.int64).reshape(-1, 4) / CENTS_PER_PESO
+    columns = {}
+    for index, name in enumerate(VALUE_COLUMNS):
+        column = np.full(length, np.nan)
+        column[expense_months - first] = values[:, index]
+        columns[name] = column
+
+    category_totals = np.zeros((length, len(CATEGORIES)))
+    if category_rows:
+        category_index = {category: index for index, category in enumerate(CATEGORIES)}
+        positions = np.array([category_index.get(row[1], -1) for row in category_rows])
+        amounts = np.array([row[2] for row in category_rows], dtype=np.int64) / CENTS_PER_PESO
+        known = positions >= 0
+        np.add.at(category_totals, (category_months[known] - first, positions[known]), amounts[known])
+
+    return MonthlyColumns(months, columns, category_totals, present)
+
+
+def load_columns(service):
+    # one read for the whole ledger, then cached until the next write
+    def load():
+        # the trigger kept category rollups instead of a GROUP BY over every transaction
+        return build_columns(service.get_trend_data(), service.get_category_rollups())
+
+    return service.cache.get_or_load("analytics columns", ALL_MONTHS, (), load)
+
+
+
+
+
+# VECTORIZED STATISTICS (every function takes and returns numpy arrays aligned with the months)
+def _windows(values, window):
+    # (len - window + 1, window) view of the trailing windows, no copy
+    return np.lib.stride_tricks.sliding_window_view(values, window)
+
+
+def rolling_mean(values, window):
+    # mean of the last "window" months, NaN until the window is full or when a month inside it is missing
+    values = np.asarray(values, dtype=float)
+    result = np.full(len(values), np.nan)
+    if window <= 0 or len(values) < window:
+        return result
+    result[window - 1:] = _windows(values, window).mean(axis=1)
+    return result
+
+
+def rolling_std(values, window):
+    values = np.asarray(values, dtype=float)
+    result = np.full(len(values), np.nan)
+    if window <= 1 or len(values) < window:
+        return result
+    result[window - 1:] = _windows(values, window).std(axis=1, ddof=1)
+    return result
+
+
+def change(values, lag):
+    # (difference, percent) against "lag" months earlier; NaN when either month is missing
+    values = np.asarray(values, dtype=float)
+    difference = np.full(len(values), np.nan)
+    percent = np.full(len(values), np.nan)
+    if lag < len(values):
+        difference[lag:] = values[lag:] - values[:-lag]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent[lag:] = np.where(values[:-lag] != 0, difference[lag:] / values[:-lag] * 100, np.nan)
+    return difference, percent
+
+
+def month_over_month(values):
+    return change(values, 1)
+
+
+def year_over_year(values):
+    return change(values, 12)
+
+
+def percentiles(values, points=PERCENTILES):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {point: None for point in points}
+    return dict(zip(points, np.percentile(values, points).tolist()))
+
+
+def percentile_rank(values, value):
+    # share of the recorded months that cost less than "value" (0-100)
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if not len(values) or value is None or np.isnan(value):
+        return None
+    return float((values < value).mean() * 100)
+
+
+def category_shares(category_totals):
+    # per month share of each category (rows sum to 1, months without transactions are NaN)
+    month_sums = category_totals.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(month_sums > 0, category_totals / month_sums, np.nan)
+
+
+def overall_category_shares(category_totals):
+    totals = category_totals.sum(axis=0)
+    grand_total = totals.sum()
+    return {category: (float(total / grand_total) if grand_total else 0.0)
+            for category, total in zip(CATEGORIES, totals)}
+
+
+def volatility(values, window=12):
+    # rolling standard deviation of the month-over-month % change
+    _, percent = month_over_month(values)
+    return rolling_std(percent, window)
+
+
+def coefficient_of_variation(values):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) < 2 or values.mean() == 0:
+        return None
+    return float(values.std(ddof=1) / values.mean())
+
+
+
+
+
+# INSIGHTS (plain python values, ready to show)
+def _number(value):
+    return None if value is None or np.isnan(value) else float(value)
+
+
+def insights(columns, column="total"):
+    # the latest recorded month against the whole history
+    if not columns.present.any():
+        return None
+
+    values = columns[column]
+    latest = int(np.flatnonzero(columns.present)[-1])
+    mom_difference, mom_percent = month_over_month(values)
+    yoy_difference, yoy_percent = year_over_year(values)
+
+    result = {
+        "month": str(columns.month_labels()[latest]),
+        "value": _number(values[latest]),
+        "months_recorded": int(columns.present.sum()),
+        "month_over_month": _number(mom_difference[latest]),
+        "month_over_month_percent": _number(mom_percent[latest]),
+        "year_over_year": _number(yoy_difference[latest]),
+        "year_over_year_percent": _number(yoy_percent[latest]),
+        "percentile_rank": percentile_rank(values, values[latest]),
+        "percentiles": percentiles(values),
+        "volatility": _number(volatility(values)[latest]),
+        "coefficient_of_variation": coefficient_of_variation(values),
+        "category_shares": overall_category_shares(columns.category_totals),
+    }
+    for window in ROLLING_WINDOWS:
+        result[f"rolling_mean_{window}"] = _number(rolling_mean(values, window)[latest])
+    return result
+
+
+def format_insights(result):
+    if result is None:
+        return "No expenses recorded yet."
+
+    def money(value):
+        return "-" if value is None else f"₱{value:,.2f}"
+
+    def percent(value):
+        return "-" if value is None else f"{value:+.1f}%"
+
+    lines = [f"Latest month {result['month']}: {money(result['value'])} "
+             f"({result['months_recorded']} months recorded)",
+             f"  vs last month:  {money(result['month_over_month'])} ({percent(result['month_over_month_percent'])})",
+             f"  vs a year ago:  {money(result['year_over_year'])} ({percent(result['year_over_year_percent'])})"]
+    for window in ROLLING_WINDOWS:
+        lines.append(f"  {window}-month average: {money(result[f'rolling_mean_{window}'])}")
+    if result["percentile_rank"] is not None:
+        lines.append(f"  costlier than {result['percentile_rank']:.0f}% of all recorded months")
+    lines.append("  percentiles: " + ", ".join(f"p{point} {money(value)}" for point, value in result["percentiles"].items()))
+    if result["volatility"] is not None:
+        lines.append(f"  volatility (12-month std of monthly % change): {result['volatility']:.1f}")
+    lines.append("  category shares: " + ", ".join(f"{category} {share:.0%}"
+                                                   for category, share in sorted(result["category_shares"].items(),
+                                                                                 key=lambda item: -item[1])))
+    return "\n".join(lines)
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Whole-history statistics of the expenses ledger.")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--column", choices=VALUE_COLUMNS, default="total")
+    parser.add_argument("--user", default="admin", help="whose ledger to analyse")
+    args = parser.parse_args()
+
+    with get_connection(args.db) as setup_conn:
+        migrate(setup_conn)
+
+    try:
+        repository = ExpenseRepository(args.db)
+        user = repository.get_user(args.user)
+        if user is None:
+            parser.error(f"unknown user '{args.user}'")
+        print(format_insights(insights(load_columns(ExpenseService(repository.for_user(user[0]))), args.column)))
+    finally:
+        close_all_pools()
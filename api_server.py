@@ -0,0 +1,472 @@
+# IMPORTED EXTENSIONS
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+from db_connection import DB_FILE, ConnectionPool, get_connection, close_all_pools # pooled database connections
+from migrations import migrate # versioned database schema
+from expense_service import (ExpenseService, ExpenseRepository, CATEGORIES, SORT_KEYS, # headless data layer
+                             InputError, DuplicateMonthError, EmptyExpenseError, RecordNotFoundError,
+                             expense_sort_key, transaction_sort_key)
+from instrumentation import PROFILER # opt-in timings (EXPENSES_PROFILE=1)
+from money import json_ready # amounts go out as pesos
+
+# local HTTP/JSON service over the same database the desktop app uses, so other
+# tools never have to open the SQLite file themselves and race the GUI.
+# the event loop only parses requests and writes responses; every query runs on a
+# small pool of reader threads (one connection each) and every write on ONE writer
+# thread with its own connection, so writes are serialized like in the app.
+# requests authenticate with HTTP Basic (the app's username and password) and only
+# ever see that user's ledger.
+
+
+
+# SERVER SETTINGS
+HOST = "127.0.0.1" # local only, there is no TLS
+PORT = 8765
+READ_THREADS = 4 # reader threads, each with its own connection
+MAX_IN_FLIGHT = 256 # database jobs queued or running at once, later requests wait their turn
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADER_BYTES = 16 * 1024
+KEEPALIVE_SECONDS = 15 # idle connections are closed after this
+MAX_PAGE_SIZE = 1000
+CURSOR_TYPES = {"month": str, "total": int, "id": int} # what each sort column holds inside a cursor
+
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+               405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+               422: "Unprocessable Entity", 500: "Internal Server Error"}
+
+log = logging.getLogger("expenses.api")
+
+
+
+
+
+# ERRORS (raised by the handlers, turned into JSON error responses)
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def error_status(error):
+    # the service's errors mapped to HTTP statuses (order matters, they are all ValueErrors)
+    if isinstance(error, HTTPError):
+        return error.status
+    if isinstance(error, RecordNotFoundError):
+        return 404
+    if isinstance(error, DuplicateMonthError):
+        return 409
+    if isinstance(error, EmptyExpenseError):
+        return 422
+    if isinstance(error, (InputError, ValueError, ArithmeticError, KeyError, TypeError)):
+        return 400
+    return 500
+
+
+
+
+
+# REQUEST HELPERS (run on the worker threads)
+def _page_size(query):
+    try:
+        limit = int(query.get("limit", 100))
+    except ValueError:
+        raise HTTPError(400, "limit must be a number.")
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _cursor(query, name, columns):
+    # keyset cursors travel as the JSON list the previous page returned in "next"/"previous",
+    # one value per sort column (a total inside a cursor is in centavos, send it back as it came)
+    if name not in query:
+        return None
+    try:
+        key = json.loads(query[name])
+    except ValueError:
+        raise HTTPError(400, f"{name} must be a JSON list.")
+    if not isinstance(key, list):
+        raise HTTPError(400, f"{name} must be a JSON list.")
+    if len(key) != len(columns) or any(isinstance(value, bool) or not isinstance(value, CURSOR_TYPES[column])
+                                       for column, value in zip(columns, key)):
+        raise HTTPError(400, f"{name} must be a [{', '.join(columns)}] list like the one the last page returned.")
+    return tuple(key)
+
+
+def _period_range(service, query):
+    # ?range=2024-Q2 (anything periods.parse_range reads) or ?from=&to=, ?year=&quarter=, ?last=N
+    return service.resolve_range(query.get("range"), query.get("from"), query.get("to"),
+                                 query.get("year"), query.get("quarter"), query.get("last"))
+
+
+def _range_json(period_range):
+    # the months a range came out to ("last 6" depends on the newest month), null for every month
+    if period_range is None:
+        return None
+    return {"from": period_range.first_month, "to": period_range.last_month}
+
+
+def _field(body, name, default=None):
+    if not isinstance(body, dict):
+        raise HTTPError(400, "The request body must be a JSON object.")
+    value = body.get(name, default)
+    return default if value is None else value
+
+
+def _page(rows, key_of):
+    return {"rows": [json_ready(row) for row in rows],
+            "previous": list(key_of(rows[0])) if rows else None,
+            "next": list(key_of(rows[-1])) if rows else None}
+
+
+
+
+
+# ENDPOINTS: handler(service, path_params, query, body) -> (status, JSON-able result)
+def list_months(service, params, query, body):
+    sort_by = query.get("sort", "month DESC")
+    if sort_by not in SORT_KEYS:
+        raise HTTPError(400, f"sort must be one of: {', '.join(SORT_KEYS)}.")
+    columns = SORT_KEYS[sort_by][0]
+    rows = service.list_expenses_page(sort_by, _cursor(query, "after", columns), _cursor(query, "before", columns),
+                                      _page_size(query), _period_range(service, query))
+    return 200, _page(rows, lambda row: expense_sort_key(row, sort_by))
+
+
+def get_month(service, params, query, body):
+    row = service.get_expense(params["month"])
+    if row is None:
+        raise RecordNotFoundError(f"No record found for the month '{params['month']}'.")
+    return 200, json_ready(row)
+
+
+def add_month(service, params, query, body):
+    # like the app's Save button; zero bills are allowed, the response lists them
+    month, water, electricity = service.parse_bills(_field(body, "month"), _field(body, "water", ""),
+                                                    _field(body, "electricity", ""))
+    draft = service.prepare_new_expense(month, water, electricity)
+    comparison = service.save_expense(draft)
+    return 201, {"month": json_ready(draft), "comparison": json_ready(comparison)}
+
+
+def update_month(service, params, query, body):
+    return 200, json_ready(service.update_expense(params["month"], _field(body, "water", ""), _field(body, "electricity", "")))
+
+
+def delete_month(service, params, query, body):
+    if not service.delete_expense(params["month"]):
+        raise RecordNotFoundError(f"No record found for the month '{params['month']}'.")
+    return 200, {"deleted": params["month"]}
+
+
+def month_others(service, params, query, body):
+    return 200, {"month": params["month"], "others": service.get_month_others(params["month"]).to_float()}
+
+
+def list_transactions(service, params, query, body):
+    rows = service.list_transactions_page(params["month"], _cursor(query, "after", ("id",)),
+                                          _cursor(query, "before", ("id",)), _page_size(query))
+    return 200, _page(rows, transaction_sort_key)
+
+
+def add_transactions(service, params, query, body):
+    # one object or a list of them, all saved in one transaction
+    items = body if isinstance(body, list) else [body]
+    rows = [(params["month"], _field(item, "category"), _field(item, "description", ""), _field(item, "amount"))
+            for item in items]
+    return 201, {"ids": service.add_transactions(rows)}
+
+
+def update_transaction(service, params, query, body):
+    service.update_transaction(int(params["id"]), _field(body, "category"), _field(body, "description", ""),
+                               _field(body, "amount"))
+    return 200, {"updated": int(params["id"])}
+
+
+def delete_transaction(service, params, query, body):
+    if not service.delete_transaction(int(params["id"])):
+        raise RecordNotFoundError(f"No transaction with id {params['id']}.")
+    return 200, {"deleted": int(params["id"])}
+
+
+def search_transactions(service, params, query, body):
+    # ?q=words "a phrase" prefix*&category=&from=YYYY-MM&to=YYYY-MM&limit=, best match first
+    hits = service.search_transactions(query.get("q", ""), query.get("category"), query.get("from"),
+                                       query.get("to"), _page_size(query))
+    return 200, {"rows": [json_ready(hit) for hit in hits]}
+
+
+def trend(service, params, query, body):
+    # the data behind the trend charts, oldest month first, optionally only a date range
+    period_range = _period_range(service, query)
+    return 200, {"rows": [json_ready(row) for row in service.get_trend_data(period_range)],
+                 "range": _range_json(period_range)}
+
+
+def category_trend(service, params, query, body):
+    # spending per category and month (the stacked category chart), months without transactions are left out
+    period_range = _period_range(service, query)
+    matrix = service.get_category_matrix(period_range)
+    return 200, {"months": matrix.months, "categories": matrix.categories,
+                 "totals": [[amount.to_float() for amount in row] for row in matrix.totals],
+                 "counts": matrix.counts, "range": _range_json(period_range)}
+
+
+def categories(service, params, query, body):
+    return 200, {"categories": CATEGORIES}
+
+
+MONTH = r"(?P<month>\d{4}-\d{2})"
+
+# (method, path pattern, handler, "read" or "write")
+ROUTES = [
+    ("GET", r"/api/categories", categories, "read"),
+    ("GET", r"/api/categories/trend", category_trend, "read"),
+    ("GET", r"/api/months", list_months, "read"),
+    ("POST", r"/api/months", add_month, "write"),
+    ("GET", rf"/api/months/{MONTH}", get_month, "read"),
+    ("PUT", rf"/api/months/{MONTH}", update_month, "write"),
+    ("DELETE", rf"/api/months/{MONTH}", delete_month, "write"),
+    ("GET", rf"/api/months/{MONTH}/others", month_others, "read"),
+    ("GET", rf"/api/months/{MONTH}/transactions", list_transactions, "read"),
+    ("POST", rf"/api/months/{MONTH}/transactions", add_transactions, "write"),
+    ("GET", r"/api/transactions/search", search_transactions, "read"),
+    ("PUT", r"/api/transactions/(?P<id>\d+)", update_transaction, "write"),
+    ("DELETE", r"/api/transactions/(?P<id>\d+)", delete_transaction, "write"),
+    ("GET", r"/api/trend", trend, "read"),
+]
+ROUTES = [(method, re.compile(pattern + "$"), handler, kind) for method, pattern, handler, kind in ROUTES]
+
+
+def match_route(method, path):
+    # (handler, kind, path params), 404 for unknown paths and 405 for a known path with the wrong method
+    known_path = False
+    for route_method, pattern, handler, kind in ROUTES:
+        found = pattern.match(path)
+        if found:
+            known_path = True
+            if route_method == method:
+                return handler, kind, found.groupdict()
+    raise HTTPError(405 if known_path else 404, f"No route for {method} {path}.")
+
+
+
+
+
+# API SERVER
+class APIServer:
+    def __init__(self, db_file=DB_FILE, host=HOST, port=PORT, read_threads=READ_THREADS):
+        self.db_file = db_file
+        self.host = host
+        self.port = port
+
+        # readers get one connection each, the writer owns exactly one
+        self.read_pool = ConnectionPool(db_file, size=read_threads)
+        self.writer_pool = ConnectionPool(db_file, size=1)
+        self._readers = ThreadPoolExecutor(max_workers=read_threads, thread_name_prefix="api-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-write")
+        self._in_flight = None # asyncio.Semaphore, made inside the running loop
+
+        self._services = {} # (user_id, kind) -> ExpenseService; read and write services share the user's cache
+        self._logins = {} # sha256 of the Authorization header -> user_id
+        self._login_service = ExpenseService(ExpenseRepository(db_file, pool=self.read_pool))
+        self._server = None
+
+        self.requests = 0
+        self.responses_by_status = {}
+        self.started = time.monotonic()
+
+
+    # SERVICES (only touched from the worker threads)
+    def service_for(self, user_id, kind):
+        key = (user_id, kind)
+        service = self._services.get(key)
+        if service is None:
+            pool = self.writer_pool if kind == "write" else self.read_pool
+            service = self._services[key] = ExpenseService(ExpenseRepository(self.db_file, pool=pool, user_id=user_id))
+        return service
+
+
+    def authenticate(self, header):
+        # verified headers are remembered (hashed), so a password is checked once per client, not per request
+        if not header or not header.startswith("Basic "):
+            raise HTTPError(401, "Log in with HTTP Basic authentication.")
+        digest = hashlib.sha256(header.encode("utf-8")).digest()
+        user_id = self._logins.get(digest)
+        if user_id is not None:
+            return user_id
+
+        try:
+            username, _, password = base64.b64decode(header[6:]).decode("utf-8").partition(":")
+        except ValueError:
+            raise HTTPError(401, "Malformed credentials.")
+        user_id = self._login_service.login(username, password)
+        if user_id is None:
+            raise HTTPError(401, "Invalid username or password.")
+        self._logins[digest] = user_id
+        return user_id
+
+
+    def run_request(self, method, target, headers, body_bytes):
+        # everything a request needs from the database, on a worker thread; returns (status, bytes)
+        started = time.perf_counter()
+        try:
+            url = urlsplit(target)
+            handler, kind, params = match_route(method, unquote(url.path))
+            user_id = self.authenticate(headers.get("authorization"))
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            try:
+                body = json.loads(body_bytes) if body_bytes else {}
+            except ValueError:
+                raise HTTPError(400, "The request body is not valid JSON.")
+            status, result = handler(self.service_for(user_id, kind), params, query, body)
+        except Exception as e:
+            status = error_status(e)
+            if status == 500:
+                log.exception("%s %s failed", method, target)
+            result = {"error": str(e) if status != 500 else "Internal server error."}
+            handler = None
+
+        if PROFILER.enabled and handler is not None:
+            PROFILER.record(f"api: {method} {handler.__name__}", (time.perf_counter() - started) * 1000)
+        return status, json.dumps(result, ensure_ascii=False).encode("utf-8")
+
+
+    # EVENT LOOP SIDE
+    async def dispatch(self, method, target, headers, body):
+        # reads go to the reader pool, writes queue up behind each other on the writer thread.
+        # which pool is decided before any work, from the method alone (GET is the only read)
+        executor = self._readers if method == "GET" else self._writer
+        async with self._in_flight:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, self.run_request, method, target, headers, body)
+
+
+    async def handle_connection(self, reader, writer):
+        # HTTP/1.1 with keep-alive; requests on one connection are answered in order
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_SECONDS)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.respond(writer, 413, b'{"error": "Headers too large."}', False)
+                    break
+
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ", 2)
+                except ValueError:
+                    await self.respond(writer, 400, b'{"error": "Malformed request line."}', False)
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and version.upper() == "HTTP/1.1")
+                try:
+                    length = int(headers.get("content-length", "0"))
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, b'{"error": "Body too large."}', False)
+                    break
+                try:
+                    body = await reader.readexactly(length) if length else b""
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                status, payload = await self.dispatch(method.upper(), target, headers, body)
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+    async def respond(self, writer, status, payload, keep_alive):
+        self.requests += 1
+        self.responses_by_status[status] = self.responses_by_status.get(status, 0) + 1
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Unknown')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                + ('WWW-Authenticate: Basic realm="expenses"\r\n' if status == 401 else "")
+                + "\r\n")
+        writer.write(head.encode("latin-1") + payload)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+    async def start(self):
+        self._in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+        self._server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1] # the real one when port=0
+        return self._server
+
+
+    async def serve_forever(self):
+        await self.start()
+        log.info("serving %s on http://%s:%d", self.db_file, self.host, self.port)
+        async with self._server:
+            await self._server.serve_forever()
+
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        self._readers.shutdown(wait=True, cancel_futures=True)
+        self._writer.shutdown(wait=True, cancel_futures=True)
+        self.read_pool.close()
+        self.writer_pool.close()
+
+
+    def stats(self):
+        seconds = time.monotonic() - self.started
+        return {"requests": self.requests, "seconds": seconds,
+                "requests_per_second": self.requests / seconds if seconds > 0 else 0.0,
+                "responses_by_status": dict(self.responses_by_status)}
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the expenses database as a local HTTP/JSON API.")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--read-threads", type=int, default=READ_THREADS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+    with get_connection(args.db) as setup_conn:
+        migrate(setup_conn)
+    close_all_pools() # the server opens its own connections
+
+    server = APIServer(args.db, args.host, args.port, args.read_threads)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print(server.stats())
@@ -0,0 +1,14 @@
+# IMPORTED EXTENSIONS
+import hashlib # for password security
+
+
+
+# AUTHENTICATION HELPERS (no tkinter here so the database layer can use them too)
+def hash_password(password):
+    # hashing the password 
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def verify_password(stored_hash, provided_password):
+    # verify the password if correct or nah
+    return stored_hash == hash_password(provided_password)
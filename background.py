@@ -0,0 +1,157 @@
+# IMPORTED EXTENSIONS
+import itertools
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from db_connection import DB_FILE, ConnectionPool # pooled database connections
+from expense_service import ExpenseService, ExpenseRepository, DEFAULT_USER_ID # headless data layer
+from instrumentation import PROFILER # opt-in timings
+
+# runs database work and chart rendering off the tkinter main thread.
+# tkinter is not thread safe, so results are never touched by the worker threads:
+# they go through a queue that the main thread drains with after().
+
+
+
+# WORKER SETTINGS
+READ_THREADS = 2 # queries that only read
+POLL_MS = 25 # how often the main thread picks up finished jobs
+
+
+
+
+
+# BACKGROUND WORKER
+class BackgroundWorker:
+    # jobs are submitted with a key ("table", "chart", "others", ...). submitting a new job
+    # with the same key supersedes the old one: it is cancelled if it has not started yet,
+    # and its result is thrown away if it has.
+    def __init__(self, widget, db_file=DB_FILE, read_threads=READ_THREADS, on_busy_change=None,
+                 user_id=DEFAULT_USER_ID):
+        self.widget = widget
+        self.on_busy_change = on_busy_change
+
+        # readers share the app's connection pool, the writer owns exactly one connection.
+        # both only ever see the logged in user's data
+        self.read_service = ExpenseService(ExpenseRepository(db_file, user_id=user_id))
+        self.writer_pool = ConnectionPool(db_file, size=1)
+        self.write_service = ExpenseService(ExpenseRepository(db_file, pool=self.writer_pool, user_id=user_id))
+
+        self._readers = ThreadPoolExecutor(max_workers=read_threads, thread_name_prefix="db-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+        self._render = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart-render")
+
+        self._results = queue.SimpleQueue()
+        self._tokens = itertools.count(1)
+        self._latest = {} # key -> token of the newest job
+        self._futures = {} # key -> future of the newest job
+        self.pending = 0
+        self.superseded = 0 # jobs whose results were dropped (for profiling)
+        self._closed = False
+
+        self._poll_id = self.widget.after(POLL_MS, self._poll)
+
+
+    # SUBMITTING
+    def read(self, key, work, on_done=None, on_error=None):
+        # work(service) runs on a reader thread
+        return self._submit(self._readers, key, lambda: work(self.read_service), on_done, on_error)
+
+
+    def write(self, key, work, on_done=None, on_error=None):
+        # work(service) runs on the single writer thread, so writes never race each other
+        return self._submit(self._writer, key, lambda: work(self.write_service), on_done, on_error)
+
+
+    def render(self, key, work, on_done=None, on_error=None):
+        # work() runs on the render thread (one thread, so one Figure is never drawn twice at once)
+        return self._submit(self._render, key, work, on_done, on_error)
+
+
+    def _submit(self, executor, key, work, on_done, on_error):
+        if self._closed:
+            return None
+
+        token = next(self._tokens)
+        self._latest[key] = token
+
+        if PROFILER.enabled:
+            untimed = work
+            name = f"job: {key[0] if isinstance(key, tuple) else key}"
+
+            def work():
+                with PROFILER.timer(name):
+                    return untimed()
+
+        previous = self._futures.get(key)
+        if previous is not None and previous.cancel():
+            self.superseded += 1
+            self._set_pending(-1)
+
+        future = executor.submit(work)
+        self._futures[key] = future
+        self._set_pending(+1)
+        future.add_done_callback(lambda done: self._results.put((key, token, done, on_done, on_error)))
+        return token
+
+
+    def cancel(self, key):
+        # forget the newest job of this key, whatever it returns is ignored
+        self._latest.pop(key, None)
+        future = self._futures.pop(key, None)
+        if future is not None and future.cancel():
+            self._set_pending(-1)
+
+
+    def is_busy(self, key=None):
+        if key is None:
+            return self.pending > 0
+        future = self._futures.get(key)
+        return future is not None and not future.done()
+
+
+    # RESULTS (main thread only)
+    def _poll(self):
+        try:
+            while True:
+                key, token, future, on_done, on_error = self._results.get_nowait()
+                if future.cancelled():
+                    continue
+
+                self._set_pending(-1)
+                if self._latest.get(key) != token:
+                    self.superseded += 1
+                    continue
+
+                self._latest.pop(key, None)
+                self._futures.pop(key, None)
+                error = future.exception()
+                if error is not None:
+                    if on_error:
+                        on_error(error)
+                    else:
+                        raise error
+                elif on_done:
+                    on_done(future.result())
+        except queue.Empty:
+            pass
+        finally:
+            if not self._closed:
+                self._poll_id = self.widget.after(POLL_MS, self._poll)
+
+
+    def _set_pending(self, delta):
+        was_busy = self.pending > 0
+        self.pending += delta
+        if self.on_busy_change and was_busy != (self.pending > 0):
+            self.on_busy_change(self.pending > 0)
+
+
+    def shutdown(self):
+        self._closed = True
+        try:
+            self.widget.after_cancel(self._poll_id)
+        except Exception:
+            pass
+        for executor in (self._readers, self._writer, self._render):
+            executor.shutdown(wait=True, cancel_futures=True)
+        self.writer_pool.close()
@@ -0,0 +1,165 @@
+# IMPORTED EXTENSIONS
+import tkinter as tk # for gui
+from tkinter import ttk
+from expense_service import CATEGORIES, match_category, split_pasted_rows
+from theme import PRIMARY_COLOR, SECONDARY_COLOR, ACCENT_COLOR, TEXT_COLOR
+
+
+
+# GRID SETTINGS
+START_ROWS = 5 # empty rows when the grid opens
+ADD_ROWS = 5 # rows added by the "add rows" button
+VISIBLE_ROWS = 8 # taller grids scroll
+ROW_HEIGHT = 30 # pixels, to size the scrolling area
+ERROR_COLOR = "#FF8A80"
+
+COLUMNS = ("category", "description", "amount")
+
+
+
+
+
+# BATCH ENTRY GRID
+class BatchEntryGrid:
+    # a small spreadsheet of (category, description, amount) rows for typing a month's receipts.
+    # pasting several lines (tab or comma separated, e.g. from a spreadsheet) fills the rows
+    # from the focused cell down and adds rows when needed. Enter jumps to the next row.
+    # filled_rows() gives what was typed, show_errors() marks bad rows next to them, no popups.
+    def __init__(self, master, rows=START_ROWS):
+        self.frame = tk.Frame(master, bg=SECONDARY_COLOR)
+
+        self.canvas = tk.Canvas(self.frame, bg=SECONDARY_COLOR, highlightthickness=0,
+                                height=VISIBLE_ROWS * ROW_HEIGHT)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.pack(side='right', fill='y')
+        self.canvas.pack(side='left', fill='both', expand=True)
+
+        self.body = tk.Frame(self.canvas, bg=SECONDARY_COLOR)
+        self.canvas.create_window((0, 0), window=self.body, anchor='nw')
+        self.body.bind("<Configure>", lambda event: self.canvas.configure(
+            scrollregion=self.canvas.bbox("all"), width=self.body.winfo_reqwidth()))
+
+        for column, title in enumerate(("#", "Category", "Description", "Amount (₱)", "")):
+            tk.Label(self.body, text=title, bg=SECONDARY_COLOR, fg=ACCENT_COLOR,
+                     font=('Arial', 9, 'bold')).grid(row=0, column=column, padx=3, sticky='w')
+
+        self.rows = [] # one dict of widgets per grid row
+        self.add_rows(rows)
+
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+
+    # ROWS
+    def add_rows(self, count=ADD_ROWS):
+        for _ in range(count):
+            self._add_row()
+
+
+    def _add_row(self):
+        index = len(self.rows)
+        grid_row = index + 1 # row 0 is the header
+
+        tk.Label(self.body, text=str(index + 1), bg=SECONDARY_COLOR, fg=TEXT_COLOR,
+                 width=3).grid(row=grid_row, column=0, padx=3)
+
+        category = ttk.Combobox(self.body, values=CATEGORIES, width=18)
+        category.set(CATEGORIES[0])
+        description = tk.Entry(self.body, bg=PRIMARY_COLOR, fg=TEXT_COLOR, width=26, insertbackground=ACCENT_COLOR)
+        amount = tk.Entry(self.body, bg=PRIMARY_COLOR, fg=TEXT_COLOR, width=12, insertbackground=ACCENT_COLOR)
+        error = tk.Label(self.body, text="", bg=SECONDARY_COLOR, fg=ERROR_COLOR, anchor='w',
+                         width=30, font=('Arial', 9))
+
+        cells = (category, description, amount)
+        for column, widget in enumerate(cells):
+            widget.grid(row=grid_row, column=column + 1, padx=3, pady=2, sticky='ew')
+            widget.bind("<<Paste>>", lambda event, row=index, column=column: self._on_paste(row, column))
+            widget.bind("<Return>", lambda event, row=index, column=column: self._next_row(row, column))
+        error.grid(row=grid_row, column=4, padx=3, sticky='w')
+
+        self.rows.append({"category": category, "description": description, "amount": amount, "error": error})
+
+
+    def _cell(self, row, column):
+        return self.rows[row][COLUMNS[column]]
+
+
+    def _set(self, row, column, value):
+        widget = self._cell(row, column)
+        if COLUMNS[column] == "category":
+            widget.set(match_category(value))
+        else:
+            widget.delete(0, tk.END)
+            widget.insert(0, value.strip())
+
+
+    def _next_row(self, row, column):
+        if row + 1 >= len(self.rows):
+            self._add_row()
+        self._cell(row + 1, column).focus_set()
+        self.see(row + 1)
+        return "break"
+
+
+    def _on_paste(self, row, column):
+        # several lines or tab separated cells spread over the grid, anything else is a normal paste
+        try:
+            text = self.frame.clipboard_get()
+        except tk.TclError:
+            return None
+        if "\t" not in text and "\n" not in text.strip():
+            return None
+
+        pasted = split_pasted_rows(text)
+        missing = row + len(pasted) - len(self.rows)
+        if missing > 0:
+            self.add_rows(missing)
+        for offset, values in enumerate(pasted):
+            for column_offset, value in enumerate(values[:len(COLUMNS) - column]):
+                self._set(row + offset, column + column_offset, value)
+        self.see(row + len(pasted) - 1)
+        return "break"
+
+
+    def see(self, row):
+        # scroll so the row is visible
+        self.body.update_idletasks()
+        height = self.body.winfo_reqheight()
+        if height > 0:
+            top = self.rows[row]["description"].winfo_y() - ROW_HEIGHT * (VISIBLE_ROWS - 1)
+            self.canvas.yview_moveto(max(0, top) / height)
+
+
+    # VALUES
+    def filled_rows(self):
+        # [(grid row index, (category, description, amount))] of the rows that have something typed
+        filled = []
+        for index, row in enumerate(self.rows):
+            description = row["description"].get().strip()
+            amount = row["amount"].get().strip()
+            if description or amount:
+                filled.append((index, (row["category"].get().strip(), description, amount)))
+        return filled
+
+
+    def show_errors(self, errors):
+        # errors maps grid row index -> message
+        for index, row in enumerate(self.rows):
+            message = errors.get(index, "")
+            row["error"].config(text=f"⚠ {message}" if message else "")
+            for column in ("description", "amount"):
+                row[column].config(highlightthickness=1,
+                                   highlightbackground=ERROR_COLOR if message else SECONDARY_COLOR)
+
+
+    def clear(self):
+        for row in self.rows:
+            row["category"].set(CATEGORIES[0])
+            row["description"].delete(0, tk.END)
+            row["amount"].delete(0, tk.END)
+        self.show_errors({})
+        self.canvas.yview_moveto(0)
+        if self.rows:
+            self.rows[0]["description"].focus_set()
@@ -0,0 +1,138 @@
+# IMPORTED EXTENSIONS
+import time
+STARTED = time.perf_counter() # as early as possible, before any other import
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# measures how fast the app starts, every run in a fresh python process (cold imports):
+#   login    - python starts -> login window painted
+#   shell    - login done -> dashboard window painted (empty table and graph)
+#   ready    - login done -> table rows, others total and graph on screen, no job pending
+# the GUI timings need a display (on a server run it with xvfb-run).
+# the import timing (how long "import ExpensesManagementTracker" takes) works anywhere.
+
+
+
+# BENCHMARK SETTINGS
+RUNS = 5
+READY_TIMEOUT_SECONDS = 30.0
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+
+
+
+# ONE RUN (child process)
+def measure_import():
+    import ExpensesManagementTracker
+    return {"import_ms": (time.perf_counter() - STARTED) * 1000,
+            "matplotlib_loaded": "matplotlib" in sys.modules}
+
+
+def measure_gui():
+    import ExpensesManagementTracker as app
+
+    result = {"import_ms": (time.perf_counter() - STARTED) * 1000}
+    app.setup_database()
+
+    login = app.LoginWindow(lambda: None)
+    app.threading.Thread(target=app.preload_plotting, daemon=True).start()
+    login.update()
+    result["login_ms"] = (time.perf_counter() - STARTED) * 1000
+    login.destroy()
+
+    logged_in = time.perf_counter()
+    dashboard = app.ExpensesTrackerApp(lambda: None)
+    dashboard.update_idletasks()
+    result["shell_ms"] = (time.perf_counter() - logged_in) * 1000
+
+    # keep the event loop going until everything has arrived
+    deadline = time.perf_counter() + READY_TIMEOUT_SECONDS
+    while time.perf_counter() < deadline:
+        dashboard.update()
+        chart = dashboard.chart
+        if chart is not None and chart.image is not None and not dashboard.worker.is_busy():
+            break
+        time.sleep(0.001)
+    result["ready_ms"] = (time.perf_counter() - logged_in) * 1000
+    result["rows_shown"] = len(dashboard.expense_table)
+
+    dashboard.destroy()
+    app.close_all_pools()
+    return result
+
+
+
+
+
+# RUNNER (parent process)
+def run_child(mode, db_path):
+    # the app opens "expenses_tracker.db" in the working directory, so each run gets a copy
+    with tempfile.TemporaryDirectory() as workdir:
+        if db_path:
+            shutil.copy(db_path, os.path.join(workdir, "expenses_tracker.db"))
+
+        env = dict(os.environ, PYTHONPATH=HERE + os.pathsep + os.environ.get("PYTHONPATH", ""))
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode],
+                                   cwd=workdir, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "child failed")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def summarize(results):
+    summary = {}
+    for key in results[0]:
+        values = [result[key] for result in results]
+        if isinstance(values[0], float):
+            summary[key] = {"median": statistics.median(values), "min": min(values), "max": max(values)}
+        else:
+            summary[key] = values[0]
+    return summary
+
+
+def print_summary(title, summary):
+    print(title)
+    for key, value in summary.items():
+        if isinstance(value, dict):
+            print(f"  {key:<12} median {value['median']:8.1f} ms   (min {value['min']:.1f}, max {value['max']:.1f})")
+        else:
+            print(f"  {key:<12} {value}")
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure time to login window and time to an interactive dashboard.")
+    parser.add_argument("--db", help="database to start with (copied, never modified); empty database if left out")
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--import-only", action="store_true", help="skip the GUI timings (no display needed)")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--child", choices=["import", "gui"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_import() if args.child == "import" else measure_gui()))
+        sys.exit(0)
+
+    report = {}
+    modes = ["import"] if args.import_only else ["import", "gui"]
+    for mode in modes:
+        try:
+            report[mode] = summarize([run_child(mode, args.db) for _ in range(args.runs)])
+        except RuntimeError as e:
+            print(f"{mode}: could not run ({e})")
+            continue
+        print_summary(f"{mode} ({args.runs} runs)", report[mode])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
@@ -0,0 +1,604 @@
+# IMPORTED EXTENSIONS
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import gc
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime
+from db_connection import ConnectionPool, get_connection, close_all_pools # pooled database connections
+from migrations import migrate # ledgers generated by older versions are upgraded first
+from expense_service import ExpenseService, ExpenseRepository, expense_sort_key, category_matrix
+from money import format_amounts, format_rows
+from periods import quarter_range
+from query_cache import DataVersion, QueryCache
+from generate_data import build_ledger, ledger_name, month_range, DEFAULT_SEED
+
+# headless benchmarks of the app's core operations on generated ledgers.
+# every run writes a JSON file; pass an older one with --compare to catch regressions.
+# the query cache is turned off so the numbers are what SQLite really costs.
+# --user-scale runs the per-user operations on databases shared by more and more
+# users: with the user_id-first indexes one user's latency should stay flat.
+
+
+
+# BENCHMARK SETTINGS
+SIZES = {
+    "small": (60, 10000), # months, transactions
+    "medium": (240, 250000),
+    "large": (480, 2000000),
+}
+DEFAULT_SIZES = ("small", "medium")
+REPEAT = 20
+DATA_DIR = "bench_data"
+REGRESSION_THRESHOLD = 1.25 # slower than this times the baseline median is a regression
+NOISE_FLOOR_MS = 0.1 # ...and by more than this, sub-0.1 ms changes are timer noise
+
+# chart memory check (render_memory): CHART_REFRESHES redraws of one chart after a warm-up; memory
+# is measured half way and at the end, the second half must not grow it by more than these bounds.
+# matplotlib's glyph and text caches fill up during the first redraws, a leak keeps growing
+CHART_REFRESHES = 1000
+CHART_WARMUP = 100
+MAX_BLOCK_GROWTH = 4000 # Python memory blocks (sys.getallocatedblocks), ~8 per redraw
+MAX_RSS_GROWTH = 2 * 1024 * 1024 # bytes of resident memory (numpy and Agg buffers are not Python blocks)
+
+# cache check (cache_isolation): a two user ledger of its own
+ISOLATION_LEDGER = (6, 120) # months, transactions per user
+
+# only run when named in --only, they take a minute or more per ledger
+SLOW_BENCHMARKS = {"render_memory"}
+
+# user scale test: every user has a ledger of USER_LEDGER, the database holds 1..N of them
+USER_COUNTS = (1, 10, 100, 500)
+USER_LEDGER = (24, 500) # months, transactions per user
+SAMPLED_USERS = 5 # users timed per database, spread from the first to the last one
+USER_BENCHMARKS = ("load_data_month_desc", "load_data_total_desc", "graph_data",
+                   "others_total", "transactions_page", "add_transaction")
+
+
+# one generated database and the months in it
+Ledger = namedtuple("Ledger", "name path months transactions month_list")
+
+
+
+
+
+# TIMING
+def timed(work, repeat, setup=None, teardown=None):
+    # runs work() "repeat" times and returns each duration in ms (setup/teardown are not timed)
+    durations = []
+    for index in range(repeat):
+        argument = setup(index) if setup else None
+        started = time.perf_counter()
+        result = work(argument) if setup else work()
+        durations.append((time.perf_counter() - started) * 1000)
+        if teardown:
+            teardown(result)
+    return durations
+
+
+def summarize(durations):
+    ordered = sorted(durations)
+    return {
+        "median_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "min_ms": ordered[0],
+        "mean_ms": statistics.fmean(ordered),
+        "repeat": len(ordered),
+    }
+
+
+
+
+
+# BENCHMARKS (each takes the service, the ledger and the repeat count, returns durations in ms)
+def _new_month(ledger, index):
+    # a month after the last one of the ledger, so saving it never collides
+    return list(month_range(ledger.month_list[-1], index + 2))[-1]
+
+
+def _middle_month(ledger):
+    return ledger.month_list[len(ledger.month_list) // 2]
+
+
+def _middle_quarter(ledger):
+    year, month = _middle_month(ledger).split("-")
+    return quarter_range(year, (int(month) - 1) // 3 + 1)
+
+
+def bench_save_month(service, ledger, repeat):
+    def save(month):
+        service.add_expense(month, "450.50", "2100.75")
+        return month
+    return timed(save, repeat, setup=lambda index: _new_month(ledger, index), teardown=service.delete_expense)
+
+
+def bench_edit_month(service, ledger, repeat):
+    month = _middle_month(ledger)
+    original = service.get_expense(month)
+    durations = timed(lambda water: service.update_expense(month, water, original.electricity), repeat,
+                      setup=lambda index: original.water + index + 1)
+    service.update_expense(month, original.water, original.electricity)
+    return durations
+
+
+def bench_delete_month(service, ledger, repeat):
+    def setup(index):
+        month = _new_month(ledger, index)
+        service.add_expense(month, "450.50", "2100.75")
+        service.add_transaction(month, "Transport", "bus", "25")
+        return month
+    return timed(service.delete_expense, repeat, setup=setup)
+
+
+def bench_add_transaction(service, ledger, repeat):
+    month = _middle_month(ledger)
+    return timed(lambda: service.add_transaction(month, "Food & Groceries", "benchmark", "123.45"), repeat,
+                 teardown=service.delete_transaction)
+
+
+def bench_update_transaction(service, ledger, repeat):
+    month = _middle_month(ledger)
+    trans_id = service.add_transaction(month, "Food & Groceries", "benchmark", "123.45")
+    durations = timed(lambda amount: service.update_transaction(trans_id, "Transport", "benchmark", amount), repeat,
+                      setup=lambda index: str(100 + index))
+    service.delete_transaction(trans_id)
+    return durations
+
+
+def bench_delete_transaction(service, ledger, repeat):
+    month = _middle_month(ledger)
+    return timed(service.delete_transaction, repeat,
+                 setup=lambda index: service.add_transaction(month, "Food & Groceries", "benchmark", "123.45"))
+
+
+def _bench_first_page(sort_by):
+    # what load_data() reads when the sort order changes
+    def bench(service, ledger, repeat):
+        return timed(lambda: service.list_expenses_page(sort_by, None, None, 100), repeat)
+    return bench
+
+
+def bench_scroll_ten_pages(service, ledger, repeat):
+    def scroll():
+        after = None
+        for _ in range(10):
+            rows = service.list_expenses_page("month DESC", after, None, 100)
+            if not rows:
+                break
+            after = expense_sort_key(rows[-1], "month DESC")
+    return timed(scroll, repeat)
+
+
+def bench_graph_data(service, ledger, repeat):
+    # _get_data_for_graph
+    return timed(service.get_trend_data, repeat)
+
+
+def bench_others_total(service, ledger, repeat):
+    month = _middle_month(ledger)
+    return timed(lambda: service.get_month_others(month), repeat)
+
+
+def bench_transactions_page(service, ledger, repeat):
+    month = _middle_month(ledger)
+    return timed(lambda: service.list_transactions_page(month, None, None, 100), repeat)
+
+
+def bench_ledger_sum(service, ledger, repeat):
+    # exact integer SUM over every transaction of the ledger (what floats used to drift on)
+    def total():
+        with service.repository.connection() as conn:
+            return conn.execute("SELECT SUM(amount_cents) FROM transactions WHERE user_id=?",
+                                (service.user_id,)).fetchone()[0]
+    return timed(total, repeat)
+
+
+def bench_format_page(service, ledger, repeat):
+    # one page of the main table formatted the way the Treeview gets it
+    rows = service.list_expenses_page("month DESC", None, None, 100)
+    return timed(lambda: format_rows(rows, (1, 2, 3, 4)), repeat)
+
+
+def bench_format_transactions(service, ledger, repeat):
+    # every transaction amount of the ledger as "₱1,234.50" text, read once outside the timing
+    with service.repository.connection() as conn:
+        amounts = [row[0] for row in conn.execute("SELECT amount_cents FROM transactions WHERE user_id=?",
+                                                  (service.user_id,))]
+    return timed(lambda: format_amounts(amounts), max(1, repeat // 4))
+
+
+def bench_category_matrix(service, ledger, repeat):
+    # the stacked category chart's data: one primary key range of the trigger kept rollups
+    return timed(service.get_category_matrix, repeat)
+
+
+def _bench_last_months(read, count=12):
+    # a chart of only the newest months: read(service, period_range) scans just their period keys
+    def bench(service, ledger, repeat):
+        months = service.resolve_range(last=count)
+        return timed(lambda: read(service, months), repeat)
+    return bench
+
+
+def bench_first_page_quarter(service, ledger, repeat):
+    # load_data() with the table limited to one quarter
+    months = _middle_quarter(ledger)
+    return timed(lambda: service.list_expenses_page("month DESC", None, None, 100, months), repeat)
+
+
+def bench_transactions_quarter(service, ledger, repeat):
+    # every transaction of one quarter, the way the exporter streams a range (month bounds on the month index)
+    months = _middle_quarter(ledger)
+    def read():
+        with service.repository.connection() as conn:
+            return conn.execute("""
+                SELECT id, month, category, description, amount_cents FROM transactions
+                WHERE user_id=? AND month BETWEEN ? AND ? ORDER BY month, id
+            """, (service.user_id, months.first_month, months.last_month)).fetchall()
+    return timed(read, repeat)
+
+
+def bench_category_group_by(service, ledger, repeat):
+    # the same matrix aggregated from every transaction, what the rollups save
+    def matrix():
+        with service.repository.connection() as conn:
+            return category_matrix(conn.execute("""
+                SELECT month, category, SUM(amount_cents), COUNT(*) FROM transactions
+                WHERE user_id=? GROUP BY month, category ORDER BY month, category
+            """, (service.user_id,)).fetchall())
+    return timed(matrix, repeat)
+
+
+def _bench_search(text, year=False, category=None):
+    # the search window: a common word of the generated ledger, optionally in one year (the one
+    # in the middle of the ledger, so the index walks past half of the hits) or one category
+    def bench(service, ledger, repeat):
+        first_month = last_month = None
+        if year:
+            middle = _middle_month(ledger)[:4]
+            first_month, last_month = f"{middle}-01", f"{middle}-12"
+        return timed(lambda: service.search_transactions(text, category, first_month, last_month), repeat)
+    return bench
+
+
+def _bench_render(view):
+    # the trend chart drawn with Agg, like the render thread does
+    def bench(service, ledger, repeat):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from chart_view import TrendFigure
+
+        rows = service.get_trend_data()
+        matrix = service.get_category_matrix()
+        trend = TrendFigure()
+        canvas = FigureCanvasAgg(trend.figure)
+
+        def render():
+            trend.update(rows, view, matrix)
+            canvas.draw()
+        return timed(render, repeat)
+    return bench
+
+
+def _resident_memory():
+    # bytes in RAM right now (Linux), else the peak so far; None without either
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _memory_use():
+    gc.collect()
+    return sys.getallocatedblocks(), _resident_memory()
+
+
+def bench_render_memory(service, ledger, repeat):
+    # CHART_REFRESHES redraws of one TrendFigure cycling through every view and data size, the way
+    # the app reuses its chart. memory has to stay flat: a leak fails the run (AssertionError).
+    # (tracemalloc would make every redraw about ten times slower)
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from chart_view import TrendFigure
+
+    rows = service.get_trend_data()
+    matrix = service.get_category_matrix()
+    views = ("total", "breakdown", "categories")
+    sizes = (len(rows), max(1, len(rows) // 2), 1)
+    trend = TrendFigure()
+    canvas = FigureCanvasAgg(trend.figure)
+
+    def render(index):
+        trend.update(rows[-sizes[index % len(sizes)]:], views[index % len(views)], matrix)
+        canvas.draw()
+
+    for index in range(CHART_WARMUP):
+        render(index)
+
+    half = CHART_REFRESHES // 2
+    durations = timed(render, half, setup=lambda index: index)
+    blocks_before, rss_before = _memory_use()
+    durations += timed(render, CHART_REFRESHES - half, setup=lambda index: half + index)
+    blocks_after, rss_after = _memory_use()
+    block_growth = blocks_after - blocks_before
+    rss_growth = rss_after - rss_before if rss_before is not None else 0
+
+    print(f"  {ledger.name:<7} render_memory          last {CHART_REFRESHES - half} of {CHART_REFRESHES} redraws: "
+          f"{block_growth:+,} Python blocks, {rss_growth / 1024:+,.0f} KiB resident")
+    assert block_growth <= MAX_BLOCK_GROWTH, f"chart redraws leak: {block_growth:,} more Python memory blocks"
+    assert rss_growth <= MAX_RSS_GROWTH, f"chart redraws leak: resident memory grew by {rss_growth:,} bytes"
+    return durations
+
+
+def bench_cache_isolation(service, ledger, repeat):
+    # a write of one user to one month must leave that user's other months and every other
+    # user's entries cached, while a commit from outside the service (another process) is seen.
+    # times the write plus the reads after it; a wrong cache fails the run (AssertionError)
+    months, transactions = ISOLATION_LEDGER
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "isolation.db")
+        build_ledger(path, months, transactions, users=2)
+        pool = ConnectionPool(path)
+        version = DataVersion(path)
+        try:
+            repository = ExpenseRepository(path, pool)
+            with repository.connection() as conn:
+                migrate(conn)
+                first_id, second_id = [row[0] for row in conn.execute("SELECT id FROM users ORDER BY id LIMIT 2")]
+            first = ExpenseService(repository.for_user(first_id), cache=QueryCache(version=version))
+            second = ExpenseService(repository.for_user(second_id), cache=QueryCache(version=version))
+            written, other = [row.month for row in first.get_trend_data()][:2]
+
+            def reads():
+                return (first.get_month_others(written), first.get_month_others(other),
+                        second.get_month_others(written), second.get_month_others(other))
+
+            def write_and_read(index):
+                first_hits, second_hits = first.cache.hits, second.cache.hits
+                trans_id = first.add_transaction(written, "Transport", "benchmark", "25")
+                values = reads()
+                first.delete_transaction(trans_id)
+                assert first.cache.hits - first_hits == 1, "a write to one month dropped the user's other months"
+                assert second.cache.hits - second_hits == 2, "a write of one user dropped another user's entries"
+                assert values[0] == before[0] + 2500, "the month written to was served stale"
+                return values
+
+            before = reads()
+            durations = timed(write_and_read, repeat, setup=lambda index: index)
+
+            # another process: a connection the service knows nothing about
+            reads()
+            outside = sqlite3.connect(path)
+            with outside:
+                outside.execute("INSERT INTO transactions (user_id, month, category, description, amount_cents) "
+                                "VALUES (?, ?, 'Transport', 'benchmark', 2500)", (second_id, other))
+            outside.close()
+            assert reads()[3] == before[3] + 2500, "a write from another process was served stale"
+        finally:
+            pool.close()
+            version.close()
+    return durations
+
+
+BENCHMARKS = {
+    "save_month": bench_save_month,
+    "edit_month": bench_edit_month,
+    "delete_month": bench_delete_month,
+    "add_transaction": bench_add_transaction,
+    "update_transaction": bench_update_transaction,
+    "delete_transaction": bench_delete_transaction,
+    "load_data_month_desc": _bench_first_page("month DESC"),
+    "load_data_total_desc": _bench_first_page("total DESC"),
+    "load_data_total_asc": _bench_first_page("total ASC"),
+    "scroll_ten_pages": bench_scroll_ten_pages,
+    "graph_data": bench_graph_data,
+    "others_total": bench_others_total,
+    "transactions_page": bench_transactions_page,
+    "ledger_sum": bench_ledger_sum,
+    "format_page": bench_format_page,
+    "format_transactions": bench_format_transactions,
+    "category_matrix": bench_category_matrix,
+    "category_group_by": bench_category_group_by,
+    "graph_data_last_12": _bench_last_months(lambda service, months: service.get_trend_data(months)),
+    "category_matrix_last_12": _bench_last_months(lambda service, months: service.get_category_matrix(months)),
+    "load_data_quarter": bench_first_page_quarter,
+    "transactions_quarter": bench_transactions_quarter,
+    "search_word": _bench_search("grab"),
+    "search_prefix": _bench_search("gr*"),
+    "search_phrase_year": _bench_search('"grab ride"', year=True),
+    "search_wrong_category": _bench_search("grab", category="Healthcare"),
+    "render_total": _bench_render("total"),
+    "render_breakdown": _bench_render("breakdown"),
+    "render_categories": _bench_render("categories"),
+    "render_memory": bench_render_memory,
+    "cache_isolation": bench_cache_isolation,
+}
+
+
+
+
+
+# RUNNING
+def prepare_ledger(size, data_dir=DATA_DIR, seed=DEFAULT_SEED):
+    # generated once, reused by later runs (the benchmarks undo their own writes)
+    months, transactions = SIZES[size]
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, ledger_name(months, transactions, seed))
+    if not os.path.exists(path):
+        print(f"generating {size} ledger ({months:,} months, {transactions:,} transactions)...")
+        build_ledger(path, months, transactions, seed=seed)
+    with get_connection(path) as conn:
+        migrate(conn)
+
+    service = ExpenseService(ExpenseRepository(path), cache=QueryCache(max_entries=0))
+    month_list = [row.month for row in service.get_trend_data()]
+    return Ledger(size, path, months, transactions, month_list)
+
+
+def run_suite(sizes=DEFAULT_SIZES, names=None, repeat=REPEAT, data_dir=DATA_DIR, seed=DEFAULT_SEED):
+    results = {}
+    failures = []
+    for size in sizes:
+        ledger = prepare_ledger(size, data_dir, seed)
+        service = ExpenseService(ExpenseRepository(ledger.path), cache=QueryCache(max_entries=0))
+        results[size] = {}
+
+        for name, bench in BENCHMARKS.items():
+            if (names and name not in names) or (not names and name in SLOW_BENCHMARKS):
+                continue
+            try:
+                durations = bench(service, ledger, repeat)
+            except ImportError as e: # e.g. matplotlib missing for the render benchmarks
+                print(f"  {size}/{name}: skipped ({e})")
+                continue
+            except AssertionError as e: # a check inside the benchmark failed (render_memory)
+                print(f"  {size}/{name}: FAILED ({e})")
+                failures.append(f"{size}/{name}: {e}")
+                continue
+            results[size][name] = summarize(durations)
+            print(f"  {size:<7} {name:<22} median {results[size][name]['median_ms']:9.3f} ms"
+                  f"   p95 {results[size][name]['p95_ms']:9.3f} ms")
+
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+            "sizes": {size: SIZES[size] for size in sizes},
+            "failures": failures,
+        },
+        "results": results,
+    }
+
+
+def run_user_scale(user_counts=USER_COUNTS, names=None, repeat=REPEAT, data_dir=DATA_DIR, seed=DEFAULT_SEED):
+    # results are keyed "<n>-users" like the sizes, so --compare covers them too
+    months, transactions = USER_LEDGER
+    os.makedirs(data_dir, exist_ok=True)
+    results = {}
+
+    for users in user_counts:
+        path = os.path.join(data_dir, ledger_name(months, transactions, seed, users))
+        if not os.path.exists(path):
+            print(f"generating {users:,} user(s) x {months} months x {transactions:,} transactions...")
+            build_ledger(path, months, transactions, seed=seed, users=users)
+        with get_connection(path) as conn:
+            migrate(conn)
+
+        repository = ExpenseRepository(path)
+        with repository.connection() as conn:
+            user_ids = [row[0] for row in conn.execute("SELECT id FROM users ORDER BY id")]
+        last = len(user_ids) - 1
+        sampled = [user_ids[index] for index in
+                   sorted({round(step * last / max(1, SAMPLED_USERS - 1)) for step in range(SAMPLED_USERS)})]
+
+        key = f"{users}-users"
+        results[key] = {}
+        for name in USER_BENCHMARKS:
+            if names and name not in names:
+                continue
+            durations = []
+            for user_id in sampled:
+                service = ExpenseService(repository.for_user(user_id), cache=QueryCache(max_entries=0))
+                month_list = [row.month for row in service.get_trend_data()]
+                ledger = Ledger(key, path, months, transactions, month_list)
+                durations.extend(BENCHMARKS[name](service, ledger, max(1, repeat // len(sampled))))
+            results[key][name] = summarize(durations)
+            print(f"  {key:<10} {name:<22} median {results[key][name]['median_ms']:9.3f} ms"
+                  f"   p95 {results[key][name]['p95_ms']:9.3f} ms")
+    return results
+
+
+def flatness(results, user_counts):
+    # median with the most users / median with the fewest, per benchmark (1.0 = perfectly flat)
+    fewest, most = f"{min(user_counts)}-users", f"{max(user_counts)}-users"
+    ratios = {}
+    for name, stats in results.get(most, {}).items():
+        base = results.get(fewest, {}).get(name)
+        if base and base["median_ms"] > 0:
+            ratios[name] = stats["median_ms"] / base["median_ms"]
+    return ratios
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD, noise_floor=NOISE_FLOOR_MS):
+    # returns the (size, name, ratio) of every benchmark that got slower than the threshold
+    regressions = []
+    for size, benchmarks in current["results"].items():
+        for name, stats in benchmarks.items():
+            old = baseline.get("results", {}).get(size, {}).get(name)
+            if not old or old["median_ms"] <= 0:
+                continue
+            ratio = stats["median_ms"] / old["median_ms"]
+            slower = ratio > threshold and stats["median_ms"] - old["median_ms"] > noise_floor
+            flag = "  REGRESSION" if slower else ""
+            print(f"  {size:<7} {name:<22} {old['median_ms']:9.3f} -> {stats['median_ms']:9.3f} ms  x{ratio:.2f}{flag}")
+            if slower:
+                regressions.append((size, name, ratio))
+    return regressions
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the core operations on generated ledgers.")
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES), help=f"comma separated, from {', '.join(SIZES)}")
+    parser.add_argument("--only", help="comma separated benchmark names")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", metavar="BASELINE_JSON")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--user-scale", nargs="?", const=",".join(map(str, USER_COUNTS)), metavar="COUNTS",
+                        help=f"also time one user's operations as the user count grows (default {USER_COUNTS})")
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+
+    names = set(args.only.split(",")) if args.only else None
+    try:
+        report = run_suite(sizes, names, args.repeat, args.data_dir, args.seed)
+        if args.user_scale:
+            user_counts = sorted(int(count) for count in args.user_scale.split(",") if count.strip())
+            report["results"].update(run_user_scale(user_counts, names, args.repeat, args.data_dir, args.seed))
+            report["meta"]["user_scale"] = {"users": user_counts, "ledger_per_user": USER_LEDGER,
+                                            "flatness": flatness(report["results"], user_counts)}
+            for name, ratio in report["meta"]["user_scale"]["flatness"].items():
+                print(f"  {name:<22} {max(user_counts):,} users vs {min(user_counts):,}: x{ratio:.2f}")
+    finally:
+        close_all_pools()
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"results written to {args.output}")
+
+    failed = bool(report["meta"]["failures"])
+    if failed:
+        print(f"{len(report['meta']['failures'])} check(s) failed")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above x{args.threshold:.2f}")
+            failed = True
+    if failed:
+        sys.exit(1)
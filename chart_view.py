@@ -0,0 +1,338 @@
+# IMPORTED EXTENSIONS
+import base64
+import io
+import numpy as np
+import matplotlib.dates as mdates # real date axis with automatic ticks
+import matplotlib.style # for the dark theme of the graphs
+from matplotlib.ticker import FixedLocator
+from matplotlib.figure import Figure # a plain Figure is never registered in pyplot, so it can't leak
+from matplotlib.legend import Legend
+from matplotlib.patches import Patch
+from instrumentation import PROFILER # opt-in timings
+from money import CENTS_PER_PESO
+from theme import PRIMARY_COLOR, SECONDARY_COLOR, TEXT_COLOR, BUTTON_COLOR, GRAPH_COLORS, CATEGORY_COLORS, OTHER_CATEGORY_COLOR
+
+
+
+# which column of a (month, water, electricity, others, total) row each line plots
+LINE_COLUMNS = {"Total": 4, "Water": 1, "Electricity": 2, "Others": 3}
+
+# what each view shows: title, y label, its lines and the figure margins
+VIEWS = {
+    "total": {
+        "title": "Total Monthly Expenses Trend",
+        "ylabel": "Total Expenses (₱)",
+        "lines": ("Total",),
+        "margins": dict(left=0.13, right=0.97, top=0.9, bottom=0.2),
+    },
+    "breakdown": {
+        "title": "Monthly Breakdown Trend (Utilities & Others)",
+        "ylabel": "Cost (₱)",
+        "lines": ("Water", "Electricity", "Others"),
+        "margins": dict(left=0.13, right=0.8, top=0.9, bottom=0.2),
+    },
+    # drawn from a CategoryMatrix instead of the monthly rows
+    "categories": {
+        "title": "Spending by Category",
+        "ylabel": "Spent (₱)",
+        "lines": (),
+        "margins": dict(left=0.13, right=0.72, top=0.9, bottom=0.2),
+    },
+}
+
+NO_DATA_TEXT = "There is no data for the graph. Save a few months to see trends!"
+
+MAX_POINTS = 400 # longer histories are downsampled (LTTB) to about this many points per line
+MARKERS_UP_TO = 60 # above this many points the markers are dropped, they would just be a thick line
+TICK_EVERY_MONTH_UP_TO = 12 # short histories get one "YYYY-MM" tick per month like before
+
+
+
+
+
+# DATES AND DOWNSAMPLING
+def months_to_dates(months):
+    # "YYYY-MM" strings -> matplotlib date numbers (first day of each month)
+    if not months:
+        return np.array([], dtype=float)
+    return mdates.date2num(np.array(months, dtype='datetime64[M]').astype('datetime64[D]'))
+
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: indexes of about "threshold" points that keep the
+    # shape of the line (peaks and dips survive, flat stretches are thinned out)
+    count = len(x)
+    if threshold >= count or threshold < 3:
+        return np.arange(count)
+
+    # first and last points are always kept, the rest is split into threshold - 2 buckets
+    edges = np.linspace(1, count - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0] = 0
+    keep[-1] = count - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # the average of the next bucket is the third corner of the triangle
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else count
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) -
+                       (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(areas.argmax())
+        keep[bucket + 1] = previous
+    return keep
+
+
+def dense_category_values(matrix):
+    # CategoryMatrix -> (dates of every month from the first to the last, pesos array of
+    # categories x months); months without transactions are zeros so the stack has no gaps
+    if not matrix.months:
+        return np.array([], dtype=float), np.zeros((len(matrix.categories), 0))
+    months = np.array(matrix.months, dtype='datetime64[M]')
+    every_month = np.arange(months[0], months[-1] + 1)
+    values = np.zeros((len(matrix.categories), len(every_month)), dtype=np.int64)
+    values[:, (months - months[0]).astype(np.int64)] = np.array(matrix.totals, dtype=np.int64).T
+    dates = mdates.date2num(every_month.astype('datetime64[D]'))
+    return dates, values / CENTS_PER_PESO
+
+
+
+
+
+# TREND FIGURE (no tkinter in here, so it also renders headless with the Agg backend)
+class TrendFigure:
+    # the figure, axes and every line are created once; refreshing only swaps the data
+    def __init__(self, figsize=(6.5, 4.2), dpi=100):
+        with matplotlib.style.context('dark_background'):
+            self.figure = Figure(figsize=figsize, dpi=dpi)
+            self.ax = self.figure.add_subplot()
+
+            self.lines = {}
+            self.lines['Total'] = self.ax.plot([], [], marker='o', color=GRAPH_COLORS['Total'],
+                                               linewidth=3, label='Total')[0]
+            for name in ('Water', 'Electricity', 'Others'):
+                self.lines[name] = self.ax.plot([], [], marker='.', color=GRAPH_COLORS[name],
+                                                linewidth=2, label=name)[0]
+            for line in self.lines.values():
+                line.default_marker = line.get_marker()
+
+            self.legend = self.ax.legend(handles=[self.lines[name] for name in ('Water', 'Electricity', 'Others')],
+                                         loc='upper left',
+                                         bbox_to_anchor=(1.0, 1.0),
+                                         facecolor=PRIMARY_COLOR,
+                                         edgecolor=TEXT_COLOR,
+                                         labelcolor=TEXT_COLOR,
+                                         ncol=1,
+                                         fontsize=8)
+
+            self.empty_text = self.ax.text(0.5, 0.5, NO_DATA_TEXT, transform=self.ax.transAxes,
+                                           ha='center', va='center', color=TEXT_COLOR,
+                                           fontsize=10, fontstyle='italic')
+
+        self.figure.patch.set_facecolor(PRIMARY_COLOR)
+        self.ax.set_facecolor(SECONDARY_COLOR)
+        self.ax.tick_params(axis='x', colors=TEXT_COLOR)
+        self.ax.tick_params(axis='y', colors=TEXT_COLOR)
+        self.ax.spines['right'].set_visible(False)
+        self.ax.spines['top'].set_visible(False)
+        self.ax.set_xlabel("Month", color=TEXT_COLOR)
+
+        # months are real dates, matplotlib picks how many ticks fit and how to label them
+        self.auto_locator = mdates.AutoDateLocator(minticks=3, maxticks=8)
+        self.auto_formatter = mdates.ConciseDateFormatter(self.auto_locator)
+        self.month_formatter = mdates.DateFormatter('%Y-%m')
+        self.ax.grid(axis='y', linestyle='--', alpha=0.5, color=BUTTON_COLOR)
+        self.title = self.ax.set_title("", color=TEXT_COLOR, fontsize=12, fontweight='bold')
+
+        # the category view: the stack is redrawn on every update, its legend only when the categories change
+        self.stack = []
+        self.category_legend = None
+        self.legend_categories = None
+
+        self.view = "total"
+        self.rows = []
+        self.matrix = None
+        self.refresh_count = 0
+
+
+    def update(self, rows=None, view=None, matrix=None):
+        # rows are (month, water, electricity, others, total), amounts in centavos, oldest month first;
+        # matrix is the CategoryMatrix for the "categories" view
+        if rows is not None:
+            self.rows = list(rows)
+        if matrix is not None:
+            self.matrix = matrix
+        if view is not None:
+            self.view = view
+        settings = VIEWS[self.view]
+
+        for collection in self.stack:
+            collection.remove()
+        self.stack = []
+
+        if self.view == "categories":
+            dates, values = dense_category_values(self.matrix) if self.matrix else (np.array([], dtype=float), None)
+            has_data = len(dates) > 0
+            if has_data:
+                self._draw_stack(dates, values)
+        else:
+            has_data = bool(self.rows)
+            dates = months_to_dates([row[0] for row in self.rows])
+        if self.category_legend is not None:
+            self.category_legend.set_visible(has_data and self.view == "categories")
+
+        for name, index in LINE_COLUMNS.items():
+            line = self.lines[name]
+            line.set_visible(has_data and name in settings["lines"])
+            if not line.get_visible():
+                line.set_data([], [])
+                continue
+
+            values = np.array([row[index] or 0 for row in self.rows], dtype=np.int64) / CENTS_PER_PESO
+            keep = lttb(dates, values, MAX_POINTS)
+            line.set_data(dates[keep], values[keep])
+            line.set_marker(line.default_marker if len(keep) <= MARKERS_UP_TO else 'None')
+
+        self.legend.set_visible(has_data and self.view == "breakdown")
+        self.empty_text.set_visible(not has_data)
+        self.title.set_text(settings["title"] if has_data else "")
+        self.ax.set_ylabel(settings["ylabel"] if has_data else "", color=TEXT_COLOR)
+        self.figure.subplots_adjust(**settings["margins"])
+
+        if len(dates) <= TICK_EVERY_MONTH_UP_TO:
+            self.ax.xaxis.set_major_locator(FixedLocator(dates))
+            self.ax.xaxis.set_major_formatter(self.month_formatter)
+        else:
+            self.ax.xaxis.set_major_locator(self.auto_locator)
+            self.ax.xaxis.set_major_formatter(self.auto_formatter)
+        # labels rotate once there are more than 6 of them, like before
+        crowded = 6 < len(dates) <= TICK_EVERY_MONTH_UP_TO
+        self.ax.tick_params(axis='x', labelsize=8 if len(dates) > 6 else 10, labelrotation=45 if crowded else 0)
+
+        if self.view == "categories" and has_data:
+            # relim() skips the stack's polygons, so the limits are set by hand
+            top = values.sum(axis=0).max()
+            self.ax.set_ylim(0, top * 1.05 if top > 0 else 1)
+            if len(dates) > 1:
+                self.ax.set_xlim(dates[0], dates[-1])
+        else:
+            self.ax.set_autoscale_on(True) # set_xlim() turns autoscaling off
+            self.ax.relim(visible_only=True)
+            self.ax.autoscale_view()
+        if len(dates) == 1:
+            self.ax.set_xlim(dates[0] - 16, dates[0] + 16) # half a month each side
+
+        self.refresh_count += 1
+
+
+    def _draw_stack(self, dates, values):
+        colors = [CATEGORY_COLORS.get(category, OTHER_CATEGORY_COLOR) for category in self.matrix.categories]
+        if len(dates) == 1:
+            # a single month is a stacked bar, an area needs two points
+            bottom = 0.0
+            for value, color in zip(values[:, 0], colors):
+                self.stack.append(self.ax.bar(dates, [value], width=20, bottom=bottom, color=color))
+                bottom += value
+        else:
+            self.stack = self.ax.stackplot(dates, values, colors=colors, alpha=0.9, linewidth=0)
+
+        if self.legend_categories != self.matrix.categories:
+            if self.category_legend is not None:
+                self.category_legend.remove()
+            # newest spending on top in the stack, so the legend lists the categories top down
+            handles = [Patch(facecolor=color, label=category) for category, color
+                       in reversed(list(zip(self.matrix.categories, colors)))]
+            self.category_legend = Legend(self.ax, handles, [handle.get_label() for handle in handles],
+                                          loc='upper left', bbox_to_anchor=(1.0, 1.0), facecolor=PRIMARY_COLOR,
+                                          edgecolor=TEXT_COLOR, labelcolor=TEXT_COLOR, fontsize=8)
+            self.ax.add_artist(self.category_legend)
+            self.legend_categories = list(self.matrix.categories)
+
+
+    def save(self, path, **kwargs):
+        self.figure.savefig(path, facecolor=self.figure.get_facecolor(), **kwargs)
+
+
+
+
+
+# BACKGROUND TREND CHART (drawn by Agg on the worker's render thread, shown as an image)
+class BackgroundTrendChart:
+    # the TrendFigure is only ever touched by the render thread; the main thread just
+    # swaps a PhotoImage when a finished PNG comes back, so big plots never freeze the window
+    def __init__(self, master, worker, figsize=(6.5, 4.2), dpi=100):
+        import tkinter as tk
+
+        self._tk = tk
+        self.master = master
+        self.worker = worker
+        self.figsize = figsize
+        self.dpi = dpi
+
+        # built by the first render, so creating the chart costs the main thread nothing
+        self.trend = None
+        self.canvas = None
+
+        self.label = tk.Label(master, bg=PRIMARY_COLOR, borderwidth=0)
+        self.label.pack(fill='both', expand=True)
+        self.master.pack_propagate(False) # the image follows the frame size, never the other way around
+        self.image = None
+
+        self.view = "total"
+        self.rows = []
+        self.matrix = None
+        self.size = None
+        self.master.bind('<Configure>', self._on_resize, add='+')
+
+
+    def update(self, rows=None, view=None, matrix=None):
+        if rows is not None:
+            self.rows = list(rows)
+        if matrix is not None:
+            self.matrix = matrix
+        if view is not None:
+            self.view = view
+
+        # a newer update replaces a render that has not started yet
+        rows, view, matrix, size = self.rows, self.view, self.matrix, self.size
+        self.worker.render("chart", lambda: self._render(rows, view, matrix, size), on_done=self._show)
+
+
+    @PROFILER.stage("chart: agg render")
+    def _render(self, rows, view, matrix, size):
+        # render thread
+        if self.trend is None:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self.trend = TrendFigure(figsize=self.figsize, dpi=self.dpi)
+            self.canvas = FigureCanvasAgg(self.trend.figure)
+
+        if size:
+            self.trend.figure.set_size_inches(size[0] / self.dpi, size[1] / self.dpi)
+        self.trend.update(rows, view, matrix)
+
+        png = io.BytesIO()
+        self.canvas.print_png(png)
+        return base64.b64encode(png.getvalue())
+
+
+    @PROFILER.stage("ui: chart show image")
+    def _show(self, png_data):
+        # main thread
+        if not self.label.winfo_exists():
+            return
+        self.image = self._tk.PhotoImage(data=png_data)
+        self.label.configure(image=self.image)
+
+
+    def _on_resize(self, event):
+        size = (event.width, event.height)
+        if size != self.size and event.width > 50 and event.height > 50:
+            self.size = size
+            self.update()
+
+
+    def destroy(self):
+        self.label.destroy()
@@ -1,7 +1,6 @@
 import sqlite3
 from datetime import datetime
-
-DB_FILE = 'expenses_tracker.db' 
+from db_connection import DB_FILE, get_connection, close_all_pools
 
 target_month = datetime.now().strftime("%Y-%m") 
 
@@ -9,23 +8,22 @@ print(f"Checking for old transactions for month: {target_month}")
 print("-" * 40)
 
 try:
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+    with get_connection(DB_FILE) as conn:
+        cursor = conn.cursor()
 
-    cursor.execute("SELECT COUNT(*) FROM transactions WHERE month=?", (target_month,))
-    count_before = cursor.fetchone()[0]
-    
-    if count_before > 0:
-        cursor.execute("DELETE FROM transactions WHERE month=?", (target_month,))
-        conn.commit()
-        print(f"🎉 SUCCESS: Deleted {count_before} old categorized transactions for {target_month}.")
-        print("You can now run your main app and the total will start from zero.")
-    else:
-        print("No old categorized transactions found for this month. Database is clean.")
+        cursor.execute("SELECT COUNT(*) FROM transactions WHERE month=?", (target_month,))
+        count_before = cursor.fetchone()[0]
+        
+        if count_before > 0:
+            cursor.execute("DELETE FROM transactions WHERE month=?", (target_month,))
+            conn.commit()
+            print(f"🎉 SUCCESS: Deleted {count_before} old categorized transactions for {target_month}.")
+            print("You can now run your main app and the total will start from zero.")
+        else:
+            print("No old categorized transactions found for this month. Database is clean.")
 
 except sqlite3.Error as e:
     print(f"❌ DATABASE ERROR: Could not clear data. Error: {e}")
     
 finally:
-    if conn:
-        conn.close()
\ No newline at end of file
+    close_all_pools()
\ No newline at end of file
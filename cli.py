@@ -0,0 +1,278 @@
+# IMPORTED EXTENSIONS
+import argparse
+import json
+import sys
+from db_connection import DB_FILE, get_connection, close_all_pools # pooled database connections
+from migrations import migrate # versioned database schema
+from expense_service import ExpenseService, ExpenseRepository, CATEGORIES, SEARCH_LIMIT, RecordNotFoundError # headless data layer
+from money import average, format_pesos as money, json_ready # exact amounts in centavos
+
+# the app without a window, for scripts and nightly jobs:
+#   python cli.py month add 2024-05 --water 450 --electricity 2100
+#   python cli.py tx add 2024-05 Transport 25 --description "bus"
+#   python cli.py tx search "grab ride" --from 2024-01 --to 2024-12
+#   python cli.py summary --last 6
+#   python cli.py summary --year 2024 --quarter 2
+#   python cli.py chart trend.png --view breakdown --from 2024-01 --to 2024-06
+#   python cli.py chart categories.png --view categories
+# it never imports tkinter, and matplotlib only loads for the chart command,
+# so everything else starts in a fraction of a second.
+
+
+
+# CLI SETTINGS
+DEFAULT_USER = "admin"
+
+
+
+
+
+# OUTPUT
+def emit(args, data, text):
+    # --json prints the data for other programs, otherwise the text for people
+    if args.json:
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+    else:
+        print(text)
+
+
+def comparison_text(month, comparison):
+    # the same messages the app pops up after saving a month
+    if comparison.status == "increase":
+        return (f"WARNING! {month} total {money(comparison.total)} is higher than the previous month "
+                f"({money(comparison.last_total)}), up by {money(comparison.difference)}.\n{comparison.sdg_tip}")
+    if comparison.status == "decrease":
+        return (f"You saved! {month} total {money(comparison.total)} is lower than the previous month "
+                f"({money(comparison.last_total)}), down by {money(-comparison.difference)}.")
+    if comparison.status == "same":
+        return f"{month} total {money(comparison.total)} is the same as the previous month."
+    return f"{month} is the first month on record: {money(comparison.total)}.\n{comparison.sdg_tip}"
+
+
+def period_range(service, args):
+    # the --from/--to, --year/--quarter or --last options as a PeriodRange, None for every month
+    return service.resolve_range(first_month=args.first_month, last_month=args.last_month,
+                                 year=args.year, quarter=args.quarter, last=args.last)
+
+
+def expense_table(rows):
+    lines = [f"{'month':<8} {'water':>12} {'electricity':>14} {'others':>14} {'total':>14}"]
+    for row in rows:
+        lines.append(f"{row.month:<8} {money(row.water):>12} {money(row.electricity):>14} "
+                     f"{money(row.others):>14} {money(row.total):>14}")
+    return "\n".join(lines)
+
+
+
+
+
+# MONTHS
+def month_add(service, args):
+    comparison = service.add_expense(args.month, args.water, args.electricity)
+    emit(args, {"month": args.month, "comparison": json_ready(comparison)}, comparison_text(args.month, comparison))
+
+
+def month_edit(service, args):
+    # bills that are not given keep their saved value
+    current = service.get_expense(args.month)
+    if current is None:
+        raise RecordNotFoundError(f"No record found for the month '{args.month}' to update.")
+    row = service.update_expense(args.month,
+                                 current.water if args.water is None else args.water,
+                                 current.electricity if args.electricity is None else args.electricity)
+    emit(args, json_ready(row), expense_table([row]))
+
+
+def month_delete(service, args):
+    if not service.delete_expenses(args.months):
+        raise RecordNotFoundError(f"No record found for {', '.join(args.months)}.")
+    emit(args, {"deleted": args.months}, f"Deleted {', '.join(args.months)} and their transactions.")
+
+
+# TRANSACTIONS
+def tx_add(service, args):
+    trans_id = service.add_transaction(args.month, args.category, args.description, args.amount)
+    emit(args, {"id": trans_id}, f"Added transaction {trans_id} to {args.month}.")
+
+
+def tx_list(service, args):
+    rows = service.list_transactions(args.month)
+    lines = [f"{'id':>8}  {'category':<18} {'amount':>12}  description"]
+    lines += [f"{row.id:>8}  {row.category:<18} {money(row.amount):>12}  {row.description}" for row in rows]
+    lines.append(f"{len(rows)} transaction(s), others total {money(service.get_month_others(args.month))}")
+    emit(args, [json_ready(row) for row in rows], "\n".join(lines))
+
+
+def tx_delete(service, args):
+    deleted = service.delete_transactions(args.ids)
+    if deleted < len(args.ids):
+        raise RecordNotFoundError(f"Only {deleted} of {len(args.ids)} transaction(s) existed.")
+    emit(args, {"deleted": args.ids}, f"Deleted {deleted} transaction(s).")
+
+
+def tx_search(service, args):
+    hits = service.search_transactions(args.query, args.category, args.first_month, args.last_month, args.limit)
+    lines = [f"{'id':>8}  {'month':<8} {'category':<18} {'amount':>12}  description"]
+    lines += [f"{hit.id:>8}  {hit.month:<8} {hit.category:<18} {money(hit.amount):>12}  {hit.description}" for hit in hits]
+    lines.append(f"{len(hits)} match(es), best first")
+    emit(args, [json_ready(hit) for hit in hits], "\n".join(lines))
+
+
+def tx_import(service, args):
+    from importer import import_file # only this command needs the statement readers
+
+    report = import_file(args.path, service.repository.db_file, args.format, args.category, user_id=service.user_id,
+                         date_order=args.date_order)
+    service.cache.clear()
+    emit(args, {"imported": report.rows_imported, "rejected": report.rows_rejected,
+                "errors": [error._asdict() for error in report.errors]},
+         "\n".join([report.summary()] + [f"  line {error.line}: {error.reason}" for error in report.errors]))
+
+
+# REPORTS
+def summary(service, args):
+    if args.month:
+        row = service.get_expense(args.month)
+        if row is None:
+            raise RecordNotFoundError(f"No record found for the month '{args.month}'.")
+        rows = [row]
+    else:
+        rows = service.get_trend_data(period_range(service, args))
+
+    totals = [row.total for row in rows]
+    text = expense_table(rows)
+    if len(rows) > 1:
+        text += (f"\n{len(rows)} months, {money(sum(totals))} in all, "
+                 f"{money(average(totals))} per month on average")
+    emit(args, [json_ready(row) for row in rows], text)
+
+
+def compare(service, args):
+    month = args.month
+    if month is None:
+        latest = service.repository.get_latest_expense()
+        if latest is None:
+            raise RecordNotFoundError("No months recorded yet.")
+        month = latest.month
+    comparison = service.compare_month(month)
+    emit(args, {"month": month, "comparison": json_ready(comparison)}, comparison_text(month, comparison))
+
+
+def chart(service, args):
+    # the same chart as the app's graph, drawn headless; matplotlib loads here and only here
+    from chart_view import TrendFigure
+
+    months = period_range(service, args)
+    figure = TrendFigure(figsize=(args.width, args.height), dpi=args.dpi)
+    if args.view == "categories":
+        figure.update(view=args.view, matrix=service.get_category_matrix(months))
+    else:
+        figure.update(service.get_trend_data(months), args.view)
+    figure.save(args.output)
+    emit(args, {"output": args.output}, f"Wrote the {args.view} trend to {args.output}.")
+
+
+
+
+
+# COMMAND LINE
+def add_range_arguments(parser):
+    # one kind of range at a time, see ExpenseService.resolve_range
+    parser.add_argument("--from", dest="first_month", metavar="YYYY-MM")
+    parser.add_argument("--to", dest="last_month", metavar="YYYY-MM")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--quarter", type=int, choices=[1, 2, 3, 4])
+    parser.add_argument("--last", type=int, metavar="N", help="the last N months, up to the newest one recorded")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Expenses Management Tracker without the window.")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--user", default=DEFAULT_USER, help="whose ledger to use")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of text")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    month = commands.add_parser("month", help="add, edit or delete monthly bills").add_subparsers(dest="action", required=True)
+    add = month.add_parser("add")
+    add.add_argument("month", metavar="YYYY-MM")
+    add.add_argument("--water", default="")
+    add.add_argument("--electricity", default="")
+    add.set_defaults(run=month_add)
+    edit = month.add_parser("edit")
+    edit.add_argument("month", metavar="YYYY-MM")
+    edit.add_argument("--water")
+    edit.add_argument("--electricity")
+    edit.set_defaults(run=month_edit)
+    delete = month.add_parser("delete")
+    delete.add_argument("months", nargs="+", metavar="YYYY-MM")
+    delete.set_defaults(run=month_delete)
+
+    tx = commands.add_parser("tx", help="categorized transactions").add_subparsers(dest="action", required=True)
+    add = tx.add_parser("add")
+    add.add_argument("month", metavar="YYYY-MM")
+    add.add_argument("category", choices=CATEGORIES, metavar="CATEGORY", help=", ".join(CATEGORIES))
+    add.add_argument("amount")
+    add.add_argument("--description", default="")
+    add.set_defaults(run=tx_add)
+    listing = tx.add_parser("list")
+    listing.add_argument("month", metavar="YYYY-MM")
+    listing.set_defaults(run=tx_list)
+    delete = tx.add_parser("delete")
+    delete.add_argument("ids", nargs="+", type=int, metavar="ID")
+    delete.set_defaults(run=tx_delete)
+    search = tx.add_parser("search", help="every month's transactions by description")
+    search.add_argument("query", help='words, "an exact phrase" or a prefix*')
+    search.add_argument("--category", choices=CATEGORIES, metavar="CATEGORY")
+    search.add_argument("--from", dest="first_month", metavar="YYYY-MM")
+    search.add_argument("--to", dest="last_month", metavar="YYYY-MM")
+    search.add_argument("--limit", type=int, default=SEARCH_LIMIT)
+    search.set_defaults(run=tx_search)
+    statement = tx.add_parser("import", help="CSV/OFX/QFX/QIF statement")
+    statement.add_argument("path")
+    statement.add_argument("--format", choices=["csv", "ofx", "qfx", "qif"])
+    statement.add_argument("--category", choices=CATEGORIES, help="for rows without a known category")
+    statement.add_argument("--date-order", choices=["day-first", "month-first"],
+                           help="how to read slashed dates like 03/04/2025 (ambiguous ones are rejected without it)")
+    statement.set_defaults(run=tx_import)
+
+    report = commands.add_parser("summary", help="monthly totals")
+    report.add_argument("--month", metavar="YYYY-MM")
+    add_range_arguments(report)
+    report.set_defaults(run=summary)
+
+    report = commands.add_parser("compare", help="a month against the previous one, with the SDG tip")
+    report.add_argument("month", nargs="?", metavar="YYYY-MM", help="default: the latest month")
+    report.set_defaults(run=compare)
+
+    report = commands.add_parser("chart", help="render the trend chart to an image (.png, .svg, .pdf)")
+    report.add_argument("output")
+    report.add_argument("--view", choices=["total", "breakdown", "categories"], default="total")
+    report.add_argument("--width", type=float, default=6.5, help="inches")
+    report.add_argument("--height", type=float, default=4.2, help="inches")
+    report.add_argument("--dpi", type=int, default=100)
+    add_range_arguments(report)
+    report.set_defaults(run=chart)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        with get_connection(args.db) as conn:
+            migrate(conn)
+        repository = ExpenseRepository(args.db)
+        user = repository.get_user(args.user)
+        if user is None:
+            print(f"error: unknown user '{args.user}'", file=sys.stderr)
+            return 1
+        args.run(ExpenseService(repository.for_user(user[0])), args)
+        return 0
+    except (ValueError, LookupError, OSError) as e: # input errors, duplicates, missing records, bad files
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        close_all_pools()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
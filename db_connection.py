@@ -0,0 +1,150 @@
+# IMPORTED EXTENSIONS
+import sqlite3 # for database
+import threading # so the pool can be shared safely
+from contextlib import contextmanager
+from queue import LifoQueue, Empty, Full
+from instrumentation import connection_factory # timed connections when profiling is on
+
+
+
+# DATABASE SETTINGS
+DB_FILE = 'expenses_tracker.db' # name of the database
+
+POOL_SIZE = 4 # how many long-lived connections we keep open
+STATEMENT_CACHE_SIZE = 256 # prepared statements cached per connection
+BUSY_TIMEOUT_SECONDS = 5.0 # wait this long if another writer holds the lock
+
+# applied once to every connection when it is opened
+PRAGMAS = {
+    "journal_mode": "WAL", # readers don't block the writer and vice versa
+    "synchronous": "NORMAL", # safe with WAL and much faster than FULL
+    "foreign_keys": "ON",
+    "temp_store": "MEMORY",
+    "cache_size": -8000, # negative means KiB, so about 8 MB of page cache
+}
+
+
+
+
+
+# CONNECTION POOL
+class ConnectionPool:
+    # keeps a few sqlite connections open instead of connecting on every call
+    def __init__(self, db_file=DB_FILE, size=POOL_SIZE, pragmas=None):
+        self.db_file = db_file
+        self.size = size
+        self.pragmas = dict(PRAGMAS if pragmas is None else pragmas)
+
+        self._idle = LifoQueue(maxsize=size)
+        self._all = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_file,
+                               timeout=BUSY_TIMEOUT_SECONDS,
+                               cached_statements=STATEMENT_CACHE_SIZE,
+                               check_same_thread=False,
+                               factory=connection_factory())
+
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+
+    def acquire(self):
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed.")
+
+        # reuse the most recently returned connection (its cache is warm)
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+
+        with self._lock:
+            if len(self._all) < self.size:
+                conn = self._open()
+                self._all.append(conn)
+                return conn
+
+        # every connection is busy, wait for one to come back
+        return self._idle.get(timeout=BUSY_TIMEOUT_SECONDS)
+
+
+    def release(self, conn):
+        if self._closed:
+            conn.close()
+            return
+
+        # never hand out a connection that is still inside a transaction
+        if conn.in_transaction:
+            conn.rollback()
+
+        try:
+            self._idle.put_nowait(conn)
+        except Full:
+            conn.close()
+
+
+    @contextmanager
+    def connection(self):
+        # borrow a connection, commit if everything went fine, rollback if not
+        conn = self.acquire()
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._all.clear()
+
+        while True:
+            try:
+                self._idle.get_nowait()
+            except Empty:
+                break
+
+
+
+
+
+# SHARED POOL (one per database file for the whole app)
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_file=DB_FILE):
+    with _pools_lock:
+        pool = _pools.get(db_file)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(db_file)
+            _pools[db_file] = pool
+        return pool
+
+
+def get_connection(db_file=DB_FILE):
+    # usage: with get_connection() as conn: conn.execute(...)
+    return get_pool(db_file).connection()
+
+
+def close_all_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
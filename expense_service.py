@@ -0,0 +1,906 @@
+# IMPORTED EXTENSIONS
+import csv # for rows pasted from spreadsheets
+import re # for search queries
+from collections import namedtuple
+from db_connection import DB_FILE, get_connection # pooled database connections
+from auth import hash_password, verify_password # for password security
+from query_cache import ALL_MONTHS, get_cache # repeated reads are served from memory
+from money import Money # exact amounts in whole centavos
+from periods import is_month, needs_latest, parse_range, resolve_range # integer month keys and date ranges
+
+# this module must never import tkinter or matplotlib: scripts, the CLI and
+# the benchmarks drive the whole app through it without a display
+
+
+
+# the admin account made by the first migration; owns every record from before user_id existed
+DEFAULT_USER_ID = 1
+
+
+
+# SPENDING CATEGORIES (the only ones the app accepts for transactions)
+CATEGORIES = ['Food & Groceries', 'Transport', 'Healthcare',
+              'Sustainable Goods', 'Wasteful Spending', 'Entertainment']
+
+
+
+# SDG INTEGRATION & ANALYSIS (for pop up warnings when the total is increasing than last month)
+SDG_TIPS = {
+    "water": "SDG 6 Tip: Check for leaks or shorten showers to save thousands of liters of water and money!",
+    "electricity": "SDG 7 & 13 Tip: Unplug appliances to stop 'phantom power.' Switching to LED bulbs also drastically reduces kWh use.",
+    "others": "SDG 12 Tip: Before buying non-essentials, consider if it's durable, locally sourced, or second-hand to promote responsible consumption.",
+    "default": "Great job tracking your finances! Saving money is the first step towards promoting responsible consumption."
+}
+
+
+
+# the sort choices of the main table (whitelisted because ORDER BY can't be a parameter)
+SORT_ORDERS = ("month DESC", "total DESC", "total ASC")
+
+# keyset pagination: the columns that make up the sort key of each sort order and its direction
+# (month is unique, so it breaks ties between equal totals)
+SORT_KEYS = {
+    "month DESC": (("month",), "DESC"),
+    "total DESC": (("total", "month"), "DESC"),
+    "total ASC": (("total", "month"), "ASC"),
+}
+
+# the database column behind each ExpenseRow field (amounts are stored in centavos)
+EXPENSE_COLUMNS = {"month": "month", "water": "water_cents", "electricity": "electricity_cents",
+                   "others": "others_cents", "total": "total_cents"}
+EXPENSE_SELECT = "SELECT month, water_cents, electricity_cents, others_cents, total_cents FROM expenses"
+TRANSACTION_SELECT = "SELECT id, category, description, amount_cents FROM transactions"
+
+
+
+# DESCRIPTION SEARCH
+SEARCH_LIMIT = 100 # results shown
+SEARCH_WINDOW = 2000 # the newest matches that get ranked, ranking every hit of a common word costs ~1 µs each
+MAX_MONTH_PHRASES = 12 # longer month ranges are narrowed by whole years, very long ones only on the rows
+SEARCH_TERM = re.compile(r'"([^"]*)"?(\*?)|(\S+)')
+
+
+
+
+
+# INPUT VALIDATION
+def is_valid_month_format(month_str):
+    # exactly YYYY-MM: strptime also took "2024-5", which sorts after "2024-10" as text
+    return is_month(month_str)
+
+
+def clean_currency_input(value):
+    # for peso sign para astig
+    if isinstance(value, str):
+        return value.replace('₱', '').replace(',', '').strip()
+    return str(value)
+
+
+def parse_month(month_str):
+    month = (month_str or "").strip()
+    if not is_valid_month_format(month):
+        raise InputError("Month format is incorrect (must be YYYY-MM).")
+    return month
+
+
+def parse_money(value):
+    # pesos as typed (or a Money already) -> Money, read as a decimal so "0.1" is exactly 10 centavos
+    try:
+        return Money.parse(value)
+    except ValueError as e:
+        raise InputError(str(e))
+
+
+def parse_bill(value):
+    # empty means zero, negative is not allowed
+    bill = parse_money(value) if clean_currency_input(value if value is not None else "") else Money(0)
+    if bill < 0:
+        raise InputError("Bills must be non-negative numbers.")
+    return bill
+
+
+def parse_amount(value):
+    # transaction amounts must be positive
+    amount = parse_money(value)
+    if amount <= 0:
+        raise InputError("Amount must be positive.")
+    return amount
+
+
+def parse_category(category):
+    if category not in CATEGORIES:
+        raise InputError(f"Unknown category '{category}'.")
+    return category
+
+
+def match_category(text):
+    # the category a pasted cell means, ignoring case and spaces (the text itself when unknown)
+    wanted = " ".join((text or "").split()).lower()
+    for category in CATEGORIES:
+        if category.lower() == wanted:
+            return category
+    return (text or "").strip()
+
+
+def search_terms(text):
+    # what was typed -> FTS5 phrases, every one of them has to match:
+    #   grab ride      both words anywhere in the description
+    #   "grab ride"    the words next to each other
+    #   gra* "grab r"* prefix of the (last) word
+    # everything is quoted, so FTS5 operators and punctuation typed by the user are just text
+    terms = []
+    for phrase, phrase_star, word in SEARCH_TERM.findall(text or ""):
+        body = word or phrase
+        prefix = "*" if phrase_star or body.endswith("*") else "" # also '"grab r*' while still typing
+        body = body.rstrip("*")
+        if any(ch.isalnum() for ch in body):
+            terms.append('"' + body.replace('"', '""') + '"' + prefix)
+    return terms
+
+
+def month_phrases(first_month, last_month, limit=MAX_MONTH_PHRASES):
+    # the months first..last as few FTS5 phrases of the month column: "2024" for a whole year,
+    # "2024 05" for a single month (the tokenizer splits "2024-05" at the dash). above "limit"
+    # phrases the partial years count as whole ones (more hits to check, the rows are filtered
+    # exactly anyway) and above "limit" years there are no phrases at all
+    first_year, first = map(int, first_month.split("-"))
+    last_year, last = map(int, last_month.split("-"))
+    if (first_year, first) > (last_year, last):
+        return []
+    phrases = []
+    for year in range(first_year, last_year + 1):
+        start = first if year == first_year else 1
+        end = last if year == last_year else 12
+        if start == 1 and end == 12:
+            phrases.append(f'"{year:04d}"')
+        else:
+            phrases.extend(f'"{year:04d} {month:02d}"' for month in range(start, end + 1))
+    if len(phrases) <= limit:
+        return phrases
+    if last_year - first_year < limit:
+        return [f'"{year:04d}"' for year in range(first_year, last_year + 1)]
+    return None
+
+
+def search_expression(terms, months=()):
+    # the MATCH expression: the terms in the description, and the month phrases when given
+    expression = f"description : ({' '.join(terms)})"
+    if months: # None or empty: no month phrases
+        expression += f" AND month : ({' OR '.join(months)})"
+    return expression
+
+
+def split_pasted_rows(text):
+    # rows copied from a spreadsheet (tab separated) or a CSV file, blank lines dropped
+    lines = [line for line in (text or "").splitlines() if line.strip()]
+    if any("\t" in line for line in lines):
+        return [line.split("\t") for line in lines]
+    return list(csv.reader(lines))
+
+
+
+
+
+# ERRORS (all of them are ValueErrors so old "except ValueError" code keeps working)
+class InputError(ValueError):
+    pass
+
+
+class DuplicateMonthError(ValueError):
+    pass
+
+
+class EmptyExpenseError(ValueError):
+    pass
+
+
+class DuplicateUserError(ValueError):
+    pass
+
+
+class BatchInputError(InputError):
+    # every bad row of a batch at once: errors maps the row index to its message
+    def __init__(self, errors):
+        self.errors = dict(errors)
+        super().__init__("; ".join(f"Row {index + 1}: {message}" for index, message in sorted(self.errors.items())))
+
+
+class RecordNotFoundError(LookupError):
+    pass
+
+
+
+
+
+# RESULT TYPES (every amount is Money)
+ExpenseRow = namedtuple("ExpenseRow", "month water electricity others total")
+TransactionRow = namedtuple("TransactionRow", "id category description amount")
+
+
+def expense_row(row):
+    # (month, water_cents, electricity_cents, others_cents, total_cents) from the database
+    month, water, electricity, others, total = row
+    return ExpenseRow(month, Money(water), Money(electricity), Money(others), Money(total))
+
+
+def transaction_row(row):
+    trans_id, category, description, amount = row
+    return TransactionRow(trans_id, category, description, Money(amount))
+
+SearchHit = namedtuple("SearchHit", "id month category description amount")
+
+
+def search_hit(row):
+    trans_id, month, category, description, amount = row
+    return SearchHit(trans_id, month, category, description, Money(amount))
+
+
+# spending per category and month: months oldest first, categories in CATEGORIES order (plus any
+# unknown ones from older data at the end), totals[i][j] is Money for months[i] and categories[j]
+CategoryMatrix = namedtuple("CategoryMatrix", "months categories totals counts")
+
+
+def category_matrix(rows):
+    # (month, category, amount_cents, transaction_count) rows ordered by month -> CategoryMatrix
+    categories = list(CATEGORIES)
+    column = {category: index for index, category in enumerate(categories)}
+    months, totals, counts = [], [], []
+    for month, category, amount, count in rows:
+        if category not in column:
+            column[category] = len(categories)
+            categories.append(category)
+        if not months or months[-1] != month:
+            months.append(month)
+            totals.append({})
+            counts.append({})
+        totals[-1][column[category]] = amount
+        counts[-1][column[category]] = count
+    width = len(categories)
+    return CategoryMatrix(months, categories,
+                          [[Money(month_totals.get(index, 0)) for index in range(width)] for month_totals in totals],
+                          [[month_counts.get(index, 0) for index in range(width)] for month_counts in counts])
+
+
+# a validated monthly record that is ready to be saved
+ExpenseDraft = namedtuple("ExpenseDraft", "month water electricity others total zero_fields")
+
+# status is "first", "increase", "decrease" or "same"
+Comparison = namedtuple("Comparison", "status total last_total difference sdg_key sdg_tip")
+
+
+def range_filter(period_range, by_month=False):
+    # the WHERE part and parameters for a PeriodRange (None is every month). by_month gives the
+    # same range as month text bounds, for queries that are ordered by month anyway
+    if period_range is None:
+        return "", []
+    if by_month:
+        return " AND month BETWEEN ? AND ?", [period_range.first_month, period_range.last_month]
+    return " AND period BETWEEN ? AND ?", [period_range.first, period_range.last]
+
+
+def expense_sort_key(row, sort_by="month DESC"):
+    # the keyset pagination key of an ExpenseRow for the given sort order
+    return tuple(getattr(row, column) for column in SORT_KEYS[sort_by][0])
+
+
+def transaction_sort_key(row):
+    return (row.id,)
+
+
+def compare_expenses(draft, latest):
+    # a record against an earlier one (None when it is the first) and the SDG tip that fits
+    if latest is None:
+        return Comparison("first", draft.total, None, Money(0), "default", SDG_TIPS["default"])
+
+    last_total = latest.total or Money(0)
+    difference = draft.total - last_total
+
+    if difference > 0:
+        increases = {
+            "water": draft.water - (latest.water or 0),
+            "electricity": draft.electricity - (latest.electricity or 0),
+            "others": draft.others - (latest.others or 0)
+        }
+        sdg_key = max(increases, key=lambda k: increases[k])
+        if increases[sdg_key] <= 0:
+            sdg_key = "default"
+        return Comparison("increase", draft.total, last_total, difference, sdg_key, SDG_TIPS[sdg_key])
+
+    status = "decrease" if difference < 0 else "same"
+    return Comparison(status, draft.total, last_total, difference, "default", SDG_TIPS["default"])
+
+
+
+
+
+# REPOSITORY (only SQL in here, no validation and no popups)
+class ExpenseRepository:
+    # every query is scoped to one user (household); user_id defaults to the admin account.
+    # pool=None borrows from the shared pool of db_file, pass a ConnectionPool to use your own
+    def __init__(self, db_file=DB_FILE, pool=None, user_id=DEFAULT_USER_ID):
+        self.db_file = db_file
+        self.pool = pool
+        self.user_id = user_id
+
+
+    def for_user(self, user_id):
+        # same database and pool, another user's data
+        return ExpenseRepository(self.db_file, self.pool, user_id)
+
+
+    def connection(self):
+        # use it in a with-block, commits on success
+        if self.pool is not None:
+            return self.pool.connection()
+        return get_connection(self.db_file)
+
+
+    # MONTHLY EXPENSES
+    def list_expenses(self, sort_by="month DESC", period_range=None):
+        if sort_by not in SORT_ORDERS:
+            raise ValueError(f"Unsupported sort order '{sort_by}'.")
+        columns, direction = SORT_KEYS[sort_by]
+        order_by = ", ".join(f"{EXPENSE_COLUMNS[column]} {direction}" for column in columns)
+        in_range, range_params = range_filter(period_range, by_month=True)
+        with self.connection() as conn:
+            rows = conn.execute(f"{EXPENSE_SELECT} WHERE user_id=?{in_range} ORDER BY {order_by}",
+                                [self.user_id] + range_params).fetchall()
+        return [expense_row(row) for row in rows]
+
+
+    def list_expenses_page(self, sort_by="month DESC", after=None, before=None, limit=100, period_range=None):
+        # keyset pagination: the rows right after (or right before) the given sort key,
+        # always returned in display order. never uses OFFSET so deep pages stay fast.
+        # a period_range keeps the pages inside those months
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unsupported sort order '{sort_by}'.")
+        columns, direction = SORT_KEYS[sort_by]
+
+        backwards = before is not None
+        key = before if backwards else after
+        order = direction if not backwards else ("ASC" if direction == "DESC" else "DESC")
+
+        in_range, range_params = range_filter(period_range, by_month=True)
+        where = f"WHERE user_id=?{in_range}"
+        params = [self.user_id] + range_params
+        if key is not None:
+            operator = "<" if order == "DESC" else ">"
+            sql_columns = ", ".join(EXPENSE_COLUMNS[column] for column in columns)
+            where += f" AND ({sql_columns}) {operator} ({', '.join('?' * len(columns))})"
+            params.extend(key)
+
+        order_by = ", ".join(f"{EXPENSE_COLUMNS[column]} {order}" for column in columns)
+        with self.connection() as conn:
+            rows = conn.execute(f"{EXPENSE_SELECT} {where} ORDER BY {order_by} LIMIT ?", params + [limit]).fetchall()
+
+        if backwards:
+            rows.reverse()
+        return [expense_row(row) for row in rows]
+
+
+    def get_expense(self, month):
+        with self.connection() as conn:
+            row = conn.execute(f"{EXPENSE_SELECT} WHERE user_id=? AND month=?", (self.user_id, month)).fetchone()
+        return expense_row(row) if row else None
+
+
+    def get_latest_expense(self):
+        with self.connection() as conn:
+            row = conn.execute(f"{EXPENSE_SELECT} WHERE user_id=? ORDER BY month DESC LIMIT 1", (self.user_id,)).fetchone()
+        return expense_row(row) if row else None
+
+
+    def get_previous_expense(self, month):
+        # the closest saved month before this one
+        with self.connection() as conn:
+            row = conn.execute(f"{EXPENSE_SELECT} WHERE user_id=? AND month<? ORDER BY month DESC LIMIT 1",
+                               (self.user_id, month)).fetchone()
+        return expense_row(row) if row else None
+
+
+    def get_trend_data(self, period_range=None):
+        # oldest month first, for the graphs. a period_range reads only its months off the period index
+        if period_range is None:
+            sql, params = f"{EXPENSE_SELECT} WHERE user_id=? ORDER BY month ASC", [self.user_id]
+        else:
+            in_range, range_params = range_filter(period_range)
+            sql, params = f"{EXPENSE_SELECT} WHERE user_id=?{in_range} ORDER BY period ASC", [self.user_id] + range_params
+        with self.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [expense_row(row) for row in rows]
+
+
+    def get_latest_period(self):
+        # the newest month with bills or transactions as a period key, None for an empty ledger.
+        # "the last N months" count back from it
+        with self.connection() as conn:
+            expenses = conn.execute("SELECT MAX(period) FROM expenses WHERE user_id=?", (self.user_id,)).fetchone()[0]
+            rollups = conn.execute("SELECT MAX(period) FROM category_rollups WHERE user_id=?", (self.user_id,)).fetchone()[0]
+        periods = [period for period in (expenses, rollups) if period is not None]
+        return max(periods) if periods else None
+
+
+    def get_category_rollups(self, period_range=None):
+        # (month, category, amount_cents, transaction_count), oldest month first. category_rollups is
+        # kept by triggers, so this is one primary key range instead of a GROUP BY over every transaction
+        if period_range is None:
+            sql, params = "WHERE user_id=? ORDER BY month, category", [self.user_id]
+        else:
+            in_range, range_params = range_filter(period_range)
+            sql, params = f"WHERE user_id=?{in_range} ORDER BY period, category", [self.user_id] + range_params
+        with self.connection() as conn:
+            return conn.execute(f"SELECT month, category, amount_cents, transaction_count FROM category_rollups {sql}",
+                                params).fetchall()
+
+
+    def insert_expenses(self, rows):
+        # rows are (month, water, electricity) in centavos. others and total are summed by the INSERT
+        # itself from month_rollups, so a transaction added after the form was read is never
+        # overwritten with an older sum. returns the rows as they were stored
+        with self.connection() as conn:
+            conn.executemany("""
+                INSERT INTO expenses (user_id, month, water_cents, electricity_cents, others_cents, total_cents)
+                SELECT :user_id, :month, :water, :electricity, others, :water + :electricity + others
+                FROM (SELECT COALESCE((SELECT others_cents FROM month_rollups
+                                       WHERE user_id = :user_id AND month = :month), 0) AS others)
+            """, [{"user_id": self.user_id, "month": month, "water": water, "electricity": electricity}
+                  for month, water, electricity in rows])
+            return [expense_row(conn.execute(f"{EXPENSE_SELECT} WHERE user_id=? AND month=?", (self.user_id, row[0])).fetchone())
+                    for row in rows]
+
+
+    def update_expense(self, month, water, electricity):
+        # new bills; others and total are summed in the same statement (see insert_expenses).
+        # the row as stored, None if the month has no record
+        with self.connection() as conn:
+            cursor = conn.execute("""
+                UPDATE expenses
+                SET water_cents = :water,
+                    electricity_cents = :electricity,
+                    others_cents = COALESCE((SELECT r.others_cents FROM month_rollups r
+                                             WHERE r.user_id = :user_id AND r.month = :month), 0),
+                    total_cents = :water + :electricity
+                                  + COALESCE((SELECT r.others_cents FROM month_rollups r
+                                              WHERE r.user_id = :user_id AND r.month = :month), 0)
+                WHERE user_id = :user_id AND month = :month
+            """, {"user_id": self.user_id, "month": month, "water": water, "electricity": electricity})
+            if cursor.rowcount == 0:
+                return None
+            return expense_row(conn.execute(f"{EXPENSE_SELECT} WHERE user_id=? AND month=?", (self.user_id, month)).fetchone())
+
+
+    def delete_months(self, months):
+        # removes the monthly totals AND every transaction of those months
+        params = [(self.user_id, month) for month in months]
+        with self.connection() as conn:
+            conn.executemany("DELETE FROM transactions WHERE user_id=? AND month=?", params)
+            cursor = conn.executemany("DELETE FROM expenses WHERE user_id=? AND month=?", params)
+            return cursor.rowcount
+
+
+    # AGGREGATES
+    def get_month_others(self, month):
+        # kept up to date by the month_rollups triggers
+        with self.connection() as conn:
+            row = conn.execute("SELECT others_cents FROM month_rollups WHERE user_id=? AND month=?",
+                               (self.user_id, month)).fetchone()
+        return Money(row[0]) if row else Money(0)
+
+
+    # TRANSACTIONS
+    def list_transactions(self, month):
+        with self.connection() as conn:
+            rows = conn.execute(f"{TRANSACTION_SELECT} WHERE user_id=? AND month=? ORDER BY id DESC",
+                                (self.user_id, month)).fetchall()
+        return [transaction_row(row) for row in rows]
+
+
+    def list_transactions_page(self, month, after=None, before=None, limit=100):
+        # newest first, "after"/"before" are (id,) keys like list_expenses_page
+        if before is not None:
+            sql = f"{TRANSACTION_SELECT} WHERE user_id=? AND month=? AND id>? ORDER BY id ASC LIMIT ?"
+            params = (self.user_id, month, before[0], limit)
+        elif after is not None:
+            sql = f"{TRANSACTION_SELECT} WHERE user_id=? AND month=? AND id<? ORDER BY id DESC LIMIT ?"
+            params = (self.user_id, month, after[0], limit)
+        else:
+            sql = f"{TRANSACTION_SELECT} WHERE user_id=? AND month=? ORDER BY id DESC LIMIT ?"
+            params = (self.user_id, month, limit)
+
+        with self.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        if before is not None:
+            rows.reverse()
+        return [transaction_row(row) for row in rows]
+
+
+    def insert_transactions(self, rows):
+        # rows are (month, category, description, amount in centavos), returns the new ids
+        # one transaction for the whole batch, the prepared statement is reused for every row
+        new_ids = []
+        with self.connection() as conn:
+            for row in rows:
+                cursor = conn.execute("""
+                    INSERT INTO transactions (user_id, month, category, description, amount_cents)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (self.user_id,) + tuple(row))
+                new_ids.append(cursor.lastrowid)
+        return new_ids
+
+
+    def update_transactions(self, rows):
+        # rows are (category, description, amount, id); other users' ids are never touched.
+        # all or nothing: a missing id rolls the whole batch back
+        with self.connection() as conn:
+            cursor = conn.executemany("""
+                UPDATE transactions
+                SET category=?, description=?, amount_cents=?
+                WHERE id=? AND user_id=?
+            """, [tuple(row) + (self.user_id,) for row in rows])
+            if cursor.rowcount < len(rows):
+                raise RecordNotFoundError("One or more transactions no longer exist.")
+            return cursor.rowcount
+
+
+    def delete_transactions(self, trans_ids):
+        with self.connection() as conn:
+            cursor = conn.executemany("DELETE FROM transactions WHERE id=? AND user_id=?",
+                                      [(trans_id, self.user_id) for trans_id in trans_ids])
+            return cursor.rowcount
+
+
+    def get_transaction_months(self, trans_ids):
+        # the months these transactions belong to (to know what a change touches)
+        months = set()
+        with self.connection() as conn:
+            for trans_id in trans_ids:
+                row = conn.execute("SELECT month FROM transactions WHERE id=? AND user_id=?", (trans_id, self.user_id)).fetchone()
+                if row:
+                    months.add(row[0])
+        return months
+
+
+    def get_transaction_month_span(self):
+        # (first month, last month) that has transactions, (None, None) without any
+        with self.connection() as conn:
+            first = conn.execute("SELECT MIN(month) FROM category_rollups WHERE user_id=?", (self.user_id,)).fetchone()[0]
+            last = conn.execute("SELECT MAX(month) FROM category_rollups WHERE user_id=?", (self.user_id,)).fetchone()[0]
+        return first, last
+
+
+    def search_transactions(self, expression, category=None, first_month=None, last_month=None,
+                            limit=SEARCH_LIMIT, window=SEARCH_WINDOW):
+        # the full-text index walks the matches newest first, the filters are checked on each row
+        # (they are exact here, the month phrases in the expression only narrow the walk) and
+        # the newest "window" of them are ranked by bm25 over the description, newest first on ties
+        filters = ["transactions_fts MATCH ?", "t.user_id=?"]
+        params = [expression, self.user_id]
+        if category is not None:
+            filters.append("t.category=?")
+            params.append(category)
+        if first_month is not None:
+            filters.append("t.month>=?")
+            params.append(first_month)
+        if last_month is not None:
+            filters.append("t.month<=?")
+            params.append(last_month)
+
+        with self.connection() as conn:
+            rows = conn.execute(f"""
+                SELECT id, month, category, description, amount_cents FROM (
+                    SELECT t.id, t.month, t.category, t.description, t.amount_cents,
+                           bm25(transactions_fts, 1.0, 0.0) AS score
+                    FROM transactions_fts JOIN transactions AS t ON t.id = transactions_fts.rowid
+                    WHERE {" AND ".join(filters)}
+                    ORDER BY transactions_fts.rowid DESC LIMIT ?
+                ) ORDER BY score, id DESC LIMIT ?
+            """, params + [window, limit]).fetchall()
+        return [search_hit(row) for row in rows]
+
+
+    # USERS (not scoped, these find out who is who)
+    def get_password_hash(self, username):
+        user = self.get_user(username)
+        return user[1] if user else None
+
+
+    def get_user(self, username):
+        # (id, password_hash) or None
+        with self.connection() as conn:
+            return conn.execute("SELECT id, password_hash FROM users WHERE username=?", (username,)).fetchone()
+
+
+    def insert_user(self, username, password_hash):
+        with self.connection() as conn:
+            return conn.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)",
+                                (username, password_hash)).lastrowid
+
+
+
+
+
+# SERVICE (business rules on top of the repository, used by every front end)
+class ExpenseService:
+    # reads go through the query cache shared by every service on the same database,
+    # writes invalidate exactly the months they touched. the checks inside the write
+    # paths (duplicates, latest month, ...) always read the database directly.
+    def __init__(self, repository=None, cache=None):
+        self.repository = repository or ExpenseRepository()
+        self.cache = cache if cache is not None else get_cache(self.repository.db_file, self.repository.user_id)
+
+
+    @property
+    def user_id(self):
+        return self.repository.user_id
+
+
+    def for_user(self, user_id):
+        # the session of one logged in user: every read and write is limited to their data
+        return ExpenseService(self.repository.for_user(user_id))
+
+
+    def _cached(self, kind, month, params, load):
+        return self.cache.get_or_load(kind, month, params, load)
+
+
+    # AUTHENTICATION
+    def authenticate(self, username, password):
+        return self.login(username, password) is not None
+
+
+    def login(self, username, password):
+        # the user's id when the password is right, else None
+        user = self.repository.get_user(username)
+        if user and verify_password(user[1], password):
+            return user[0]
+        return None
+
+
+    def create_user(self, username, password):
+        username = (username or "").strip()
+        if not username or not password:
+            raise InputError("Username and password are required.")
+        if self.repository.get_user(username):
+            raise DuplicateUserError(f"The username '{username}' is already taken.")
+        with self.cache.writing(()):
+            return self.repository.insert_user(username, hash_password(password))
+
+
+    # READS
+    def list_expenses(self, sort_by="month DESC", period_range=None):
+        return self._cached("expenses", ALL_MONTHS, (sort_by, period_range),
+                            lambda: self.repository.list_expenses(sort_by, period_range))
+
+
+    def list_expenses_page(self, sort_by="month DESC", after=None, before=None, limit=100, period_range=None):
+        return self._cached("expenses page", ALL_MONTHS, (sort_by, after, before, limit, period_range),
+                            lambda: self.repository.list_expenses_page(sort_by, after, before, limit, period_range))
+
+
+    def get_expense(self, month):
+        return self._cached("expense", month, (),
+                            lambda: self.repository.get_expense(month))
+
+
+    def get_trend_data(self, period_range=None):
+        return self._cached("trend", ALL_MONTHS, (period_range,),
+                            lambda: self.repository.get_trend_data(period_range))
+
+
+    def get_category_matrix(self, period_range=None):
+        # every transaction write invalidates it (cached for all months), like the trend
+        return self._cached("category matrix", ALL_MONTHS, (period_range,),
+                            lambda: category_matrix(self.repository.get_category_rollups(period_range)))
+
+
+    def get_category_rollups(self, period_range=None):
+        return self._cached("category rollups", ALL_MONTHS, (period_range,),
+                            lambda: self.repository.get_category_rollups(period_range))
+
+
+    def resolve_range(self, text=None, first_month=None, last_month=None, year=None, quarter=None, last=None):
+        # a PeriodRange from what was typed ("2024-Q2", "last 6", see periods.parse_range) or from
+        # separate fields (from/to months, a year and quarter, the last N months); None is every month.
+        # "last N" counts back from the newest recorded month, not from today
+        try:
+            latest = self.repository.get_latest_period() if last is not None or needs_latest(text) else None
+            if text is not None and text.strip():
+                if first_month or last_month or year is not None or last is not None:
+                    raise ValueError("Type a range or fill in the fields, not both.")
+                return parse_range(text, latest)
+            return resolve_range(first_month or None, last_month or None, year, quarter, last, latest)
+        except ValueError as e:
+            raise InputError(str(e))
+
+
+    def get_month_others(self, month):
+        return self._cached("others", month, (),
+                            lambda: self.repository.get_month_others(month))
+
+
+    def list_transactions(self, month):
+        return self._cached("transactions", month, (),
+                            lambda: self.repository.list_transactions(month))
+
+
+    def list_transactions_page(self, month, after=None, before=None, limit=100):
+        return self._cached("transactions page", month, (after, before, limit),
+                            lambda: self.repository.list_transactions_page(month, after, before, limit))
+
+
+    def search_transactions(self, text, category=None, first_month=None, last_month=None, limit=SEARCH_LIMIT):
+        # ranked transactions whose description matches text (see search_terms), optionally only
+        # one category and months first_month..last_month (either may be left open)
+        terms = search_terms(text)
+        if not terms:
+            raise InputError("Type a word to search for.")
+        category = parse_category(category) if category else None
+        first_month = parse_month(first_month) if first_month else None
+        last_month = parse_month(last_month) if last_month else None
+        if first_month and last_month and first_month > last_month:
+            raise InputError("The first month of the range is after the last one.")
+
+        def load():
+            months = ()
+            if first_month or last_month:
+                # only the part of the range that has transactions (an open end is the first/last of them)
+                first, last = self.repository.get_transaction_month_span()
+                if first is None:
+                    return []
+                months = month_phrases(max(first_month or first, first), min(last_month or last, last))
+                if months == []:
+                    return []
+            return self.repository.search_transactions(search_expression(terms, months), category,
+                                                       first_month, last_month, limit)
+
+        return self._cached("search", ALL_MONTHS, (tuple(terms), category, first_month, last_month, limit), load)
+
+
+    # MONTHLY EXPENSES
+    def parse_bills(self, month, water, electricity):
+        return parse_month(month), parse_bill(water), parse_bill(electricity)
+
+
+    def prepare_new_expense(self, month, water, electricity):
+        # checks everything save_expense needs before asking the user anything
+        if self.repository.get_expense(month):
+            raise DuplicateMonthError(f"There is already a record for the month '{month}'.")
+
+        others = self.repository.get_month_others(month)
+        total = water + electricity + others
+
+        if total == 0:
+            raise EmptyExpenseError("No expenses recorded.")
+
+        # conditionals which data entries is zero (exact, amounts are whole centavos)
+        zero_fields = []
+        if water == 0: zero_fields.append("Water Bill")
+        if electricity == 0: zero_fields.append("Electricity Bill")
+        if others == 0: zero_fields.append("'Other Expenses' (Categorized Spending)")
+
+        return ExpenseDraft(month, water, electricity, others, total, tuple(zero_fields))
+
+
+    def compare_with_latest(self, draft, latest=None):
+        # compares a new record with the latest saved month and picks the SDG tip
+        if latest is None:
+            latest = self.repository.get_latest_expense()
+        return compare_expenses(draft, latest)
+
+
+    def compare_month(self, month):
+        # a saved month against the one saved before it (the comparison shown when it was saved)
+        month = parse_month(month)
+        row = self.get_expense(month)
+        if row is None:
+            raise RecordNotFoundError(f"No record found for the month '{month}'.")
+        return compare_expenses(ExpenseDraft(*row, ()), self.repository.get_previous_expense(month))
+
+
+    def save_expense(self, draft):
+        # compared with the month that was latest BEFORE this one. the comparison uses the totals as
+        # saved, which include any transaction added to the month since the draft was prepared
+        latest = self.repository.get_latest_expense()
+        with self.cache.writing([draft.month]):
+            saved = self.repository.insert_expenses([draft[:3]])[0]
+        return compare_expenses(ExpenseDraft(*saved, draft.zero_fields), latest)
+
+
+    def add_expense(self, month, water, electricity):
+        # headless shortcut: validate, save and return the comparison (no zero-field prompt)
+        month, water, electricity = self.parse_bills(month, water, electricity)
+        return self.save_expense(self.prepare_new_expense(month, water, electricity))
+
+
+    def add_expenses(self, records):
+        # batch insert of (month, water, electricity) in one transaction, returns the drafts
+        drafts = []
+        seen = set()
+        for month, water, electricity in records:
+            month, water, electricity = self.parse_bills(month, water, electricity)
+            if month in seen:
+                raise DuplicateMonthError(f"Month '{month}' appears twice in the batch.")
+            seen.add(month)
+            drafts.append(self.prepare_new_expense(month, water, electricity))
+
+        with self.cache.writing(seen):
+            saved = self.repository.insert_expenses([draft[:3] for draft in drafts])
+        return [ExpenseDraft(*row, draft.zero_fields) for row, draft in zip(saved, drafts)]
+
+
+    def update_expense(self, month, water, electricity):
+        month, water, electricity = self.parse_bills(month, water, electricity)
+        with self.cache.writing([month]):
+            row = self.repository.update_expense(month, water, electricity)
+        if row is None:
+            raise RecordNotFoundError(f"No record found for the month '{month}' to update.")
+        return row
+
+
+    def delete_expense(self, month):
+        return self.delete_expenses([month])
+
+
+    def delete_expenses(self, months):
+        with self.cache.writing(months):
+            deleted = self.repository.delete_months(months)
+        return deleted
+
+
+    # TRANSACTIONS
+    def _clean_transaction(self, month, category, description, amount):
+        return (parse_month(month), parse_category(category),
+                (description or "").strip(), parse_amount(amount))
+
+
+    def add_transaction(self, month, category, description, amount):
+        return self.add_transactions([(month, category, description, amount)])[0]
+
+
+    def clean_transactions(self, rows):
+        # checks every row (not just up to the first bad one), raises BatchInputError listing them all
+        cleaned = []
+        errors = {}
+        for index, row in enumerate(rows):
+            try:
+                cleaned.append(self._clean_transaction(*row))
+            except InputError as e:
+                errors[index] = str(e)
+        if errors:
+            raise BatchInputError(errors)
+        return cleaned
+
+
+    def add_transactions(self, rows):
+        # rows are (month, category, description, amount), all or nothing in one database transaction
+        cleaned = self.clean_transactions(rows)
+        if not cleaned:
+            return []
+        with self.cache.writing({row[0] for row in cleaned}):
+            new_ids = self.repository.insert_transactions(cleaned)
+        return new_ids
+
+
+    def update_transaction(self, trans_id, category, description, amount):
+        return self.update_transactions([(trans_id, category, description, amount)])
+
+
+    def update_transactions(self, rows):
+        # rows are (id, category, description, amount)
+        cleaned = [(parse_category(category), (description or "").strip(), parse_amount(amount), trans_id)
+                   for trans_id, category, description, amount in rows]
+        months = self.repository.get_transaction_months([row[3] for row in cleaned])
+        with self.cache.writing(months):
+            return self.repository.update_transactions(cleaned)
+
+
+    def delete_transaction(self, trans_id):
+        return self.delete_transactions([trans_id])
+
+
+    def delete_transactions(self, trans_ids):
+        months = self.repository.get_transaction_months(trans_ids)
+        with self.cache.writing(months):
+            deleted = self.repository.delete_transactions(trans_ids)
+        return deleted
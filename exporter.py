@@ -0,0 +1,234 @@
+# IMPORTED EXTENSIONS
+import argparse
+import csv
+import gzip
+import json
+import time
+from db_connection import DB_FILE, get_connection, close_all_pools # pooled database connections
+from migrations import migrate # versioned database schema
+from expense_service import DEFAULT_USER_ID, ExpenseRepository, ExpenseService, is_valid_month_format
+
+# streams the expenses / transactions tables to CSV, JSON Lines or Parquet.
+# rows are pulled with fetchmany() so memory only ever holds one batch,
+# no matter how many millions of rows the ledger has.
+
+
+
+# EXPORT SETTINGS
+FETCH_SIZE = 10000 # rows per fetchmany / per Parquet row group
+
+# what can be exported: columns in output order and the table they come from
+TABLES = {
+    "expenses": ("expenses", ("month", "water", "electricity", "others", "total"), "month ASC"),
+    "transactions": ("transactions", ("id", "month", "category", "description", "amount"), "month ASC, id ASC"),
+}
+
+# amounts are stored in centavos and exported in pesos like before (centavos / 100 is exact to 2 decimals)
+CENTS_COLUMNS = {"water": "water_cents", "electricity": "electricity_cents", "others": "others_cents",
+                 "total": "total_cents", "amount": "amount_cents"}
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+# Parquet column types (everything not listed is a peso amount)
+PARQUET_TYPES = {"id": "int64", "month": "string", "category": "string", "description": "string"}
+
+
+class ExportReport:
+    # counters for one export run
+    def __init__(self, table, total_rows):
+        self.table = table
+        self.total_rows = total_rows
+        self.rows_written = 0
+        self.seconds = 0.0
+
+
+    @property
+    def percent(self):
+        return 100.0 * self.rows_written / self.total_rows if self.total_rows else 100.0
+
+
+    @property
+    def rows_per_second(self):
+        return self.rows_written / self.seconds if self.seconds > 0 else 0.0
+
+
+    def summary(self):
+        return (f"{self.table}: {self.rows_written:,} rows in {self.seconds:.2f}s "
+                f"({self.rows_per_second:,.0f} rows/sec)")
+
+
+
+
+
+# QUERYING
+def _month_filter(from_month=None, to_month=None, user_id=DEFAULT_USER_ID):
+    # one user's rows; both ends are inclusive "YYYY-MM" strings, either may be left out
+    clauses = ["user_id = ?"]
+    params = [user_id]
+    for month, operator in ((from_month, ">="), (to_month, "<=")):
+        if month is None:
+            continue
+        if not is_valid_month_format(month):
+            raise ValueError(f"Invalid month '{month}' (must be YYYY-MM).")
+        clauses.append(f"month {operator} ?")
+        params.append(month)
+
+    return f" WHERE {' AND '.join(clauses)}", params
+
+
+def _select_list(columns):
+    return ", ".join(f"{CENTS_COLUMNS[name]} / 100.0 AS {name}" if name in CENTS_COLUMNS else name for name in columns)
+
+
+def count_rows(table, from_month=None, to_month=None, db_file=DB_FILE, user_id=DEFAULT_USER_ID):
+    table_name, _, _ = TABLES[table]
+    where, params = _month_filter(from_month, to_month, user_id)
+    with get_connection(db_file) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table_name}{where}", params).fetchone()[0]
+
+
+def iter_batches(table, from_month=None, to_month=None, db_file=DB_FILE, fetch_size=FETCH_SIZE,
+                 user_id=DEFAULT_USER_ID):
+    # yields lists of row tuples, at most fetch_size at a time
+    table_name, columns, order_by = TABLES[table]
+    where, params = _month_filter(from_month, to_month, user_id)
+
+    with get_connection(db_file) as conn:
+        cursor = conn.execute(f"SELECT {_select_list(columns)} FROM {table_name}{where} ORDER BY {order_by}", params)
+        while True:
+            batch = cursor.fetchmany(fetch_size)
+            if not batch:
+                break
+            yield batch
+
+
+
+
+
+# WRITERS (each takes the column names and an iterator of batches, returns nothing)
+def _open_text(path):
+    # "something.csv.gz" / "something.jsonl.gz" are gzip compressed on the fly
+    if str(path).endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def write_csv(path, columns, batches):
+    with _open_text(path) as file:
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        for batch in batches:
+            writer.writerows(batch)
+
+
+def write_jsonl(path, columns, batches):
+    with _open_text(path) as file:
+        for batch in batches:
+            file.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in batch)
+
+
+def write_parquet(path, columns, batches):
+    # compressed columnar output, needs the optional pyarrow package
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+
+    schema = pa.schema([(name, PARQUET_TYPES.get(name, "float64")) for name in columns])
+
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for batch in batches:
+            # one row group per batch, so pyarrow never holds more than one batch either
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+WRITERS = {
+    "csv": write_csv,
+    "jsonl": write_jsonl,
+    "parquet": write_parquet,
+}
+
+
+
+
+
+# EXPORTING
+def export_table(table, path, file_format="csv", from_month=None, to_month=None,
+                 db_file=DB_FILE, fetch_size=FETCH_SIZE, on_progress=None, user_id=DEFAULT_USER_ID):
+    if table not in TABLES:
+        raise ValueError(f"Unknown table '{table}'.")
+    if file_format not in WRITERS:
+        raise ValueError(f"Unsupported export format '{file_format}'.")
+
+    _, columns, _ = TABLES[table]
+    report = ExportReport(table, count_rows(table, from_month, to_month, db_file, user_id))
+    started = time.perf_counter()
+
+    def tracked_batches():
+        for batch in iter_batches(table, from_month, to_month, db_file, fetch_size, user_id):
+            yield batch
+            report.rows_written += len(batch)
+            report.seconds = time.perf_counter() - started
+            if on_progress:
+                on_progress(report)
+
+    WRITERS[file_format](path, columns, tracked_batches())
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def guess_format(path):
+    name = str(path).lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith(".parquet"):
+        return "parquet"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export expenses or transactions without loading them all in memory.")
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("path", help="output file (.csv, .jsonl, .parquet, add .gz to compress csv/jsonl)")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--from", dest="from_month", metavar="YYYY-MM")
+    parser.add_argument("--to", dest="to_month", metavar="YYYY-MM")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--quarter", type=int, choices=[1, 2, 3, 4])
+    parser.add_argument("--last", type=int, metavar="N", help="the last N months, up to the newest one recorded")
+    parser.add_argument("--user", default="admin", help="whose ledger to export")
+    args = parser.parse_args()
+
+    with get_connection(args.db) as setup_conn:
+        migrate(setup_conn)
+
+    def print_progress(progress):
+        print(f"  {progress.rows_written:,}/{progress.total_rows:,} rows ({progress.percent:.0f}%)")
+
+    try:
+        user = ExpenseRepository(args.db).get_user(args.user)
+        if user is None:
+            parser.error(f"unknown user '{args.user}'")
+
+        # a year, quarter or the last N months become the same inclusive month bounds as --from/--to
+        try:
+            months = ExpenseService(ExpenseRepository(args.db, user_id=user[0])).resolve_range(
+                first_month=args.from_month, last_month=args.to_month, year=args.year, quarter=args.quarter, last=args.last)
+        except ValueError as e:
+            parser.error(str(e))
+        from_month, to_month = (months.first_month, months.last_month) if months is not None else (None, None)
+
+        result = export_table(args.table, args.path, args.format or guess_format(args.path),
+                              from_month, to_month, args.db, on_progress=print_progress,
+                              user_id=user[0])
+        print(result.summary())
+    finally:
+        close_all_pools()
@@ -0,0 +1,185 @@
+# IMPORTED EXTENSIONS
+import argparse
+import heapq
+import os
+import random
+import time
+from auth import hash_password # for password security
+from db_connection import get_connection, close_all_pools # pooled database connections
+from migrations import migrate # versioned database schema
+from expense_service import CATEGORIES, DEFAULT_USER_ID
+from importer import chunked
+
+# builds a fake ledger to see how the app behaves at scale.
+# the same seed and sizes always give the exact same database, so benchmark
+# runs on two machines (or before/after a change) compare like with like.
+# with users > 1 every user gets a ledger of that size, their rows interleaved
+# month by month like several households using one database would write them.
+
+
+
+# GENERATOR SETTINGS
+DEFAULT_MONTHS = 240 # 20 years
+DEFAULT_TRANSACTIONS = 100000
+DEFAULT_START = "2000-01"
+DEFAULT_SEED = 42
+CHUNK_SIZE = 10000 # rows per executemany / commit
+GENERATED_PASSWORD = "password" # of the generated user2, user3... accounts (user 1 is the admin)
+
+# typical spending per category: (median amount, descriptions)
+CATEGORY_PROFILES = {
+    'Food & Groceries': (350.0, ("Grocery run", "Market", "Bakery", "Rice", "Fruits & vegetables", "Take-out")),
+    'Transport': (60.0, ("Jeepney fare", "Bus fare", "Tricycle", "Gasoline", "Grab ride", "Train load")),
+    'Healthcare': (500.0, ("Pharmacy", "Check-up", "Vitamins", "Dental", "Laboratory test")),
+    'Sustainable Goods': (250.0, ("Reusable bags", "Refill station", "Secondhand clothes", "LED bulbs", "Compost bin")),
+    'Wasteful Spending': (180.0, ("Impulse buy", "Late fee", "Unused subscription", "Bottled water", "Fast fashion")),
+    'Entertainment': (300.0, ("Movie", "Streaming", "Concert", "Games", "Dining out")),
+}
+
+# how often each category shows up (same order as CATEGORIES)
+CATEGORY_WEIGHTS = (40, 25, 5, 8, 10, 12)
+
+
+
+
+
+# GENERATING (pure python, nothing touches the database here)
+def month_range(start, count):
+    year, month = map(int, start.split("-"))
+    for _ in range(count):
+        yield f"{year:04d}-{month:02d}"
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+
+
+def generate_bills(rng, months):
+    # yields (month, water, electricity) in centavos with a bit of seasonality (hot months use more of both)
+    for month in months:
+        hot = int(month[5:]) in (3, 4, 5)
+        water = round(rng.uniform(350, 700) * (1.2 if hot else 1.0) * 100)
+        electricity = round(rng.uniform(1500, 3200) * (1.35 if hot else 1.0) * 100)
+        yield (month, water, electricity)
+
+
+def generate_transactions(rng, months, total):
+    # yields (month, category, description, amount in centavos), month by month like a real ledger grows
+    months = list(months)
+    per_month, extra = divmod(total, len(months)) if months else (0, 0)
+
+    for index, month in enumerate(months):
+        for _ in range(per_month + (1 if index < extra else 0)):
+            category = rng.choices(CATEGORIES, weights=CATEGORY_WEIGHTS)[0]
+            median, descriptions = CATEGORY_PROFILES[category]
+            amount = round(max(1.0, rng.lognormvariate(0, 0.6) * median) * 100)
+            yield (month, category, rng.choice(descriptions), amount)
+
+
+
+
+
+def generate_users_transactions(rngs, user_ids, months, total):
+    # yields (user_id, month, category, description, amount), every user's month before the next month
+    def owned(rng, user_id):
+        for row in generate_transactions(rng, months, total):
+            yield (user_id,) + row
+
+    streams = [owned(rng, user_id) for rng, user_id in zip(rngs, user_ids)]
+    return heapq.merge(*streams, key=lambda row: row[1])
+
+
+def user_rngs(seed, users):
+    # user 1 draws from the plain seed, so a single user ledger is the same as before users existed
+    return [random.Random(seed + index * 7919) for index in range(users)]
+
+
+
+
+
+# WRITING
+def create_users(conn, users):
+    # the admin plus user2..userN, returns their ids in order
+    user_ids = [DEFAULT_USER_ID]
+    password_hash = hash_password(GENERATED_PASSWORD)
+    for number in range(2, users + 1):
+        user_ids.append(conn.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)",
+                                     (f"user{number}", password_hash)).lastrowid)
+    return user_ids
+
+
+def build_ledger(path, months=DEFAULT_MONTHS, transactions=DEFAULT_TRANSACTIONS, start=DEFAULT_START,
+                 seed=DEFAULT_SEED, chunk_size=CHUNK_SIZE, overwrite=False, on_progress=None, users=1):
+    # months and transactions are per user
+    if os.path.exists(path):
+        if not overwrite:
+            raise FileExistsError(f"'{path}' already exists (use overwrite=True / --overwrite).")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    rngs = user_rngs(seed, users)
+    month_list = list(month_range(start, months))
+    started = time.perf_counter()
+
+    with get_connection(path) as conn:
+        migrate(conn)
+        user_ids = create_users(conn, users)
+
+    # months first (others = 0), the month_rollups triggers add every transaction to its month
+    bills = [list(generate_bills(rng, month_list)) for rng in rngs]
+    with get_connection(path) as conn:
+        conn.executemany("""
+            INSERT INTO expenses (user_id, month, water_cents, electricity_cents, others_cents, total_cents)
+            VALUES (?, ?, ?, ?, 0, ?)
+        """, [(user_id, month, water, electricity, water + electricity)
+              for month_bills in zip(*bills)
+              for user_id, (month, water, electricity) in zip(user_ids, month_bills)])
+
+    written = 0
+    for chunk in chunked(generate_users_transactions(rngs, user_ids, month_list, transactions), chunk_size):
+        with get_connection(path) as conn:
+            conn.executemany("""
+                INSERT INTO transactions (user_id, month, category, description, amount_cents)
+                VALUES (?, ?, ?, ?, ?)
+            """, chunk)
+        written += len(chunk)
+        if on_progress:
+            on_progress(written, transactions * users)
+
+    with get_connection(path) as conn:
+        conn.execute("ANALYZE")
+
+    return time.perf_counter() - started
+
+
+def ledger_name(months, transactions, seed, users=1):
+    # file name used by the benchmark suite to reuse ledgers between runs
+    if users > 1:
+        return f"ledger-{users}u-{months}m-{transactions}t-seed{seed}.db"
+    return f"ledger-{months}m-{transactions}t-seed{seed}.db"
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic expenses ledger.")
+    parser.add_argument("path")
+    parser.add_argument("--months", type=int, default=DEFAULT_MONTHS)
+    parser.add_argument("--transactions", type=int, default=DEFAULT_TRANSACTIONS)
+    parser.add_argument("--start", default=DEFAULT_START, metavar="YYYY-MM")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--users", type=int, default=1, help="ledgers of this size, one per user")
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    def print_progress(done, total):
+        print(f"  {done:,}/{total:,} transactions")
+
+    try:
+        seconds = build_ledger(args.path, args.months, args.transactions, args.start, args.seed,
+                               overwrite=args.overwrite, on_progress=print_progress, users=args.users)
+        print(f"{args.users:,} user(s) x {args.months:,} months and {args.transactions:,} transactions "
+              f"written to {args.path} in {seconds:.1f}s")
+    finally:
+        close_all_pools()
@@ -0,0 +1,353 @@
+# IMPORTED EXTENSIONS
+import argparse
+import csv
+import os
+import re
+import time
+from collections import namedtuple
+from datetime import datetime
+from itertools import islice
+from db_connection import DB_FILE, get_connection, close_all_pools # pooled database connections
+from migrations import migrate # versioned database schema
+from expense_service import CATEGORIES, DEFAULT_USER_ID, ExpenseRepository, clean_currency_input, is_valid_month_format
+from money import Money # amounts are stored in centavos
+
+# streams CSV / OFX / QIF statements into the transactions table.
+# every stage is a generator so only one chunk of rows is ever in memory:
+#   read_*_rows -> validate_rows -> chunked -> executemany (one transaction per chunk)
+
+
+
+# IMPORT SETTINGS
+CHUNK_SIZE = 5000 # rows per executemany / commit
+MAX_KEPT_ERRORS = 100 # only the first rejected rows are kept for the report
+
+# the date formats we accept in statements (the month is all we keep)
+DATE_FORMATS = ("%Y-%m-%d", "%Y-%m", "%Y/%m/%d", "%Y%m%d")
+
+# slashed dates are day first or month first depending on the bank. 03/04/2025 reads both
+# ways, such a row is rejected unless the statement's order is given (--date-order)
+DATE_ORDERS = {
+    "day-first": ("%d/%m/%Y", "%d/%m/%y"),
+    "month-first": ("%m/%d/%Y", "%m/%d/%y"),
+}
+
+# header names we understand in CSV files (lower case)
+CSV_COLUMNS = {
+    "month": ("month", "period"),
+    "date": ("date", "posted", "posting date", "transaction date", "dtposted"),
+    "category": ("category",),
+    "description": ("description", "desc", "details", "memo", "payee", "name", "merchant"),
+    "amount": ("amount", "value", "debit", "trnamt"),
+}
+
+
+# one parsed statement line before validation (credit=True for deposits in bank files)
+RawRow = namedtuple("RawRow", "line month date category description amount credit", defaults=(False,))
+
+# a statement line that was not imported and why
+RejectedRow = namedtuple("RejectedRow", "line reason")
+
+
+class ImportReport:
+    # counters for one import run
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.rows_rejected = 0
+        self.errors = []
+        self.seconds = 0.0
+
+
+    def reject(self, line, reason):
+        self.rows_rejected += 1
+        if len(self.errors) < MAX_KEPT_ERRORS:
+            self.errors.append(RejectedRow(line, reason))
+
+
+    @property
+    def rows_per_second(self):
+        return self.rows_imported / self.seconds if self.seconds > 0 else 0.0
+
+
+    def summary(self):
+        return (f"{self.rows_imported:,} imported, {self.rows_rejected:,} rejected "
+                f"of {self.rows_read:,} read in {self.seconds:.2f}s "
+                f"({self.rows_per_second:,.0f} rows/sec)")
+
+
+
+
+
+# READERS (each yields RawRow, nothing is validated here)
+def read_csv_rows(path, encoding="utf-8-sig"):
+    with open(path, newline="", encoding=encoding) as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+
+        # map our field names to column positions
+        lowered = [name.strip().lower() for name in header]
+        positions = {}
+        for field, aliases in CSV_COLUMNS.items():
+            for alias in aliases:
+                if alias in lowered:
+                    positions[field] = lowered.index(alias)
+                    break
+
+        if "amount" not in positions or not ({"month", "date"} & positions.keys()):
+            raise ValueError("CSV needs an amount column and a month or date column.")
+
+        def column(values, field):
+            index = positions.get(field)
+            if index is None or index >= len(values):
+                return None
+            return values[index]
+
+        for line, values in enumerate(reader, start=2):
+            if not any(value.strip() for value in values):
+                continue
+            yield RawRow(line,
+                         column(values, "month"),
+                         column(values, "date"),
+                         column(values, "category"),
+                         column(values, "description"),
+                         column(values, "amount"))
+
+
+_OFX_TAG = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+
+def read_ofx_rows(path, encoding="latin-1"):
+    # works for both SGML (OFX 1.x) and XML (OFX 2.x) statements, one line at a time.
+    # bank statements list spending as negative amounts, we flip the sign here
+    fields = None
+    line_of_record = 0
+
+    with open(path, encoding=encoding) as file:
+        for line, text in enumerate(file, start=1):
+            for tag, value in _OFX_TAG.findall(text):
+                tag = tag.upper()
+                value = value.strip()
+
+                if tag == "STMTTRN":
+                    fields = {}
+                    line_of_record = line
+                elif fields is not None and value:
+                    fields.setdefault(tag, value)
+
+            if fields is not None and "</STMTTRN>" in text.upper():
+                yield _bank_row(line_of_record, fields.get("DTPOSTED", "")[:8], None,
+                                fields.get("NAME") or fields.get("MEMO"), fields.get("TRNAMT"))
+                fields = None
+
+    # SGML files may leave the last <STMTTRN> unclosed
+    if fields:
+        yield _bank_row(line_of_record, fields.get("DTPOSTED", "")[:8], None,
+                        fields.get("NAME") or fields.get("MEMO"), fields.get("TRNAMT"))
+
+
+def read_qif_rows(path, encoding="latin-1"):
+    # QIF records are one field per line (D=date, T/U=amount, P=payee, M=memo, L=category) ending with "^"
+    fields = {}
+    line_of_record = 0
+
+    with open(path, encoding=encoding) as file:
+        for line, text in enumerate(file, start=1):
+            text = text.rstrip("\r\n")
+            if not text or text.startswith("!"):
+                continue
+
+            if text.startswith("^"):
+                if fields:
+                    yield _bank_row(line_of_record, fields.get("D", ""), fields.get("L"),
+                                    fields.get("P") or fields.get("M"), fields.get("T") or fields.get("U"))
+                fields = {}
+                continue
+
+            if not fields:
+                line_of_record = line
+            fields.setdefault(text[0], text[1:].strip())
+
+    if fields:
+        yield _bank_row(line_of_record, fields.get("D", ""), fields.get("L"),
+                        fields.get("P") or fields.get("M"), fields.get("T") or fields.get("U"))
+
+
+def _bank_row(line, date_text, category, description, amount_text):
+    # debits are negative in bank files, spending is positive in the app
+    amount_text = clean_currency_input(amount_text or "")
+    is_credit = bool(amount_text) and not amount_text.startswith("-")
+    return RawRow(line, None, date_text.replace("'", "/"), category, description,
+                  amount_text.lstrip("-"), is_credit)
+
+
+READERS = {
+    ".csv": read_csv_rows,
+    ".ofx": read_ofx_rows,
+    ".qfx": read_ofx_rows,
+    ".qif": read_qif_rows,
+}
+
+
+
+
+
+# VALIDATION
+def _parse_month(date_text, date_formats):
+    # "YYYY-MM" of the first format that reads date_text, else None
+    for date_format in date_formats:
+        try:
+            return datetime.strptime(date_text, date_format).strftime("%Y-%m")
+        except ValueError:
+            continue
+    return None
+
+
+def to_month(month_text, date_text, date_order=None):
+    # returns "YYYY-MM", raises ValueError with the reason the row can't be imported.
+    # date_order is a DATE_ORDERS key, None accepts either order when only one makes sense
+    month_text = (month_text or "").strip()
+    if month_text:
+        if not is_valid_month_format(month_text):
+            raise ValueError(f"invalid month '{month_text}'")
+        return month_text
+
+    date_text = (date_text or "").strip()
+    month = _parse_month(date_text, DATE_FORMATS)
+    if month is not None:
+        return month
+
+    orders = [DATE_ORDERS[date_order]] if date_order else DATE_ORDERS.values()
+    months = {_parse_month(date_text, date_formats) for date_formats in orders} - {None}
+    if len(months) > 1:
+        raise ValueError(f"ambiguous date '{date_text}' (day or month first? pass --date-order)")
+    if not months:
+        raise ValueError(f"invalid month/date '{date_text}'")
+    return months.pop()
+
+
+def validate_rows(raw_rows, report, default_category=None, date_order=None):
+    # yields (month, category, description, amount in centavos) ready for INSERT, rejects go to the report
+    for raw in raw_rows:
+        report.rows_read += 1
+
+        try:
+            month = to_month(raw.month, raw.date, date_order)
+        except ValueError as e:
+            report.reject(raw.line, str(e))
+            continue
+
+        if raw.credit:
+            report.reject(raw.line, "credit/deposit, not an expense")
+            continue
+        try:
+            amount = Money.parse(raw.amount or "")
+        except ValueError:
+            report.reject(raw.line, f"invalid amount '{raw.amount}'")
+            continue
+        if amount <= 0:
+            report.reject(raw.line, "amount must be positive")
+            continue
+
+        category = (raw.category or "").strip()
+        if category not in CATEGORIES:
+            if default_category is None:
+                report.reject(raw.line, f"unknown category '{category}'")
+                continue
+            category = default_category
+
+        yield (month, category, (raw.description or "").strip(), amount)
+
+
+def chunked(rows, size):
+    # yields lists of at most "size" rows without reading ahead any further
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+
+
+
+# IMPORTING
+def import_rows(raw_rows, db_file=DB_FILE, default_category=None, chunk_size=CHUNK_SIZE,
+                on_progress=None, report=None, user_id=DEFAULT_USER_ID, date_order=None):
+    report = report or ImportReport()
+    started = time.perf_counter()
+
+    for chunk in chunked(validate_rows(raw_rows, report, default_category, date_order), chunk_size):
+        # one transaction per chunk, the month_rollups triggers run inside it
+        with get_connection(db_file) as conn:
+            conn.executemany("""
+                INSERT INTO transactions (user_id, month, category, description, amount_cents)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(user_id,) + row for row in chunk])
+
+        report.rows_imported += len(chunk)
+        report.seconds = time.perf_counter() - started
+        if on_progress:
+            on_progress(report)
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def import_file(path, db_file=DB_FILE, file_format=None, default_category=None,
+                chunk_size=CHUNK_SIZE, on_progress=None, user_id=DEFAULT_USER_ID, date_order=None):
+    # file_format is "csv", "ofx", "qfx" or "qif", guessed from the extension when missing
+    extension = "." + file_format.lower() if file_format else os.path.splitext(path)[1].lower()
+    reader = READERS.get(extension)
+    if reader is None:
+        raise ValueError(f"Unsupported statement format '{extension}'.")
+
+    if default_category is not None and default_category not in CATEGORIES:
+        raise ValueError(f"Unknown category '{default_category}'.")
+    if date_order is not None and date_order not in DATE_ORDERS:
+        raise ValueError(f"Unknown date order '{date_order}' (use {' or '.join(DATE_ORDERS)}).")
+
+    return import_rows(reader(path), db_file, default_category, chunk_size, on_progress, user_id=user_id,
+                       date_order=date_order)
+
+
+def user_id_of(username, db_file=DB_FILE):
+    user = ExpenseRepository(db_file).get_user(username)
+    if user is None:
+        raise ValueError(f"Unknown user '{username}'.")
+    return user[0]
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a CSV/OFX/QIF statement into the transactions table.")
+    parser.add_argument("path")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--format", choices=["csv", "ofx", "qfx", "qif"])
+    parser.add_argument("--category", choices=CATEGORIES,
+                        help="category for rows without a known one (bank files have none)")
+    parser.add_argument("--date-order", choices=DATE_ORDERS,
+                        help="how to read slashed dates like 03/04/2025 (ambiguous ones are rejected without it)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--user", default="admin", help="whose ledger the rows go to")
+    args = parser.parse_args()
+
+    with get_connection(args.db) as setup_conn:
+        migrate(setup_conn)
+
+    def print_progress(progress):
+        print(f"  {progress.rows_imported:,} rows ({progress.rows_per_second:,.0f} rows/sec)")
+
+    try:
+        result = import_file(args.path, args.db, args.format, args.category,
+                             args.chunk_size, print_progress, user_id_of(args.user, args.db), args.date_order)
+        print(result.summary())
+        for error in result.errors:
+            print(f"  line {error.line}: {error.reason}")
+    finally:
+        close_all_pools()
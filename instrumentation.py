@@ -0,0 +1,292 @@
+# IMPORTED EXTENSIONS
+import atexit
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+# opt-in timings for the hot paths: every SQL statement and the UI refresh stages.
+# off by default and then costs nothing (the decorators return the function untouched
+# and the pool opens plain sqlite3 connections). turn it on with environment variables:
+#   EXPENSES_PROFILE=1            collect timings, print the summary when the app exits
+#   EXPENSES_SLOW_QUERY_MS=50     log statements slower than this with their query plan
+#   EXPENSES_PROFILE_FILE=path    write the exit summary to this file instead of the console
+
+
+
+# INSTRUMENTATION SETTINGS
+ENABLED = os.environ.get("EXPENSES_PROFILE", "").lower() in ("1", "true", "yes", "on")
+SLOW_QUERY_MS = float(os.environ.get("EXPENSES_SLOW_QUERY_MS", "50"))
+SUMMARY_FILE = os.environ.get("EXPENSES_PROFILE_FILE")
+
+# histogram bucket upper bounds in ms: 10 us to ~10 s, each bucket 25% wider than
+# the previous one, so percentiles are within 25% (an extra bucket catches everything above)
+BUCKETS_MS = tuple(0.01 * 1.25 ** index for index in range(63))
+MAX_SLOW_QUERIES = 200 # only the most recent slow statements are kept in memory
+
+slow_query_log = logging.getLogger("expenses.slow_queries")
+
+
+
+
+
+# LATENCY HISTOGRAM
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = 0.0
+
+
+    def add(self, ms):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+        self.max_ms = max(self.max_ms, ms)
+
+
+    def percentile(self, fraction):
+        # upper bound of the bucket holding that rank (the max for the overflow bucket)
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(BUCKETS_MS[index], self.max_ms) if index < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+
+
+
+
+# PROFILER (one per process, shared by every thread)
+class Profiler:
+    def __init__(self, enabled=ENABLED, slow_query_ms=SLOW_QUERY_MS):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self.histograms = {} # operation name -> Histogram
+        self.slow_queries = [] # (ms, sql, plan), newest last
+        self._lock = threading.Lock()
+
+
+    def record(self, name, ms):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(ms)
+
+
+    @contextmanager
+    def timer(self, name):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+
+    def stage(self, name):
+        # decorator for UI stages: @PROFILER.stage("ui.load_data")
+        def decorate(function):
+            if not self.enabled:
+                return function
+
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+
+    def log_slow_query(self, ms, sql, plan):
+        with self._lock:
+            self.slow_queries.append((ms, sql, plan))
+            del self.slow_queries[:-MAX_SLOW_QUERIES]
+        slow_query_log.warning("slow query (%.1f ms): %s\n    plan: %s", ms, sql, " | ".join(plan) or "-")
+
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.slow_queries.clear()
+
+
+    def summary(self):
+        # a plain text table, slowest total time first
+        with self._lock:
+            items = sorted(self.histograms.items(), key=lambda item: item[1].total_ms, reverse=True)
+            slow = list(self.slow_queries)
+
+        # p50/p95/p99 are histogram bucket bounds, mean and max are exact
+        lines = [f"{'count':>7} {'total ms':>10} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  operation"]
+        for name, histogram in items:
+            lines.append(f"{histogram.count:>7} {histogram.total_ms:>10.1f} {histogram.mean_ms:>8.2f} "
+                         f"{histogram.percentile(0.5):>8.2f} {histogram.percentile(0.95):>8.2f} "
+                         f"{histogram.percentile(0.99):>8.2f} {histogram.max_ms:>8.2f}  {name[:120]}")
+
+        if slow:
+            lines.append("")
+            lines.append(f"slow queries (>= {self.slow_query_ms:g} ms), most recent last:")
+            for ms, sql, plan in slow[-20:]:
+                lines.append(f"  {ms:8.1f} ms  {sql}")
+                for step in plan:
+                    lines.append(f"              {step}")
+        return "\n".join(lines)
+
+
+    def dump(self, path=None):
+        text = self.summary()
+        if path:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(text + "\n")
+        else:
+            print(text)
+        return text
+
+
+PROFILER = Profiler()
+
+
+
+
+
+# INSTRUMENTED CONNECTIONS (what the pool opens when profiling is on)
+_WHITESPACE = re.compile(r"\s+")
+PLANNED_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") # the rest (DDL, BEGIN/COMMIT) have no plan worth logging
+
+
+def statement_name(sql):
+    return "sql: " + _WHITESPACE.sub(" ", sql).strip()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    # a SELECT does most of its work while rows are fetched, so the time of a statement
+    # is execute() plus the fetches, recorded once the result has been read
+    def execute(self, sql, parameters=()):
+        self._finish()
+        started = time.perf_counter()
+        result = super().execute(sql, parameters)
+        self._pending = (sql, parameters, time.perf_counter() - started)
+        if self.description is None: # no rows to fetch (INSERT, UPDATE, PRAGMA...)
+            self._finish()
+        return result
+
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        started = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        PROFILER.record(statement_name(sql) + " [executemany]", (time.perf_counter() - started) * 1000)
+        return result
+
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._add(time.perf_counter() - started)
+        self._finish()
+        return row
+
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._add(time.perf_counter() - started)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._add(time.perf_counter() - started)
+        self._finish()
+        return rows
+
+
+    def __iter__(self):
+        # iterating is like fetchall (the EXPLAIN rows of check_query_plans use it)
+        return iter(self.fetchall())
+
+
+    def _add(self, seconds):
+        pending = getattr(self, "_pending", None)
+        if pending:
+            self._pending = (pending[0], pending[1], pending[2] + seconds)
+
+
+    def _finish(self):
+        pending = getattr(self, "_pending", None)
+        self._pending = None
+        if not pending:
+            return
+
+        sql, parameters, seconds = pending
+        ms = seconds * 1000
+        PROFILER.record(statement_name(sql), ms)
+        statement = sql.lstrip().upper()
+        if ms >= PROFILER.slow_query_ms and not statement.startswith(("EXPLAIN", "PRAGMA")):
+            plan = self._plan(sql, parameters) if statement.startswith(PLANNED_STATEMENTS) else []
+            PROFILER.log_slow_query(ms, _WHITESPACE.sub(" ", sql).strip(), plan)
+
+
+    def _plan(self, sql, parameters):
+        try:
+            rows = sqlite3.Connection.execute(self.connection, f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+            return [row[-1] for row in rows]
+        except sqlite3.Error as e:
+            return [f"(no plan: {e})"]
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def execute(self, sql, parameters=()):
+        return self.cursor(InstrumentedCursor).execute(sql, parameters)
+
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor(InstrumentedCursor).executemany(sql, seq_of_parameters)
+
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+
+def connection_factory():
+    # the sqlite3.connect(factory=...) the pool should use
+    return InstrumentedConnection if PROFILER.enabled else sqlite3.Connection
+
+
+
+
+
+# EXIT SUMMARY
+def _dump_at_exit():
+    if PROFILER.histograms:
+        PROFILER.dump(SUMMARY_FILE)
+
+
+if ENABLED:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+    atexit.register(_dump_at_exit)
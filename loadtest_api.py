@@ -0,0 +1,230 @@
+# IMPORTED EXTENSIONS
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from generate_data import build_ledger, ledger_name, DEFAULT_SEED
+
+# hammers a local api_server.py with concurrent keep-alive clients and prints the
+# throughput and latency percentiles. without --port it starts its own server on
+# a generated ledger (bench_data/), runs the test and stops the server again.
+# the mix is mostly reads, like the app: months page, others total, transactions
+# page, trend data; plus a small share of transaction adds (each one deleted again).
+
+
+
+# LOAD TEST SETTINGS
+HOST = "127.0.0.1"
+CLIENTS = 64 # concurrent connections
+DURATION = 10.0 # seconds
+WRITE_SHARE = 0.05 # share of requests that add (and later delete) a transaction
+LEDGER = (60, 10000) # months, transactions of the generated ledger
+DATA_DIR = "bench_data"
+USERNAME = "admin"
+PASSWORD = "password123"
+
+
+
+
+
+# A TINY HTTP/1.1 CLIENT (one keep-alive connection)
+class Client:
+    def __init__(self, host, port, username, password):
+        self.host = host
+        self.port = port
+        token = base64.b64encode(f"{username}:{password}".encode("utf-8")).decode("ascii")
+        self.auth = f"Basic {token}"
+        self.reader = None
+        self.writer = None
+
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+
+    async def request(self, method, path, body=None):
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.writer.write((f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nAuthorization: {self.auth}\r\n"
+                           f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n").encode("latin-1")
+                          + payload)
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        length = 0
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        data = await self.reader.readexactly(length)
+        return status, json.loads(data) if data else None
+
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+
+
+
+# THE LOAD
+async def client_loop(client, months, deadline, rng, write_share, latencies, statuses, added):
+    while time.perf_counter() < deadline:
+        month = rng.choice(months)
+        roll = rng.random()
+        if roll < write_share:
+            name, method, path, body = ("add_transaction", "POST", f"/api/months/{month}/transactions",
+                                        {"category": "Transport", "description": "load test", "amount": "12.50"})
+        elif roll < 0.35:
+            name, method, path, body = "others", "GET", f"/api/months/{month}/others", None
+        elif roll < 0.65:
+            name, method, path, body = "transactions_page", "GET", f"/api/months/{month}/transactions?limit=100", None
+        elif roll < 0.9:
+            name, method, path, body = "months_page", "GET", "/api/months?limit=100", None
+        else:
+            name, method, path, body = "trend", "GET", "/api/trend", None
+
+        started = time.perf_counter()
+        status, result = await client.request(method, path, body)
+        latencies.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+        statuses[status] = statuses.get(status, 0) + 1
+        if name == "add_transaction" and status == 201:
+            added.extend(result["ids"])
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+async def run_load(host, port, clients=CLIENTS, duration=DURATION, write_share=WRITE_SHARE,
+                   username=USERNAME, password=PASSWORD, seed=DEFAULT_SEED):
+    setup = Client(host, port, username, password)
+    await setup.connect()
+    status, result = await setup.request("GET", f"/api/months?limit={clients * 10}")
+    if status != 200:
+        await setup.close()
+        raise RuntimeError(f"login or first request failed ({status}): {result}")
+    months = [row["month"] for row in result["rows"]] or ["2000-01"]
+
+    connections = [Client(host, port, username, password) for _ in range(clients)]
+    await asyncio.gather(*(connection.connect() for connection in connections))
+
+    latencies = {}
+    statuses = {}
+    added = []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(client_loop(connection, months, deadline, random.Random(seed + index), write_share,
+                                       latencies, statuses, added)
+                           for index, connection in enumerate(connections)))
+    seconds = time.perf_counter() - started
+
+    # undo the writes so the ledger stays the same between runs
+    for trans_id in added:
+        await setup.request("DELETE", f"/api/transactions/{trans_id}")
+    await asyncio.gather(setup.close(), *(connection.close() for connection in connections))
+
+    every = sorted(ms for values in latencies.values() for ms in values)
+    return {
+        "clients": clients,
+        "seconds": seconds,
+        "requests": len(every),
+        "requests_per_second": len(every) / seconds if seconds > 0 else 0.0,
+        "statuses": statuses,
+        "latency_ms": {"p50": percentile(every, 0.5), "p95": percentile(every, 0.95),
+                       "p99": percentile(every, 0.99), "max": every[-1] if every else 0.0},
+        "by_request": {name: {"count": len(values), "median_ms": statistics.median(values),
+                              "p95_ms": percentile(sorted(values), 0.95)}
+                       for name, values in sorted(latencies.items())},
+    }
+
+
+
+
+
+# OWN SERVER (when no --port is given)
+def start_server(db_file, port):
+    server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api_server.py"),
+                               "--db", db_file, "--host", HOST, "--port", str(port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("api_server.py exited before it was ready.")
+        try:
+            asyncio.run(_probe(port))
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("api_server.py did not start within 30 seconds.")
+
+
+async def _probe(port):
+    _, writer = await asyncio.open_connection(HOST, port)
+    writer.close()
+    await writer.wait_closed()
+
+
+def print_report(report):
+    print(f"{report['requests']:,} requests in {report['seconds']:.1f}s with {report['clients']} clients: "
+          f"{report['requests_per_second']:,.0f} req/s")
+    latency = report["latency_ms"]
+    print(f"  latency p50 {latency['p50']:.2f} ms, p95 {latency['p95']:.2f} ms, "
+          f"p99 {latency['p99']:.2f} ms, max {latency['max']:.2f} ms")
+    print("  statuses: " + ", ".join(f"{status}: {count:,}" for status, count in sorted(report["statuses"].items())))
+    for name, stats in report["by_request"].items():
+        print(f"  {name:<18} {stats['count']:>8,}  median {stats['median_ms']:7.2f} ms  p95 {stats['p95_ms']:7.2f} ms")
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a local api_server.py.")
+    parser.add_argument("--port", type=int, help="test a server that is already running (else one is started)")
+    parser.add_argument("--db", help="database for the started server (default: a generated ledger)")
+    parser.add_argument("--clients", type=int, default=CLIENTS)
+    parser.add_argument("--duration", type=float, default=DURATION)
+    parser.add_argument("--write-share", type=float, default=WRITE_SHARE)
+    parser.add_argument("--user", default=USERNAME)
+    parser.add_argument("--password", default=PASSWORD)
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    server = None
+    port = args.port
+    if port is None:
+        db_file = args.db
+        if db_file is None:
+            months, transactions = LEDGER
+            os.makedirs(DATA_DIR, exist_ok=True)
+            db_file = os.path.join(DATA_DIR, ledger_name(months, transactions, DEFAULT_SEED))
+            if not os.path.exists(db_file):
+                print(f"generating a {months} month / {transactions:,} transaction ledger...")
+                build_ledger(db_file, months, transactions)
+        port = 8765 + random.randrange(1000)
+        server = start_server(db_file, port)
+
+    try:
+        report = asyncio.run(run_load(HOST, port, args.clients, args.duration, args.write_share,
+                                      args.user, args.password))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
@@ -0,0 +1,682 @@
+# IMPORTED EXTENSIONS
+import sqlite3 # for database
+from auth import hash_password # for the default admin account
+
+
+
+# SCHEMA MIGRATIONS
+# every migration runs once, in order, and bumps PRAGMA user_version to its number.
+# never edit a migration that already shipped, add a new one at the end instead.
+
+def _migration_1_base_tables(cursor):
+    # creating "expenses" table in database (MONTHLY TOTALS)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            month TEXT NOT NULL UNIQUE,
+            water REAL,
+            electricity REAL,
+            others REAL,        
+            total REAL
+        )
+    """)
+
+    # creating "transactions" table in database (CATEGORIZED SPENDING)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            description TEXT,
+            amount REAL
+        )
+    """)
+
+    # creating "users" table in database (AUTHENTICATION DATA)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            password_hash TEXT NOT NULL
+        )
+    """)
+
+    # THE PASSWORD OF THE GUI (only hashed when the database is brand new)
+    cursor.execute("INSERT OR IGNORE INTO users (username, password_hash) VALUES (?, ?)",
+                   ('admin', hash_password("password123")))
+
+
+def _migration_2_month_indexes(cursor):
+    # SUM(amount) ... WHERE month=? is answered from the index alone
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_month_amount ON transactions (month, amount)")
+    # WHERE month=? ORDER BY id DESC walks this index backwards, no sorting
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_month_id ON transactions (month, id)")
+    # "Sort by Highest/Lowest Total" in the main table
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_total ON expenses (total)")
+
+
+def _migration_3_month_rollups(cursor):
+    # running SUM/COUNT of transactions per month, kept up to date by the triggers below
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS month_rollups (
+            month TEXT PRIMARY KEY,
+            others REAL NOT NULL DEFAULT 0,
+            transaction_count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute("DELETE FROM month_rollups")
+    cursor.execute("""
+        INSERT INTO month_rollups (month, others, transaction_count)
+        SELECT month, COALESCE(SUM(amount), 0), COUNT(*) FROM transactions GROUP BY month
+    """)
+
+    # fix any "others"/"total" that went stale before the triggers existed
+    cursor.execute("""
+        UPDATE expenses
+        SET others = COALESCE((SELECT r.others FROM month_rollups r WHERE r.month = expenses.month), 0),
+            total = COALESCE(water, 0) + COALESCE(electricity, 0)
+                    + COALESCE((SELECT r.others FROM month_rollups r WHERE r.month = expenses.month), 0)
+    """)
+
+    # new transaction: add it to its month
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_insert_rollup
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO month_rollups (month, others, transaction_count)
+            VALUES (NEW.month, COALESCE(NEW.amount, 0), 1)
+            ON CONFLICT (month) DO UPDATE
+            SET others = others + excluded.others,
+                transaction_count = transaction_count + 1;
+
+            UPDATE expenses
+            SET others = COALESCE(others, 0) + COALESCE(NEW.amount, 0),
+                total = COALESCE(total, 0) + COALESCE(NEW.amount, 0)
+            WHERE month = NEW.month;
+        END
+    """)
+
+    # deleted transaction: take it out of its month, drop the rollup row once it is empty
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_delete_rollup
+        AFTER DELETE ON transactions
+        BEGIN
+            UPDATE month_rollups
+            SET others = others - COALESCE(OLD.amount, 0),
+                transaction_count = transaction_count - 1
+            WHERE month = OLD.month;
+
+            DELETE FROM month_rollups WHERE month = OLD.month AND transaction_count <= 0;
+
+            UPDATE expenses
+            SET others = COALESCE(others, 0) - COALESCE(OLD.amount, 0),
+                total = COALESCE(total, 0) - COALESCE(OLD.amount, 0)
+            WHERE month = OLD.month;
+        END
+    """)
+
+    # edited transaction: remove the old values, add the new ones (the month may change too)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_update_rollup
+        AFTER UPDATE OF month, amount ON transactions
+        BEGIN
+            UPDATE month_rollups
+            SET others = others - COALESCE(OLD.amount, 0),
+                transaction_count = transaction_count - 1
+            WHERE month = OLD.month;
+
+            DELETE FROM month_rollups WHERE month = OLD.month AND transaction_count <= 0;
+
+            INSERT INTO month_rollups (month, others, transaction_count)
+            VALUES (NEW.month, COALESCE(NEW.amount, 0), 1)
+            ON CONFLICT (month) DO UPDATE
+            SET others = others + excluded.others,
+                transaction_count = transaction_count + 1;
+
+            UPDATE expenses
+            SET others = COALESCE(others, 0) - COALESCE(OLD.amount, 0),
+                total = COALESCE(total, 0) - COALESCE(OLD.amount, 0)
+            WHERE month = OLD.month;
+
+            UPDATE expenses
+            SET others = COALESCE(others, 0) + COALESCE(NEW.amount, 0),
+                total = COALESCE(total, 0) + COALESCE(NEW.amount, 0)
+            WHERE month = NEW.month;
+        END
+    """)
+
+
+def _migration_4_keyset_indexes(cursor):
+    # the table pages by (total, month) when sorted by total, so both columns go in the index
+    cursor.execute("DROP INDEX IF EXISTS idx_expenses_total")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_total_month ON expenses (total, month)")
+
+
+def _migration_5_user_partitions(cursor):
+    # every household gets its own months: expenses, transactions and month_rollups get a
+    # user_id and every index starts with it, so one user's queries never touch the others' rows.
+    # whatever was there before belongs to the admin account (the first user).
+    cursor.execute("SELECT COALESCE((SELECT id FROM users WHERE username = 'admin'), (SELECT MIN(id) FROM users), 1)")
+    owner_id = cursor.fetchone()[0]
+
+    # the triggers are rebuilt below, the old tables are copied and dropped
+    for trigger in ("trg_transactions_insert_rollup", "trg_transactions_delete_rollup", "trg_transactions_update_rollup"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("ALTER TABLE expenses RENAME TO expenses_v4")
+    cursor.execute("ALTER TABLE transactions RENAME TO transactions_v4")
+    cursor.execute("DROP TABLE IF EXISTS month_rollups")
+
+    cursor.execute("""
+        CREATE TABLE expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            month TEXT NOT NULL,
+            water REAL,
+            electricity REAL,
+            others REAL,
+            total REAL,
+            UNIQUE (user_id, month)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            description TEXT,
+            amount REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE month_rollups (
+            user_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            others REAL NOT NULL DEFAULT 0,
+            transaction_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, month)
+        ) WITHOUT ROWID
+    """)
+
+    # ids are kept, so nothing that points at a transaction id breaks
+    cursor.execute("""
+        INSERT INTO expenses (id, user_id, month, water, electricity, others, total)
+        SELECT id, ?, month, water, electricity, others, total FROM expenses_v4
+    """, (owner_id,))
+    cursor.execute("""
+        INSERT INTO transactions (id, user_id, month, category, description, amount)
+        SELECT id, ?, month, category, description, amount FROM transactions_v4
+    """, (owner_id,))
+    cursor.execute("DROP TABLE expenses_v4")
+    cursor.execute("DROP TABLE transactions_v4")
+
+    cursor.execute("""
+        INSERT INTO month_rollups (user_id, month, others, transaction_count)
+        SELECT user_id, month, COALESCE(SUM(amount), 0), COUNT(*) FROM transactions GROUP BY user_id, month
+    """)
+
+    # same indexes as before, each one led by user_id
+    cursor.execute("CREATE INDEX idx_transactions_user_month_amount ON transactions (user_id, month, amount)")
+    cursor.execute("CREATE INDEX idx_transactions_user_month_id ON transactions (user_id, month, id)")
+    cursor.execute("CREATE INDEX idx_expenses_user_total_month ON expenses (user_id, total, month)")
+
+    cursor.execute("""
+        CREATE TRIGGER trg_transactions_insert_rollup
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO month_rollups (user_id, month, others, transaction_count)
+            VALUES (NEW.user_id, NEW.month, COALESCE(NEW.amount, 0), 1)
+            ON CONFLICT (user_id, month) DO UPDATE
+            SET others = others + excluded.others,
+                transaction_count = transaction_count + 1;
+
+            UPDATE expenses
+            SET others = COALESCE(others, 0) + COALESCE(NEW.amount, 0),
+                total = COALESCE(total, 0) + COALESCE(NEW.amount, 0)
+            WHERE user_id = NEW.user_id AND month = NEW.month;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER trg_transactions_delete_rollup
+        AFTER DELETE ON transactions
+        BEGIN
+            UPDATE month_rollups
+            SET others = others - COALESCE(OLD.amount, 0),
+                transaction_count = transaction_count - 1
+            WHERE user_id = OLD.user_id AND month = OLD.month;
+
+            DELETE FROM month_rollups WHERE user_id = OLD.user_id AND month = OLD.month AND transaction_count <= 0;
+
+            UPDATE expenses
+            SET others = COALESCE(others, 0) - COALESCE(OLD.amount, 0),
+                total = COALESCE(total, 0) - COALESCE(OLD.amount, 0)
+            WHERE user_id = OLD.user_id AND month = OLD.month;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER trg_transactions_update_rollup
+        AFTER UPDATE OF user_id, month, amount ON transactions
+        BEGIN
+            UPDATE month_rollups
+            SET others = others - COALESCE(OLD.amount, 0),
+                transaction_count = transaction_count - 1
+            WHERE user_id = OLD.user_id AND month = OLD.month;
+
+            DELETE FROM month_rollups WHERE user_id = OLD.user_id AND month = OLD.month AND transaction_count <= 0;
+
+            INSERT INTO month_rollups (user_id, month, others, transaction_count)
+            VALUES (NEW.user_id, NEW.month, COALESCE(NEW.amount, 0), 1)
+            ON CONFLICT (user_id, month) DO UPDATE
+            SET others = others + excluded.others,
+                transaction_count = transaction_count + 1;
+
+            UPDATE expenses
+            SET others = COALESCE(others, 0) - COALESCE(OLD.amount, 0),
+                total = COALESCE(total, 0) - COALESCE(OLD.amount, 0)
+            WHERE user_id = OLD.user_id AND month = OLD.month;
+
+            UPDATE expenses
+            SET others = COALESCE(others, 0) + COALESCE(NEW.amount, 0),
+                total = COALESCE(total, 0) + COALESCE(NEW.amount, 0)
+            WHERE user_id = NEW.user_id AND month = NEW.month;
+        END
+    """)
+
+
+def _migration_6_integer_centavos(cursor):
+    # amounts were REAL pesos, so sums drifted (0.1 + 0.2 != 0.3) and a total of "zero" could be
+    # 1e-13. every amount is now an INTEGER number of centavos in a *_cents column: SUM() over
+    # integers is exact, and the new names make any query still reading pesos fail loudly.
+    for trigger in ("trg_transactions_insert_rollup", "trg_transactions_delete_rollup", "trg_transactions_update_rollup"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("ALTER TABLE expenses RENAME TO expenses_v5")
+    cursor.execute("ALTER TABLE transactions RENAME TO transactions_v5")
+    cursor.execute("DROP TABLE IF EXISTS month_rollups")
+    for index in ("idx_transactions_user_month_amount", "idx_transactions_user_month_id", "idx_expenses_user_total_month"):
+        cursor.execute(f"DROP INDEX IF EXISTS {index}")
+
+    cursor.execute("""
+        CREATE TABLE expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            month TEXT NOT NULL,
+            water_cents INTEGER NOT NULL DEFAULT 0,
+            electricity_cents INTEGER NOT NULL DEFAULT 0,
+            others_cents INTEGER NOT NULL DEFAULT 0,
+            total_cents INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (user_id, month)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            description TEXT,
+            amount_cents INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE month_rollups (
+            user_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            others_cents INTEGER NOT NULL DEFAULT 0,
+            transaction_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, month)
+        ) WITHOUT ROWID
+    """)
+
+    # pesos -> centavos, rounded to the nearest centavo (a stored 12.499999999 becomes 1250)
+    cursor.execute("""
+        INSERT INTO transactions (id, user_id, month, category, description, amount_cents)
+        SELECT id, user_id, month, category, description, CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER)
+        FROM transactions_v5
+    """)
+    cursor.execute("""
+        INSERT INTO month_rollups (user_id, month, others_cents, transaction_count)
+        SELECT user_id, month, SUM(amount_cents), COUNT(*) FROM transactions GROUP BY user_id, month
+    """)
+
+    # the bills are converted, "others" and "total" are summed again from the exact amounts
+    cursor.execute("""
+        INSERT INTO expenses (id, user_id, month, water_cents, electricity_cents)
+        SELECT id, user_id, month, CAST(ROUND(COALESCE(water, 0) * 100) AS INTEGER),
+               CAST(ROUND(COALESCE(electricity, 0) * 100) AS INTEGER)
+        FROM expenses_v5
+    """)
+    cursor.execute("""
+        UPDATE expenses
+        SET others_cents = COALESCE((SELECT r.others_cents FROM month_rollups r
+                                     WHERE r.user_id = expenses.user_id AND r.month = expenses.month), 0),
+            total_cents = water_cents + electricity_cents
+                          + COALESCE((SELECT r.others_cents FROM month_rollups r
+                                      WHERE r.user_id = expenses.user_id AND r.month = expenses.month), 0)
+    """)
+    cursor.execute("DROP TABLE expenses_v5")
+    cursor.execute("DROP TABLE transactions_v5")
+
+    # same index names as before, so the query plan checks keep their meaning
+    cursor.execute("CREATE INDEX idx_transactions_user_month_amount ON transactions (user_id, month, amount_cents)")
+    cursor.execute("CREATE INDEX idx_transactions_user_month_id ON transactions (user_id, month, id)")
+    cursor.execute("CREATE INDEX idx_expenses_user_total_month ON expenses (user_id, total_cents, month)")
+
+    cursor.execute("""
+        CREATE TRIGGER trg_transactions_insert_rollup
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO month_rollups (user_id, month, others_cents, transaction_count)
+            VALUES (NEW.user_id, NEW.month, NEW.amount_cents, 1)
+            ON CONFLICT (user_id, month) DO UPDATE
+            SET others_cents = others_cents + excluded.others_cents,
+                transaction_count = transaction_count + 1;
+
+            UPDATE expenses
+            SET others_cents = others_cents + NEW.amount_cents,
+                total_cents = total_cents + NEW.amount_cents
+            WHERE user_id = NEW.user_id AND month = NEW.month;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER trg_transactions_delete_rollup
+        AFTER DELETE ON transactions
+        BEGIN
+            UPDATE month_rollups
+            SET others_cents = others_cents - OLD.amount_cents,
+                transaction_count = transaction_count - 1
+            WHERE user_id = OLD.user_id AND month = OLD.month;
+
+            DELETE FROM month_rollups WHERE user_id = OLD.user_id AND month = OLD.month AND transaction_count <= 0;
+
+            UPDATE expenses
+            SET others_cents = others_cents - OLD.amount_cents,
+                total_cents = total_cents - OLD.amount_cents
+            WHERE user_id = OLD.user_id AND month = OLD.month;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER trg_transactions_update_rollup
+        AFTER UPDATE OF user_id, month, amount_cents ON transactions
+        BEGIN
+            UPDATE month_rollups
+            SET others_cents = others_cents - OLD.amount_cents,
+                transaction_count = transaction_count - 1
+            WHERE user_id = OLD.user_id AND month = OLD.month;
+
+            DELETE FROM month_rollups WHERE user_id = OLD.user_id AND month = OLD.month AND transaction_count <= 0;
+
+            INSERT INTO month_rollups (user_id, month, others_cents, transaction_count)
+            VALUES (NEW.user_id, NEW.month, NEW.amount_cents, 1)
+            ON CONFLICT (user_id, month) DO UPDATE
+            SET others_cents = others_cents + excluded.others_cents,
+                transaction_count = transaction_count + 1;
+
+            UPDATE expenses
+            SET others_cents = others_cents - OLD.amount_cents,
+                total_cents = total_cents - OLD.amount_cents
+            WHERE user_id = OLD.user_id AND month = OLD.month;
+
+            UPDATE expenses
+            SET others_cents = others_cents + NEW.amount_cents,
+                total_cents = total_cents + NEW.amount_cents
+            WHERE user_id = NEW.user_id AND month = NEW.month;
+        END
+    """)
+
+
+def _migration_7_category_rollups(cursor):
+    # running SUM/COUNT per user, month and category: the whole category x month matrix of a
+    # user is one primary key range, no GROUP BY over the transactions when a chart needs it
+    cursor.execute("""
+        CREATE TABLE category_rollups (
+            user_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            amount_cents INTEGER NOT NULL DEFAULT 0,
+            transaction_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, month, category)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        INSERT INTO category_rollups (user_id, month, category, amount_cents, transaction_count)
+        SELECT user_id, month, category, SUM(amount_cents), COUNT(*) FROM transactions GROUP BY user_id, month, category
+    """)
+
+    # separate triggers from the month_rollups ones, SQLite runs both on every change
+    cursor.execute("""
+        CREATE TRIGGER trg_transactions_insert_category
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO category_rollups (user_id, month, category, amount_cents, transaction_count)
+            VALUES (NEW.user_id, NEW.month, NEW.category, NEW.amount_cents, 1)
+            ON CONFLICT (user_id, month, category) DO UPDATE
+            SET amount_cents = amount_cents + excluded.amount_cents,
+                transaction_count = transaction_count + 1;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER trg_transactions_delete_category
+        AFTER DELETE ON transactions
+        BEGIN
+            UPDATE category_rollups
+            SET amount_cents = amount_cents - OLD.amount_cents,
+                transaction_count = transaction_count - 1
+            WHERE user_id = OLD.user_id AND month = OLD.month AND category = OLD.category;
+
+            DELETE FROM category_rollups
+            WHERE user_id = OLD.user_id AND month = OLD.month AND category = OLD.category AND transaction_count <= 0;
+        END
+    """)
+
+    # editing a transaction may move it to another category (or month), not just change its amount
+    cursor.execute("""
+        CREATE TRIGGER trg_transactions_update_category
+        AFTER UPDATE OF user_id, month, category, amount_cents ON transactions
+        BEGIN
+            UPDATE category_rollups
+            SET amount_cents = amount_cents - OLD.amount_cents,
+                transaction_count = transaction_count - 1
+            WHERE user_id = OLD.user_id AND month = OLD.month AND category = OLD.category;
+
+            DELETE FROM category_rollups
+            WHERE user_id = OLD.user_id AND month = OLD.month AND category = OLD.category AND transaction_count <= 0;
+
+            INSERT INTO category_rollups (user_id, month, category, amount_cents, transaction_count)
+            VALUES (NEW.user_id, NEW.month, NEW.category, NEW.amount_cents, 1)
+            ON CONFLICT (user_id, month, category) DO UPDATE
+            SET amount_cents = amount_cents + excluded.amount_cents,
+                transaction_count = transaction_count + 1;
+        END
+    """)
+
+
+def _migration_8_description_search(cursor):
+    # full-text index of the transaction descriptions. "external content": the words are indexed,
+    # the text itself is only stored once in transactions (the index rowid is the transaction id).
+    # the month is indexed too ("2024-05" -> 2024, 05) so a month range is matched inside the index
+    # instead of reading every hit's row first. prefix='2 3' keeps prefix queries like "gr*" fast,
+    # it about doubles the index (roughly 50 bytes per transaction)
+    cursor.execute("""
+        CREATE VIRTUAL TABLE transactions_fts USING fts5(
+            description,
+            month,
+            content='transactions',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    cursor.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+    # an external content index must be told the old text to remove it
+    cursor.execute("""
+        CREATE TRIGGER trg_transactions_insert_fts
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (rowid, description, month) VALUES (NEW.id, NEW.description, NEW.month);
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER trg_transactions_delete_fts
+        AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, description, month)
+            VALUES ('delete', OLD.id, OLD.description, OLD.month);
+        END
+    """)
+
+    # edits usually rewrite every field, the index only changes when the text or month really did
+    cursor.execute("""
+        CREATE TRIGGER trg_transactions_update_fts
+        AFTER UPDATE OF description, month ON transactions
+        WHEN OLD.description IS NOT NEW.description OR OLD.month IS NOT NEW.month
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, description, month)
+            VALUES ('delete', OLD.id, OLD.description, OLD.month);
+            INSERT INTO transactions_fts (rowid, description, month) VALUES (NEW.id, NEW.description, NEW.month);
+        END
+    """)
+
+
+def _migration_9_period_keys(cursor):
+    # an integer month key, year * 12 + month - 1 (see periods.py), so date ranges, quarters and
+    # "the last N months" are integer ranges on an index instead of text compares on every row.
+    # VIRTUAL generated columns cost no space in the rows (only in the index) and can never
+    # disagree with the month text. transactions get no second month index: its (user_id, month, id)
+    # index already range scans, and a range maps to exact month bounds (PeriodRange.first_month)
+    period = "CAST(substr(month, 1, 4) AS INTEGER) * 12 + CAST(substr(month, 6, 2) AS INTEGER) - 1"
+    for table in ("expenses", "category_rollups"):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN period INTEGER GENERATED ALWAYS AS ({period}) VIRTUAL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_user_period ON expenses (user_id, period)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_category_rollups_user_period ON category_rollups (user_id, period, category)")
+
+
+MIGRATIONS = [
+    (1, _migration_1_base_tables),
+    (2, _migration_2_month_indexes),
+    (3, _migration_3_month_rollups),
+    (4, _migration_4_keyset_indexes),
+    (5, _migration_5_user_partitions),
+    (6, _migration_6_integer_centavos),
+    (7, _migration_7_category_rollups),
+    (8, _migration_8_description_search),
+    (9, _migration_9_period_keys),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    # brings the database up to LATEST_VERSION, does nothing if it is already there
+    current_version = get_schema_version(conn)
+    if current_version >= LATEST_VERSION:
+        return current_version
+
+    if conn.in_transaction:
+        conn.commit()
+
+    for version, migration in MIGRATIONS:
+        if version <= current_version:
+            continue
+
+        # each step is its own transaction so a failure leaves the last good version
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version={version}")
+            cursor.execute("COMMIT")
+        except sqlite3.Error:
+            cursor.execute("ROLLBACK")
+            raise
+        current_version = version
+
+    return current_version
+
+
+
+
+
+# QUERY PLAN CHECKS
+# the hot queries of the app and the index each of them must use.
+# run "python migrations.py" after touching the schema to make sure none of them scans.
+HOT_QUERIES = {
+    "others_sum": ("SELECT SUM(amount_cents) FROM transactions WHERE user_id=? AND month=?",
+                   (1, "2024-01"), "idx_transactions_user_month_amount"),
+    "month_rollup": ("SELECT others_cents, transaction_count FROM month_rollups WHERE user_id=? AND month=?",
+                     (1, "2024-01"), "PRIMARY KEY"),
+    "month_transactions": ("SELECT id, category, description, amount_cents FROM transactions WHERE user_id=? AND month=? ORDER BY id DESC",
+                           (1, "2024-01"), "idx_transactions_user_month_id"),
+    "expense_by_month": ("SELECT total_cents FROM expenses WHERE user_id=? AND month=?",
+                         (1, "2024-01"), "sqlite_autoindex_expenses_1"),
+    "sort_by_total": ("SELECT month, water_cents, electricity_cents, others_cents, total_cents FROM expenses WHERE user_id=? ORDER BY total_cents DESC, month DESC LIMIT 100",
+                      (1,), "idx_expenses_user_total_month"),
+    "total_page": ("SELECT month, water_cents, electricity_cents, others_cents, total_cents FROM expenses WHERE user_id=? AND (total_cents, month) < (?, ?) ORDER BY total_cents DESC, month DESC LIMIT 100",
+                   (1, 50000, "2024-01"), "idx_expenses_user_total_month"),
+    "month_page": ("SELECT month, water_cents, electricity_cents, others_cents, total_cents FROM expenses WHERE user_id=? AND (month) < (?) ORDER BY month DESC LIMIT 100",
+                   (1, "2024-01"), "sqlite_autoindex_expenses_1"),
+    "previous_month": ("SELECT month, water_cents, electricity_cents, others_cents, total_cents FROM expenses WHERE user_id=? AND month<? ORDER BY month DESC LIMIT 1",
+                       (1, "2024-01"), "sqlite_autoindex_expenses_1"),
+    "trend_data": ("SELECT month, water_cents, electricity_cents, others_cents, total_cents FROM expenses WHERE user_id=? ORDER BY month ASC",
+                   (1,), "sqlite_autoindex_expenses_1"),
+    "category_matrix": ("SELECT month, category, amount_cents, transaction_count FROM category_rollups WHERE user_id=? ORDER BY month, category",
+                        (1,), "PRIMARY KEY"),
+    # date ranges (a year, a quarter, the last N months) are integer ranges of the period key
+    "trend_range": ("SELECT month, water_cents, electricity_cents, others_cents, total_cents FROM expenses WHERE user_id=? AND period BETWEEN ? AND ? ORDER BY period",
+                    (1, 24288, 24293), "idx_expenses_user_period"),
+    "category_matrix_range": ("SELECT month, category, amount_cents, transaction_count FROM category_rollups WHERE user_id=? AND period BETWEEN ? AND ? ORDER BY period, category",
+                              (1, 24288, 24293), "idx_category_rollups_user_period"),
+    "latest_period": ("SELECT MAX(period) FROM expenses WHERE user_id=?",
+                      (1,), "idx_expenses_user_period"),
+    "transactions_range": ("SELECT id, month, category, description, amount_cents FROM transactions WHERE user_id=? AND month BETWEEN ? AND ? ORDER BY month, id",
+                           (1, "2024-01", "2024-06"), "idx_transactions_user_month_id"),
+    # the index finds the newest matches, each one is then read by its id (no scan, no sort)
+    "description_search": ("SELECT t.id, t.month, t.category, t.description, t.amount_cents, bm25(transactions_fts, 1.0, 0.0) "
+                           "FROM transactions_fts JOIN transactions AS t ON t.id = transactions_fts.rowid "
+                           "WHERE transactions_fts MATCH ? AND t.user_id=? ORDER BY transactions_fts.rowid DESC LIMIT 2000",
+                           ('description : ("grab")', 1), "INTEGER PRIMARY KEY"),
+    "transactions_page": ("SELECT id, category, description, amount_cents FROM transactions WHERE user_id=? AND month=? AND id<? ORDER BY id DESC LIMIT 100",
+                          (1, "2024-01", 1000), "idx_transactions_user_month_id"),
+}
+
+
+def explain_query_plan(conn, sql, params=()):
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def check_query_plans(conn, queries=None):
+    # returns {name: plan} for every hot query that does NOT use its expected index
+    failures = {}
+    for name, (sql, params, index_name) in (queries or HOT_QUERIES).items():
+        plan = explain_query_plan(conn, sql, params)
+        uses_index = any(index_name in step for step in plan)
+        needs_sort = any("USE TEMP B-TREE" in step for step in plan)
+        if not uses_index or needs_sort:
+            failures[name] = plan
+    return failures
+
+
+if __name__ == "__main__":
+    check_conn = sqlite3.connect(":memory:")
+    migrate(check_conn)
+    bad_plans = check_query_plans(check_conn)
+
+    for query_name, (query_sql, _, expected_index) in HOT_QUERIES.items():
+        status = "FAIL" if query_name in bad_plans else "ok"
+        print(f"[{status}] {query_name}: expects {expected_index}")
+        for step in bad_plans.get(query_name, []):
+            print(f"        {step}")
+
+    check_conn.close()
+    raise SystemExit(1 if bad_plans else 0)
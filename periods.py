@@ -0,0 +1,168 @@
+# IMPORTED EXTENSIONS
+import re
+from collections import namedtuple
+
+# months are stored as "YYYY-MM" text and, since migration 9, also as an integer
+# period key: year * 12 + month - 1 (a generated "period" column, indexed together
+# with user_id). consecutive months are consecutive integers, so a date range is
+# two integers, "the last 6 months" is a subtraction and the (user_id, period)
+# indexes scan exactly the months asked for. no datetime parsing anywhere.
+
+
+
+# PERIOD SETTINGS
+MONTH_PATTERN = re.compile(r"(\d{4})-(0[1-9]|1[0-2])")
+QUARTER_PATTERN = re.compile(r"(\d{4})-?[Qq]([1-4])")
+TRAILING_PATTERN = re.compile(r"last\s*(\d+)(?:\s*months?)?", re.IGNORECASE)
+RANGE_SEPARATOR = re.compile(r"\s*(?:\.\.|to)\s*") # "2024-01..2024-06" or "2024-01 to 2024-06"
+
+MIN_PERIOD = 0 # 0000-01
+MAX_PERIOD = 9999 * 12 + 11 # 9999-12
+ALL_TEXT = "all months"
+
+
+
+
+
+# MONTHS <-> PERIODS
+def is_month(text):
+    # exactly "YYYY-MM" (a single digit month like "2024-5" would sort after "2024-10" as text)
+    return isinstance(text, str) and MONTH_PATTERN.fullmatch(text) is not None
+
+
+def period_of(month):
+    # "2024-05" -> 24292
+    match = MONTH_PATTERN.fullmatch(month or "") if isinstance(month, str) else None
+    if match is None:
+        raise ValueError(f"Invalid month '{month}' (must be YYYY-MM).")
+    return int(match.group(1)) * 12 + int(match.group(2)) - 1
+
+
+def month_of(period):
+    # 24292 -> "2024-05"
+    year, month = divmod(period, 12)
+    return f"{year:04d}-{month + 1:02d}"
+
+
+
+
+
+# RANGES (inclusive at both ends)
+class PeriodRange(namedtuple("PeriodRange", "first last")):
+    __slots__ = ()
+
+    @property
+    def first_month(self):
+        return month_of(self.first)
+
+
+    @property
+    def last_month(self):
+        return month_of(self.last)
+
+
+    def month_count(self):
+        return max(0, self.last - self.first + 1)
+
+
+    def includes(self, month):
+        # month is "YYYY-MM"
+        return self.first <= period_of(month) <= self.last
+
+
+    def describe(self):
+        if self.first == MIN_PERIOD and self.last == MAX_PERIOD:
+            return ALL_TEXT
+        if self.first == MIN_PERIOD:
+            return f"up to {self.last_month}"
+        if self.last == MAX_PERIOD:
+            return f"from {self.first_month}"
+        if self.first == self.last:
+            return self.first_month
+        return f"{self.first_month} to {self.last_month}"
+
+
+def month_range(first_month=None, last_month=None):
+    # either end may be left open
+    first = period_of(first_month) if first_month else MIN_PERIOD
+    last = period_of(last_month) if last_month else MAX_PERIOD
+    if first > last:
+        raise ValueError(f"The range starts ({first_month}) after it ends ({last_month}).")
+    return PeriodRange(first, last)
+
+
+def whole_number(value, what):
+    # "2024" or 2024 -> 2024, anything else is a ValueError that says what was wrong
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"Invalid {what} '{value}'.")
+
+
+def year_range(year):
+    year = whole_number(year, "year")
+    if not 0 <= year <= 9999:
+        raise ValueError(f"Invalid year '{year}'.")
+    return PeriodRange(year * 12, year * 12 + 11)
+
+
+def quarter_range(year, quarter):
+    quarter = whole_number(quarter, "quarter")
+    if not 1 <= quarter <= 4:
+        raise ValueError(f"Invalid quarter '{quarter}' (must be 1 to 4).")
+    first = year_range(year).first + (quarter - 1) * 3
+    return PeriodRange(first, first + 2)
+
+
+def trailing_range(count, latest):
+    # the "count" months up to and including the month "latest" (a period)
+    count = whole_number(count, "number of months")
+    if count < 1:
+        raise ValueError("The number of months must be at least 1.")
+    return PeriodRange(max(MIN_PERIOD, latest - count + 1), latest)
+
+
+def resolve_range(first_month=None, last_month=None, year=None, quarter=None, last=None, latest=None):
+    # one kind of range: from/to months, a year (and quarter), or the last N months up to
+    # "latest" (a period, usually the newest recorded month). None when nothing narrows it down
+    kinds = [bool(first_month or last_month), year is not None, last is not None]
+    if sum(kinds) > 1:
+        raise ValueError("Use only one of: a from/to month range, a year (and quarter), the last N months.")
+    if quarter is not None and year is None:
+        raise ValueError("A quarter needs a year.")
+    if first_month or last_month:
+        return month_range(first_month, last_month)
+    if year is not None:
+        return quarter_range(year, quarter) if quarter is not None else year_range(year)
+    if last is not None:
+        if latest is None:
+            raise ValueError("There are no months recorded to count back from.")
+        return trailing_range(last, latest)
+    return None
+
+
+def needs_latest(text):
+    # whether parse_range(text) counts back from the newest month
+    return TRAILING_PATTERN.fullmatch((text or "").strip()) is not None
+
+
+def parse_range(text, latest=None):
+    # what a person types: "", "all", "2024", "2024-Q2", "2024-05", "2024-01..2024-06",
+    # "2024-01 to 2024-06", "last 6 months"; None for every month
+    text = (text or "").strip()
+    if not text or text.lower() in ("all", ALL_TEXT):
+        return None
+    match = TRAILING_PATTERN.fullmatch(text)
+    if match:
+        return resolve_range(last=int(match.group(1)), latest=latest)
+    match = QUARTER_PATTERN.fullmatch(text)
+    if match:
+        return quarter_range(match.group(1), match.group(2))
+    if text.isdigit() and len(text) == 4:
+        return year_range(text)
+    ends = RANGE_SEPARATOR.split(text)
+    if len(ends) == 2:
+        return month_range(ends[0] or None, ends[1] or None)
+    if len(ends) == 1 and is_month(text):
+        return month_range(text, text)
+    raise ValueError(f"Could not read the range '{text}' (try 2024, 2024-Q2, 2024-01..2024-06 or last 6).")
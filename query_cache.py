@@ -0,0 +1,226 @@
+# IMPORTED EXTENSIONS
+import sqlite3 # to notice writes made by other processes
+import threading # the reader and writer threads share one cache
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from db_connection import DB_FILE
+
+# read-through cache for the queries the screens repeat all the time
+# (the others total of a month, its transactions, the graph data, table pages...).
+# every entry belongs to one month, or to None when it depends on every month
+# (graph data, sorted table pages). a write to a month drops that month's entries
+# plus the None ones, nothing else.
+# writes the service never hears about (another process, the importer) are caught
+# with PRAGMA data_version: before serving an entry the cache asks whether anyone
+# else committed since it last looked and starts over if so. the service's own
+# writes run inside writing(), so the versions they produce don't count as "anyone
+# else" and only drop their months, for that user only.
+
+
+
+# CACHE SETTINGS
+MAX_ENTRIES = 512 # least recently used entries are evicted above this
+ALL_MONTHS = None # "month" of entries that read the whole table
+
+
+
+
+
+# QUERY CACHE
+class QueryCache:
+    def __init__(self, max_entries=MAX_ENTRIES, version=None):
+        self.max_entries = max_entries
+        self.version = version # DataVersion of the database, None to trust invalidate() alone
+
+        self._entries = OrderedDict() # (kind, month, params) -> result, oldest use first
+        self._keys_by_month = {} # month -> set of keys, to invalidate a month quickly
+        self._generations = {} # month -> bumped on every invalidation of that month
+        self._epoch = 0 # bumped by clear()
+        self._seen_changes = 0 # DataVersion.changes the entries were read at
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0 # entries dropped because of a write
+
+
+    def get_or_load(self, kind, month, params, load):
+        # results are shared between callers, treat them as read only
+        key = (kind, month, params)
+        changes = self.version.check() if self.version is not None else 0
+        with self._lock:
+            if changes != self._seen_changes:
+                # someone else committed: anything we hold may be stale
+                self._clear()
+                self._seen_changes = changes
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            generation = (self._epoch, self._generations.get(month, 0))
+
+        value = load()
+
+        with self._lock:
+            # a write to this month landed while we were reading: the result may be stale, don't keep it
+            if generation == (self._epoch, self._generations.get(month, 0)) and self.max_entries > 0:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                self._keys_by_month.setdefault(month, set()).add(key)
+                while len(self._entries) > self.max_entries:
+                    self._forget(next(iter(self._entries)))
+                    self.evictions += 1
+        return value
+
+
+    @contextmanager
+    def writing(self, months):
+        # wrap the service's own writes to these months: their entries are dropped once it is
+        # committed (or rolled back), and the new data version isn't mistaken for another process
+        with self.version.own_write() if self.version is not None else nullcontext():
+            try:
+                yield
+            finally:
+                self.invalidate(months)
+
+
+    def invalidate(self, months):
+        # call after a write to these months is committed
+        with self._lock:
+            for month in set(months) | {ALL_MONTHS}:
+                self._generations[month] = self._generations.get(month, 0) + 1
+                for key in list(self._keys_by_month.get(month, ())):
+                    self._forget(key)
+                    self.invalidations += 1
+
+
+    def clear(self):
+        # for writes that bypassed the service (imports); other processes are noticed through
+        # the data version
+        with self._lock:
+            self._clear()
+
+
+    def _clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._keys_by_month.clear()
+        self._epoch += 1
+
+
+    def _forget(self, key):
+        del self._entries[key]
+        month_keys = self._keys_by_month.get(key[1])
+        if month_keys is not None:
+            month_keys.discard(key)
+            if not month_keys:
+                del self._keys_by_month[key[1]]
+
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+
+
+
+# DATA VERSION
+class DataVersion:
+    # PRAGMA data_version seen from a connection of its own that never writes: it changes
+    # whenever any other connection, in this process or another one, commits to the file.
+    # versions produced inside own_write() are expected, every other change bumps "changes".
+    # (a commit from another process landing while one of ours is in flight is taken for ours)
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = db_file
+        self.changes = 0 # commits seen that weren't ours
+        self._known = None # the last version accounted for
+        self._own_writes = 0 # own writes in progress
+        self._conn = None
+        self._lock = threading.Lock()
+
+
+    def check(self):
+        # "changes" as of now: a cache compares it with the value it saw last time
+        with self._lock:
+            self._account(self._read())
+            return self.changes
+
+
+    @contextmanager
+    def own_write(self):
+        with self._lock:
+            self._account(self._read()) # whatever happened before our write wasn't us
+            self._own_writes += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._own_writes -= 1
+                self._known = self._read()
+                if self._known is None:
+                    self.changes += 1
+
+
+    def _read(self):
+        try:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            return None
+
+
+    def _account(self, current):
+        if current is None:
+            self.changes += 1 # can't tell, so nothing is served stale
+        elif self._known is None:
+            self._known = current
+        elif current != self._known and not self._own_writes:
+            # while our own writes are in flight the change is sorted out when they finish
+            self.changes += 1
+            self._known = current
+
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+
+
+
+# SHARED CACHE (one per database file and user, like the connection pools)
+_caches = {}
+_versions = {} # db_file -> DataVersion shared by every user's cache of that file (own writes of any user are expected)
+_caches_lock = threading.Lock()
+
+
+def get_cache(db_file=DB_FILE, user_id=None):
+    # users never share entries, so a write of one user can't drop another user's cache
+    # (only a commit from outside the service, which could be anyone's, empties them all)
+    with _caches_lock:
+        cache = _caches.get((db_file, user_id))
+        if cache is None:
+            version = _versions.get(db_file)
+            if version is None:
+                version = _versions[db_file] = DataVersion(db_file)
+            cache = QueryCache(version=version)
+            _caches[(db_file, user_id)] = cache
+        return cache
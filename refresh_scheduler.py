@@ -0,0 +1,91 @@
+# IMPORTED EXTENSIONS
+from collections import Counter
+from instrumentation import PROFILER # opt-in timings
+
+# one user action used to start several overlapping refreshes of the same views
+# (the table, the others field, the chart, the transaction list). now a change only
+# marks the views it touched as dirty, and each dirty view is redrawn once when
+# tkinter is next idle, however many times it was marked before that.
+# no tkinter import here: any widget with after_idle()/after_cancel() will do.
+
+
+
+# REFRESH SCHEDULER
+class RefreshScheduler:
+    # register(name, redraw) once, then mark(name, *args) as often as needed.
+    # when a view is marked several times in one cycle the arguments of the last mark win
+    # (e.g. the month of the others field).
+    def __init__(self, widget):
+        self.widget = widget
+        self._views = {} # name -> redraw function
+        self._dirty = {} # name -> args of the latest mark, in marking order
+        self._idle_id = None
+
+        # counters: marks - redraws = redraws that were saved by coalescing
+        self.marks = Counter()
+        self.redraws = Counter()
+        self.flushes = 0
+
+
+    def register(self, name, redraw):
+        # registering a name again replaces the old view (a reopened window)
+        self._views[name] = redraw
+
+
+    def unregister(self, name, redraw=None):
+        # with redraw given, only if that view is still the registered one
+        if redraw is None or self._views.get(name) is redraw:
+            self._views.pop(name, None)
+            self._dirty.pop(name, None)
+
+
+    def mark(self, name, *args):
+        if name not in self._views:
+            return
+        self.marks[name] += 1
+        self._dirty.pop(name, None) # re-inserted so views redraw in the order they were last marked
+        self._dirty[name] = args
+        if self._idle_id is None:
+            self._idle_id = self.widget.after_idle(self.flush)
+
+
+    def flush(self):
+        # redraws every dirty view once; marks made while redrawing wait for the next idle cycle
+        self._idle_id = None
+        dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return
+
+        self.flushes += 1
+        for name, args in dirty.items():
+            redraw = self._views.get(name)
+            if redraw is None:
+                continue
+            self.redraws[name] += 1
+            with PROFILER.timer(f"refresh: {name}"):
+                redraw(*args)
+
+
+    def cancel(self):
+        if self._idle_id is not None:
+            try:
+                self.widget.after_cancel(self._idle_id)
+            except Exception:
+                pass
+            self._idle_id = None
+        self._dirty.clear()
+
+
+    def stats(self):
+        # per view: how often it was marked, redrawn, and how many redraws coalescing saved
+        return {name: {"marks": self.marks[name], "redraws": self.redraws[name],
+                       "coalesced": self.marks[name] - self.redraws[name]}
+                for name in sorted(self.marks)}
+
+
+    def summary(self):
+        lines = [f"refresh scheduler: {self.flushes} idle flushes"]
+        for name, counts in self.stats().items():
+            lines.append(f"  {name:<14} {counts['marks']:>6} marks {counts['redraws']:>6} redraws "
+                         f"{counts['coalesced']:>6} coalesced")
+        return "\n".join(lines)
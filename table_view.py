@@ -0,0 +1,242 @@
+# IMPORTED EXTENSIONS
+import tkinter as tk # for gui
+from collections import deque
+from instrumentation import PROFILER # opt-in timings
+
+
+
+# TABLE SETTINGS
+PAGE_SIZE = 100 # rows fetched per query
+MAX_PAGES = 5 # pages kept in the Treeview at once, older ones are dropped
+LOAD_MORE_AT = 0.85 # fetch the next page when the scrollbar passes this point
+LOAD_BACK_AT = 0.15 # fetch the previous page when scrolling above this point
+
+
+
+
+
+# PAGED TREEVIEW
+class PagedTreeview:
+    # only keeps a sliding window of pages inside a ttk.Treeview and fetches more with
+    # keyset pagination while the user scrolls, so a huge table never freezes the window.
+    #
+    # fetch_page(after=key, before=key, limit=n) must return rows in display order.
+    # key_of(row) returns the sort key of a row, iid_of(row) its Treeview iid and
+    # format_rows(rows) the values shown in the columns of each row; it gets a whole page
+    # at once so amounts are formatted in one batch (see money.format_rows).
+    def __init__(self, tree, scrollbar, fetch_page, key_of, iid_of, format_rows,
+                 page_size=PAGE_SIZE, max_pages=MAX_PAGES):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch_page = fetch_page
+        self.key_of = key_of
+        self.iid_of = iid_of
+        self.format_rows = format_rows
+        self.page_size = page_size
+        self.max_pages = max_pages
+
+        self.pages = deque() # each page is a list of rows, in display order
+        self.versions = {} # iid -> values currently shown in that Treeview row
+        self.widget_ops = 0 # inserts/updates/deletes/moves done on the Treeview (for profiling)
+        self.has_before = False # pages were dropped from the top
+        self.has_after = False # the last fetch came back full, there may be more
+        self._loading = False
+
+        self.tree.configure(yscrollcommand=self.on_yscroll)
+
+
+    # LOADING
+    def reset(self, fetch_page=None, key_of=None):
+        # start over from the first page (used when the sort order changes)
+        if fetch_page is not None:
+            self.fetch_page = fetch_page
+        if key_of is not None:
+            self.key_of = key_of
+
+        self._delete(list(self.versions))
+        self.pages.clear()
+        self.has_before = False
+        self.has_after = False
+        self.load_next()
+
+
+    def load_next(self):
+        after = self.key_of(self.pages[-1][-1]) if self.pages else None
+        rows = self.fetch_page(after=after, before=None, limit=self.page_size)
+        self.has_after = len(rows) == self.page_size
+        if not rows:
+            return False
+
+        for row, values in zip(rows, self.format_rows(rows)):
+            self._insert(tk.END, row, values)
+        self.pages.append(rows)
+
+        if len(self.pages) > self.max_pages:
+            self._drop_page(self.pages.popleft())
+            self.has_before = True
+        return True
+
+
+    def load_previous(self):
+        if not self.has_before or not self.pages:
+            return False
+
+        rows = self.fetch_page(after=None, before=self.key_of(self.pages[0][0]), limit=self.page_size)
+        self.has_before = len(rows) == self.page_size
+        if not rows:
+            return False
+
+        for index, (row, values) in enumerate(zip(rows, self.format_rows(rows))):
+            self._insert(index, row, values)
+        self.pages.appendleft(rows)
+
+        if len(self.pages) > self.max_pages:
+            self._drop_page(self.pages.pop())
+            self.has_after = True
+        return True
+
+
+    def _drop_page(self, rows):
+        # keep the row the user is looking at in view while the window slides
+        anchor = self.tree.identify_row(self.tree.winfo_height() // 2) if self.tree.winfo_ismapped() else ""
+        self._delete([str(self.iid_of(row)) for row in rows])
+        if anchor and self.tree.exists(anchor):
+            self.tree.see(anchor)
+
+
+    # INCREMENTAL REFRESH
+    def refresh(self):
+        # re-reads the rows of the current window and only touches the Treeview rows that
+        # changed, so one edited month costs a handful of widget operations, not a rebuild
+        fetch_page, key_of, first_key, wanted = self.window_query()
+        self.apply_window(fetch_window(fetch_page, key_of, first_key, wanted), wanted)
+
+
+    def refresh_in(self, worker, key):
+        # same as refresh() but the queries run on a background reader thread
+        fetch_page, key_of, first_key, wanted = self.window_query()
+        worker.read(key,
+                    lambda service: fetch_window(fetch_page, key_of, first_key, wanted),
+                    on_done=lambda window: self.apply_window(window, wanted))
+
+
+    def set_source(self, fetch_page, key_of):
+        # new query (e.g. another sort order), the next refresh starts from the first page
+        self.fetch_page = fetch_page
+        self.key_of = key_of
+        self.pages.clear()
+        self.has_before = False
+        self.has_after = False
+
+
+    def window_query(self):
+        # what a refresh has to read, captured on the main thread
+        first_key = self.key_of(self.pages[0][0]) if self.pages and self.has_before else None
+        return self.fetch_page, self.key_of, first_key, max(len(self), self.page_size)
+
+
+    def apply_window(self, window, wanted):
+        rows, has_before = window
+        if not self.tree.winfo_exists():
+            return
+
+        self.has_before = has_before
+        self.has_after = len(rows) == wanted
+        self.apply_rows(rows)
+        self.pages = deque(rows[start:start + self.page_size] for start in range(0, len(rows), self.page_size))
+
+
+    @PROFILER.stage("ui: treeview apply_rows")
+    def apply_rows(self, rows):
+        # makes the Treeview show exactly these rows in this order with the fewest changes
+        new_order = [str(self.iid_of(row)) for row in rows]
+        new_values = {iid: tuple(values) for iid, values in zip(new_order, self.format_rows(rows))}
+
+        # deletes: rows that are no longer in the window
+        self._delete([iid for iid in self.versions if iid not in new_values])
+
+        current_order = [iid for iid in self.tree.get_children() if iid in self.versions]
+        for index, iid in enumerate(new_order):
+            values = new_values[iid]
+
+            # inserts: brand new rows go straight to their position
+            if iid not in self.versions:
+                self.tree.insert('', index, values=values, iid=iid)
+                self.versions[iid] = values
+                current_order.insert(index, iid)
+                self.widget_ops += 1
+                continue
+
+            # updates: only when the shown values changed
+            if self.versions[iid] != values:
+                self.tree.item(iid, values=values)
+                self.versions[iid] = values
+                self.widget_ops += 1
+
+            # moves: the row is somewhere else now (e.g. its total changed while sorting by total)
+            if index >= len(current_order) or current_order[index] != iid:
+                self.tree.move(iid, '', index)
+                current_order.remove(iid)
+                current_order.insert(index, iid)
+                self.widget_ops += 1
+
+
+    def _insert(self, index, row, values):
+        iid = str(self.iid_of(row))
+        values = tuple(values)
+        self.tree.insert('', index, values=values, iid=iid)
+        self.versions[iid] = values
+        self.widget_ops += 1
+
+
+    def _delete(self, iids):
+        iids = [iid for iid in iids if iid in self.versions]
+        if not iids:
+            return
+        self.tree.delete(*iids)
+        for iid in iids:
+            del self.versions[iid]
+        self.widget_ops += len(iids)
+
+
+    # SCROLLING
+    def on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._loading:
+            return
+
+        first, last = float(first), float(last)
+        self._loading = True
+        try:
+            if last >= LOAD_MORE_AT and self.has_after:
+                self.load_next()
+            elif first <= LOAD_BACK_AT and self.has_before:
+                self.load_previous()
+        finally:
+            self._loading = False
+
+
+    # HELPERS
+    def loaded_rows(self):
+        return [row for page in self.pages for row in page]
+
+
+    def __len__(self):
+        return sum(len(page) for page in self.pages)
+
+
+
+
+
+def fetch_window(fetch_page, key_of, first_key, wanted):
+    # reads "wanted" rows starting at the row whose key is first_key (or at the top).
+    # thread safe: it only talks to the database, never to the Treeview
+    after = None
+    has_before = False
+    if first_key is not None:
+        previous = fetch_page(after=None, before=first_key, limit=1)
+        if previous:
+            after = key_of(previous[0])
+            has_before = True
+
+    return fetch_page(after=after, before=None, limit=wanted), has_before
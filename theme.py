@@ -0,0 +1,32 @@
+# COLORS IN HEX VALUES (hulaan nalang kung ano ngolor yan whaha)
+PRIMARY_COLOR = "#0F1E3A"
+SECONDARY_COLOR = "#1B3A64"
+ACCENT_COLOR = "#4DEAEF"
+TEXT_COLOR = "#EFEFEF"
+BUTTON_COLOR = "#2D5A8E"
+DELETE_COLOR = "#9E2A2B"
+MANAGE_COLOR = "#167A6E"
+BLACK_COLOR = "#000000"
+
+
+
+# GRAPH COLORS
+GRAPH_COLORS = {
+    'Total': ACCENT_COLOR,   
+    'Water': '#1E88E5',       
+    'Electricity': '#FFC107',     
+    'Others': '#8BC34A'          
+}
+
+
+
+# CATEGORY COLORS (stacked category trend, same order as CATEGORIES)
+CATEGORY_COLORS = {
+    'Food & Groceries': '#FF7043',
+    'Transport': '#42A5F5',
+    'Healthcare': '#EC407A',
+    'Sustainable Goods': '#66BB6A',
+    'Wasteful Spending': '#AB47BC',
+    'Entertainment': '#FFCA28',
+}
+OTHER_CATEGORY_COLOR = '#90A4AE' # categories from old data that are no longer in the list